@@ -6,12 +6,12 @@ class ContextAgent:
         self.db = db
         self.session_contexts = {}
     
-    def get_context(self, session_id: str) -> Optional[Dict[str, Any]]:
+    async def get_context(self, session_id: str) -> Optional[Dict[str, Any]]:
         if session_id in self.session_contexts:
             return self.session_contexts[session_id]
         
         # Load from database
-        messages = self.db.get_messages(session_id, limit=5)
+        messages = await self.db.get_messages(session_id, limit=5)
         if messages:
             return {
                 "recent_messages": messages,
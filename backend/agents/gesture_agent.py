@@ -3,14 +3,20 @@ Gesture Translation Agent
 Translates text/speech to gesture sequences for non-verbal users
 """
 
-import google.generativeai as genai
-from config import GEMINI_API_KEY
+import hashlib
+import json
+import re
+from typing import List, Optional
+
+from config import GESTURE_BATCH_LLM_ITEMS
+from services.llm_admission import BACKGROUND, llm_priority
+from services.llm_provider import create_llm_provider
+from services.prompt_templates import PromptTemplate, get_prompt_template
 
 class GestureAgent:
     def __init__(self):
         """Initialize the Gesture Translation Agent"""
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        self.llm = create_llm_provider("GestureAgent")
         
         # Gesture library with ASL meanings
         self.gesture_library = {
@@ -137,6 +143,9 @@ class GestureAgent:
             "i agree": "👤 👍",
             "i disagree": "👤 👎",
         }
+        
+        # Compiled AI-translation prompts are keyed by this version
+        self.library_version = self._library_version()
     
     def text_to_gestures(self, text: str) -> dict:
         """
@@ -148,6 +157,50 @@ class GestureAgent:
         Returns:
             dict with gesture_sequence, text, and explanation
         """
+        local_result = self._local_translate(text)
+        if local_result:
+            return local_result
+        
+        # Use AI for complex sentences
+        try:
+            ai_result = self._ai_translate(text)
+            return ai_result
+        except Exception as e:
+            print(f"AI translation error: {e}")
+            return self._fallback_translation(text)
+    
+    def texts_to_gestures(self, texts: List[str]) -> List[dict]:
+        """
+        Convert several texts to gesture sequences in one pass
+        
+        Locally matchable texts are resolved first; the rest go to the LLM
+        as multi-item prompts of at most GESTURE_BATCH_LLM_ITEMS texts, so
+        each reply fits the agent's output token cap.
+        
+        Args:
+            texts: Input texts from verbal user
+            
+        Returns:
+            list of results in the same order and shape as text_to_gestures
+        """
+        results = [self._local_translate(text) for text in texts]
+        pending = [index for index, result in enumerate(results) if result is None]
+        
+        for start in range(0, len(pending), GESTURE_BATCH_LLM_ITEMS):
+            chunk = pending[start:start + GESTURE_BATCH_LLM_ITEMS]
+            try:
+                translated = self._ai_translate_batch([texts[index] for index in chunk])
+            except Exception as e:
+                print(f"AI batch translation error: {e}")
+                translated = [None] * len(chunk)
+            
+            for index, result in zip(chunk, translated):
+                results[index] = result or self._fallback_translation(texts[index])
+        
+        return results
+    
+    def _local_translate(self, text: str) -> Optional[dict]:
+        """Phrase and keyword matching; None if the text needs the LLM"""
         text_lower = text.lower().strip()
         
         # Check for exact phrase match first
@@ -185,34 +238,40 @@ class GestureAgent:
                 "explanation": f"Matched keywords: {', '.join(matched_words)}"
             }
         
-        # Use AI for complex sentences
-        try:
-            ai_result = self._ai_translate(text)
-            return ai_result
-        except Exception as e:
-            print(f"AI translation error: {e}")
-            # Fallback to basic representation
-            return {
-                "gesture_sequence": "💬 ❓",
-                "original_text": text,
-                "method": "fallback",
-                "gestures": ["💬", "❓"],
-                "explanation": "Complex message - showing generic communication icon"
-            }
+        return None
     
-    def _ai_translate(self, text: str) -> dict:
-        """Use Gemini AI to translate complex text to gestures"""
-        
-        # Create a prompt with available gestures
+    def _fallback_translation(self, text: str) -> dict:
+        """Basic representation when AI translation is unavailable"""
+        return {
+            "gesture_sequence": "💬 ❓",
+            "original_text": text,
+            "method": "fallback",
+            "gestures": ["💬", "❓"],
+            "explanation": "Complex message - showing generic communication icon"
+        }
+    
+    def _library_version(self) -> str:
+        """Fingerprint of the gesture library, used to version compiled prompts"""
+        digest = hashlib.sha1(json.dumps(list(self.gesture_library.items()), ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()[:12]
+    
+    def _translation_template(self) -> PromptTemplate:
+        """AI-translation prompt, compiled once per gesture library version"""
+        version = self.library_version
+        return get_prompt_template(
+            "gesture_translation",
+            version,
+            lambda: self._build_translation_template(version)
+        )
+    
+    def _build_translation_template(self, version: str) -> PromptTemplate:
         gesture_list = "\n".join([f"- {word}: {emoji}" for word, emoji in list(self.gesture_library.items())[:50]])
         
-        prompt = f"""You are a gesture translation assistant. Convert the following text into a sequence of emojis/gestures that represent the meaning.
+        prefix = f"""You are a gesture translation assistant. Convert the text given at the end into a sequence of emojis/gestures that represent the meaning.
 
 Available gestures:
 {gesture_list}
 
-Text to translate: "{text}"
-
 Rules:
 1. Use only emojis from the available gestures list above
 2. Keep the sequence short (3-6 gestures maximum)
@@ -224,12 +283,77 @@ Example:
 Input: "Can you help me with my homework?"
 Output: ❓ 🆘 📚
 
-Now translate: "{text}"
 """
+        return PromptTemplate("gesture_translation", version, prefix, 'Now translate: "{text}"\n')
+    
+    def _batch_translation_template(self) -> PromptTemplate:
+        """Multi-item variant sharing the single-item prompt prefix"""
+        version = self.library_version
+        return get_prompt_template(
+            "gesture_translation_batch",
+            version,
+            lambda: PromptTemplate(
+                "gesture_translation_batch",
+                version,
+                self._translation_template().prefix,
+                "Translate each numbered text below separately. Reply with exactly one line per item, "
+                "in the form <number>. <emoji sequence>\n\n{items}\n"
+            )
+        )
+    
+    def _ai_translate_batch(self, texts: List[str]) -> List[Optional[dict]]:
+        """
+        Translate several texts with one LLM call
+        
+        Returns one result per text; None where the reply had no usable line.
+        """
+        if not self.llm:
+            raise Exception("AI translation unavailable: no LLM provider configured")
+        
+        if len(texts) == 1:
+            return [self._ai_translate(texts[0])]
+        
+        template = self._batch_translation_template()
+        items = "\n".join(f'{number}. "{text}"' for number, text in enumerate(texts, start=1))
+        suffix = template.render_suffix(items=items)
+        
+        with llm_priority(BACKGROUND):
+            response_text = self.llm.generate_prefixed(template.prefix, suffix)
+        template.record_usage(suffix, response_text, self.llm.prefix_cached(template.prefix))
+        
+        sequences = {}
+        for line in response_text.splitlines():
+            match = re.match(r"\s*(\d+)[.):]\s*(.+)", line)
+            if match:
+                sequences[int(match.group(1))] = match.group(2).strip()
+        
+        results = []
+        for number, text in enumerate(texts, start=1):
+            gesture_sequence = sequences.get(number)
+            if not gesture_sequence:
+                results.append(None)
+                continue
+            results.append({
+                "gesture_sequence": gesture_sequence,
+                "original_text": text,
+                "method": "ai_translation",
+                "gestures": gesture_sequence.split(),
+                "explanation": "AI-generated gesture sequence"
+            })
+        return results
+    
+    def _ai_translate(self, text: str) -> dict:
+        """Use Gemini AI to translate complex text to gestures"""
+        template = self._translation_template()
+        suffix = template.render_suffix(text=text)
+        
+        if not self.llm:
+            raise Exception("AI translation unavailable: no LLM provider configured")
         
         try:
-            response = self.model.generate_content(prompt)
-            gesture_sequence = response.text.strip()
+            with llm_priority(BACKGROUND):
+                gesture_sequence = self.llm.generate_prefixed(template.prefix, suffix).strip()
+            template.record_usage(suffix, gesture_sequence, self.llm.prefix_cached(template.prefix))
             
             # Clean up the response
             gesture_sequence = gesture_sequence.replace('\n', ' ').strip()
@@ -244,6 +368,11 @@ Now translate: "{text}"
         except Exception as e:
             raise Exception(f"AI translation failed: {str(e)}")
     
+    def add_gestures(self, gestures: dict):
+        """Add or override gesture library entries"""
+        self.gesture_library.update(gestures)
+        self.library_version = self._library_version()
+    
     def get_gesture_library(self) -> dict:
         """Return the complete gesture library"""
         return self.gesture_library
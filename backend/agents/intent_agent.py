@@ -1,30 +1,14 @@
 import os
 from typing import Dict, Any, Optional
-import google.generativeai as genai
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from config import GEMINI_API_KEY
+from services.llm_provider import create_llm_provider
 
 class IntentAgent:
     def __init__(self):
-        api_key = GEMINI_API_KEY
-        if api_key:
-            try:
-                genai.configure(api_key=api_key)
-                try:
-                    self.model = genai.GenerativeModel('gemini-1.5-flash-latest')
-                except:
-                    try:
-                        self.model = genai.GenerativeModel('models/gemini-1.5-flash-latest')
-                    except:
-                        self.model = genai.GenerativeModel('models/gemini-pro')
-            except Exception as e:
-                print(f"Error initializing Gemini in IntentAgent: {e}")
-                self.model = None
-        else:
-            self.model = None
+        self.llm = create_llm_provider("IntentAgent")
     
-    async def detect_intent(self, semantic_meaning: str, context: Optional[Dict] = None) -> Dict[str, Any]:
+    async def detect_intent(self, semantic_meaning: str, context: Optional[Dict] = None, use_llm: bool = True) -> Dict[str, Any]:
         prompt = f"""Analyze the following communication and determine the user's intent.
         
 Input: {semantic_meaning}
@@ -50,10 +34,9 @@ Confidence: [score]
 Explanation: [brief explanation]
 """
         
-        if self.model:
+        if self.llm and use_llm:
             try:
-                response = self.model.generate_content(prompt)
-                result_text = response.text
+                result_text = await self.llm.generate_async(prompt)
                 
                 # Parse response
                 intent = "other"
@@ -1,28 +1,12 @@
 import os
 from typing import Dict, Any
-import google.generativeai as genai
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from config import GEMINI_API_KEY
+from services.llm_provider import create_llm_provider
 
 class NonVerbalAgent:
     def __init__(self):
-        api_key = GEMINI_API_KEY
-        if api_key:
-            try:
-                genai.configure(api_key=api_key)
-                try:
-                    self.model = genai.GenerativeModel('gemini-1.5-flash-latest')
-                except:
-                    try:
-                        self.model = genai.GenerativeModel('models/gemini-1.5-flash-latest')
-                    except:
-                        self.model = genai.GenerativeModel('models/gemini-pro')
-            except Exception as e:
-                print(f"Error initializing Gemini in NonVerbalAgent: {e}")
-                self.model = None
-        else:
-            self.model = None
+        self.llm = create_llm_provider("NonVerbalAgent")
         
         # Symbol/gesture token mappings
         self.token_map = {
@@ -52,14 +36,14 @@ class NonVerbalAgent:
             "😡": "angry / frustrated"
         }
     
-    async def interpret(self, input_text: str) -> Dict[str, Any]:
+    async def interpret(self, input_text: str, use_llm: bool = True) -> Dict[str, Any]:
         # Check for known tokens
         tokens_found = []
         for token, meaning in self.token_map.items():
             if token in input_text:
                 tokens_found.append({"token": token, "meaning": meaning})
         
-        if self.model:
+        if self.llm and use_llm:
             try:
                 prompt = f"""Interpret the following non-verbal communication input. It may contain symbols, gesture tokens, or simple text.
 
@@ -74,8 +58,7 @@ Provide:
 
 Be concise and clear."""
 
-                response = self.model.generate_content(prompt)
-                result_text = response.text
+                result_text = await self.llm.generate_async(prompt)
                 
                 # Preserve original input in semantic meaning for emoji matching
                 semantic_with_input = f"{input_text} - {result_text}"
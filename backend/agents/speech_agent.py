@@ -1,38 +1,21 @@
 import os
 from typing import Dict, Any
-import google.generativeai as genai
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from config import GEMINI_API_KEY
+from services.llm_provider import create_llm_provider
 
 class SpeechAgent:
     def __init__(self):
-        api_key = GEMINI_API_KEY
         print(f"=== SpeechAgent Initialization ===")
-        print(f"API Key present: {'YES' if api_key else 'NO'}")
-        print(f"API Key length: {len(api_key) if api_key else 0}")
+        self.llm = create_llm_provider("SpeechAgent")
         
-        if api_key:
-            try:
-                genai.configure(api_key=api_key)
-                # Try different model names based on API version
-                try:
-                    self.model = genai.GenerativeModel('gemini-1.5-flash-latest')
-                except:
-                    try:
-                        self.model = genai.GenerativeModel('models/gemini-1.5-flash-latest')
-                    except:
-                        self.model = genai.GenerativeModel('models/gemini-pro')
-                print("✓ Gemini model initialized successfully for speech generation")
-            except Exception as e:
-                print(f"✗ Error initializing Gemini: {e}")
-                self.model = None
+        if self.llm:
+            print(f"✓ LLM provider '{self.llm.name}' initialized successfully for speech generation")
         else:
-            print("✗ No API key found, using fallback template responses")
-            self.model = None
+            print("✗ No LLM provider available, using fallback template responses")
     
-    async def generate_output(self, intent: str, semantic_meaning: str, confidence: float) -> Dict[str, Any]:
-        if self.model:
+    async def generate_output(self, intent: str, semantic_meaning: str, confidence: float, use_llm: bool = True) -> Dict[str, Any]:
+        if self.llm and use_llm:
             try:
                 prompt = f"""You are a supportive teacher/caregiver responding to a non-verbal student's communication.
 
@@ -51,8 +34,7 @@ If the student asked a specific question (like "what is 1+1"), answer it directl
 
 Provide only the response text, nothing else."""
 
-                response = self.model.generate_content(prompt)
-                output_text = response.text.strip()
+                output_text = (await self.llm.generate_async(prompt)).strip()
                 
                 # Clean up any markdown or extra formatting
                 output_text = output_text.replace('**', '').replace('*', '')
@@ -63,7 +45,7 @@ Provide only the response text, nothing else."""
                     "generation_method": "ai"
                 }
             except Exception as e:
-                print(f"Gemini API error: {e}")
+                print(f"LLM API error: {e}")
                 return self._fallback_output(intent, semantic_meaning)
         else:
             return self._fallback_output(intent, semantic_meaning)
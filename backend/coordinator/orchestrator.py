@@ -1,3 +1,4 @@
+import time
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -6,6 +7,7 @@ from agents.intent_agent import IntentAgent
 from agents.nonverbal_agent import NonVerbalAgent
 from agents.speech_agent import SpeechAgent
 from agents.context_agent import ContextAgent
+from services.llm_admission import get_llm_admission
 
 class Coordinator:
     def __init__(self, db):
@@ -14,6 +16,7 @@ class Coordinator:
         self.nonverbal_agent = NonVerbalAgent()
         self.speech_agent = SpeechAgent()
         self.context_agent = ContextAgent(db)
+        self.admission = get_llm_admission()
         self.confidence_threshold = 0.7
     
     async def process_communication(
@@ -24,45 +27,64 @@ class Coordinator:
     ) -> Dict[str, Any]:
         if not session_id:
             session_id = str(uuid.uuid4())
-            self.db.create_session(session_id)
+            await self.db.create_session(session_id)
         
         workflow = []
         
+        # Admission: while the LLM is overloaded, serve this request from the rule-based paths
+        degraded = self.admission.overloaded()
+        if degraded:
+            self.admission.degraded_requests += 1
+            await self._log_agent_action(session_id, "coordinator", "degraded", {
+                "reason": "llm_overloaded",
+                "in_flight": self.admission.in_flight,
+                "queue_wait_ms": round(self.admission.queue_wait() * 1000, 1)
+            })
+        use_llm = not degraded
+        
         # Step 1: Non-verbal interpretation
-        self._log_agent_action(session_id, "nonverbal_agent", "started", {"input": input_text})
-        interpretation = await self.nonverbal_agent.interpret(input_text)
+        await self._log_agent_action(session_id, "nonverbal_agent", "started", {"input": input_text})
+        started = time.perf_counter()
+        interpretation = await self.nonverbal_agent.interpret(input_text, use_llm=use_llm)
         workflow.append({"agent": "nonverbal_agent", "result": interpretation})
-        self._log_agent_action(session_id, "nonverbal_agent", "completed", interpretation)
+        await self._log_agent_action(session_id, "nonverbal_agent", "completed", interpretation, self._elapsed_ms(started))
         
         # Step 2: Intent detection
-        self._log_agent_action(session_id, "intent_agent", "started", {"interpreted": interpretation})
-        intent_result = await self.intent_agent.detect_intent(interpretation["semantic_meaning"])
+        await self._log_agent_action(session_id, "intent_agent", "started", {"interpreted": interpretation})
+        started = time.perf_counter()
+        intent_result = await self.intent_agent.detect_intent(interpretation["semantic_meaning"], use_llm=use_llm)
         workflow.append({"agent": "intent_agent", "result": intent_result})
-        self._log_agent_action(session_id, "intent_agent", "completed", intent_result)
+        await self._log_agent_action(session_id, "intent_agent", "completed", intent_result, self._elapsed_ms(started))
         
-        # Step 3: Check confidence and retry if needed
-        if intent_result["confidence"] < self.confidence_threshold:
-            self._log_agent_action(session_id, "coordinator", "retry", {
+        # Step 3: Check confidence and retry if needed (the rules would give the same answer again)
+        if use_llm and intent_result["confidence"] < self.confidence_threshold:
+            await self._log_agent_action(session_id, "coordinator", "retry", {
                 "reason": "low_confidence",
                 "confidence": intent_result["confidence"]
             })
-            # Retry with context
-            context = self.context_agent.get_context(session_id)
-            intent_result = await self.intent_agent.detect_intent(
+            # Retry with context. Someone is waiting, so it runs at interactive
+            # priority (bounded by LLM_QUEUE_TIMEOUT_MS); if it gets no LLM
+            # answer the first one is kept rather than the rule-based guess
+            context = await self.context_agent.get_context(session_id)
+            retry_result = await self.intent_agent.detect_intent(
                 interpretation["semantic_meaning"],
                 context=context
             )
-            workflow.append({"agent": "intent_agent_retry", "result": intent_result})
+            workflow.append({"agent": "intent_agent_retry", "result": retry_result})
+            if "raw_response" in retry_result:
+                intent_result = retry_result
         
         # Step 4: Generate speech/text output
-        self._log_agent_action(session_id, "speech_agent", "started", {"intent": intent_result})
+        await self._log_agent_action(session_id, "speech_agent", "started", {"intent": intent_result})
+        started = time.perf_counter()
         output = await self.speech_agent.generate_output(
             intent=intent_result["intent"],
             semantic_meaning=interpretation["semantic_meaning"],
-            confidence=intent_result["confidence"]
+            confidence=intent_result["confidence"],
+            use_llm=use_llm
         )
         workflow.append({"agent": "speech_agent", "result": output})
-        self._log_agent_action(session_id, "speech_agent", "completed", output)
+        await self._log_agent_action(session_id, "speech_agent", "completed", output, self._elapsed_ms(started))
         
         # Step 5: Update context
         self.context_agent.update_context(session_id, {
@@ -73,7 +95,7 @@ class Coordinator:
         })
         
         # Store message
-        self.db.store_message(session_id, input_text, output["text"], intent_result["intent"])
+        await self.db.store_message(session_id, input_text, output["text"], intent_result["intent"])
         
         return {
             "session_id": session_id,
@@ -82,8 +104,20 @@ class Coordinator:
             "intent": intent_result["intent"],
             "confidence": intent_result["confidence"],
             "workflow": workflow,
+            "degraded": degraded,
             "timestamp": datetime.utcnow().isoformat()
         }
     
-    def _log_agent_action(self, session_id: str, agent_name: str, action: str, data: Dict[str, Any]):
-        self.db.log_agent_action(session_id, agent_name, action, data)
+    async def _log_agent_action(
+        self,
+        session_id: str,
+        agent_name: str,
+        action: str,
+        data: Dict[str, Any],
+        duration_ms: Optional[float] = None
+    ):
+        await self.db.log_agent_action(session_id, agent_name, action, data, duration_ms)
+    
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
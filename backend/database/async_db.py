@@ -0,0 +1,126 @@
+"""
+Async Database
+Awaitable wrapper around Database for use inside async request handlers
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from database.db import Database
+
+
+class AsyncDatabase:
+    """
+    Mirrors the Database method set as coroutines
+
+    Writes run on a single dedicated thread, so they reach SQLite one at a
+    time in submission order and never contend for the write lock with each
+    other. Reads run on a small pool and proceed concurrently (WAL mode lets
+    them overlap with the writer). Anything that is not a query - cursor
+    helpers, SESSION_TABLES, iter_session_rows - is passed through unchanged.
+
+    Blocking code on other threads (the retention pass) writes through
+    `blocking()`, so its writes queue on the same writer thread.
+    """
+
+    WRITE_METHODS = frozenset({
+        "create_session",
+        "store_message",
+        "update_message_repeats",
+        "log_agent_action",
+        "store_gesture_sequence",
+        "store_gesture_sequences",
+        "add_phrase",
+        "increment_phrase_usage",
+        "create_user",
+        "update_last_login",
+        "use_credits",
+        "add_credits",
+        "update_user_plan",
+        "delete_rows",
+        "compact_agent_logs",
+        "incremental_vacuum",
+    })
+
+    READ_METHODS = frozenset({
+        "get_session",
+        "get_recent_sessions",
+        "get_messages",
+        "get_agent_logs",
+        "get_gesture_sequences",
+        "get_phrases",
+        "get_user_by_email",
+        "get_user_by_id",
+        "get_user_credits",
+        "fetch_rows_before",
+    })
+
+    def __init__(self, db: Database, read_workers: int = 4):
+        self.sync = db
+        self.read_workers = read_workers
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._readers: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()  # executors are created lazily, possibly from a worker thread
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self.WRITE_METHODS:
+            return self._bind(self._write_executor, getattr(self.sync, name))
+        if name in self.READ_METHODS:
+            return self._bind(self._read_executor, getattr(self.sync, name))
+        return getattr(self.sync, name)
+
+    def _write_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+            return self._writer
+
+    def _read_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._readers is None:
+                self._readers = ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="db-reader")
+            return self._readers
+
+    def blocking(self) -> "BlockingDatabase":
+        """Synchronous view for worker threads whose writes still go through the writer thread"""
+        return BlockingDatabase(self)
+
+    @staticmethod
+    def _bind(executor: Callable[[], ThreadPoolExecutor], method: Callable) -> Callable:
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor(), functools.partial(method, *args, **kwargs))
+        return call
+
+    def close(self):
+        """Finish queued writes and stop the worker threads (restarted on next use)"""
+        for executor in (self._writer, self._readers):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        self._writer = self._readers = None
+
+
+class BlockingDatabase:
+    """
+    Database-like object for blocking code off the event loop
+
+    Write methods are queued on the AsyncDatabase writer thread and block
+    until they have run; everything else calls the Database directly. Never
+    use it from the writer thread itself.
+    """
+
+    def __init__(self, db: AsyncDatabase):
+        self._db = db
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._db.sync, name)
+        if name not in AsyncDatabase.WRITE_METHODS:
+            return method
+
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            return self._db._write_executor().submit(method, *args, **kwargs).result()
+        return call
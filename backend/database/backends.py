@@ -0,0 +1,311 @@
+"""
+Storage Backends
+Connection and SQL-dialect handling behind the Database class, so the same
+queries run against a local SQLite file or a PostgreSQL server
+"""
+import importlib.util
+import queue
+import re
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+# psycopg is only imported once a PostgreSQL backend is created
+PSYCOPG_AVAILABLE = importlib.util.find_spec("psycopg") is not None
+
+
+class StorageBackend:
+    """
+    Base class for Database storage backends
+
+    Database writes its SQL once in the SQLite dialect (`?` placeholders,
+    SQLite column types); backends hand out DB-API connections whose rows
+    support both row[0] and row["column"], translating as needed.
+    """
+
+    name = "base"
+
+    def connect(self):
+        raise NotImplementedError
+
+    def configure(self, cursor):
+        """Per-database settings applied once by Database.init_db"""
+
+    def column_names(self, cursor, table: str) -> Set[str]:
+        raise NotImplementedError
+
+    def streaming_cursor(self, conn):
+        """Cursor suitable for fetchmany over very large result sets"""
+        return conn.cursor()
+
+    def reset_sequence(self, cursor, table: str):
+        """Make the id sequence continue after rows inserted with explicit ids"""
+
+    def insert_returning_id(self, cursor, query: str, params: Sequence[Any] = ()) -> int:
+        """Run a single-row INSERT and return the new row's id"""
+        raise NotImplementedError
+
+    def incremental_vacuum_enabled(self) -> bool:
+        return True
+
+    def ensure_incremental_vacuum(self) -> bool:
+        return False
+
+    def incremental_vacuum(self, pages: int) -> int:
+        return 0
+
+    def describe(self) -> str:
+        return self.name
+
+
+class SQLiteBackend(StorageBackend):
+    """Single-file SQLite database (the default)"""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str = "communication_bridge.db"):
+        self.db_path = db_path
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def configure(self, cursor):
+        # Incremental auto-vacuum lets retention hand freed pages back in small
+        # steps. It only takes effect on new files; existing ones are converted
+        # offline (python -m services.retention --convert-vacuum).
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+
+        # WAL lets long-running exports read while requests keep writing
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+    def column_names(self, cursor, table: str) -> Set[str]:
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {row[1] for row in cursor.fetchall()}
+
+    def insert_returning_id(self, cursor, query: str, params: Sequence[Any] = ()) -> int:
+        # lastrowid works on every SQLite version; RETURNING needs 3.35+
+        cursor.execute(query, params)
+        return cursor.lastrowid
+
+    def incremental_vacuum_enabled(self) -> bool:
+        conn = self.connect()
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        conn.close()
+        return mode == 2
+
+    def ensure_incremental_vacuum(self) -> bool:
+        """
+        Switch an existing file to incremental auto-vacuum. This is one full
+        VACUUM, which locks the whole file while it rewrites it: run it with
+        the server stopped.
+        """
+        if self.incremental_vacuum_enabled():
+            return False
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("VACUUM")
+        conn.close()
+        return True
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """Release up to `pages` free pages; returns how many were released"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA freelist_count")
+        before = cursor.fetchone()[0]
+        # executescript steps the pragma to completion; execute() frees a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        cursor.execute("PRAGMA freelist_count")
+        after = cursor.fetchone()[0]
+        conn.close()
+        return before - after
+
+    def describe(self) -> str:
+        return f"sqlite:///{self.db_path}"
+
+
+class Row:
+    """Result row addressable by position or column name, like sqlite3.Row"""
+
+    __slots__ = ("_columns", "_values")
+
+    def __init__(self, columns: Dict[str, int], values: Sequence[Any]):
+        self._columns = columns
+        self._values = values
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._values[self._columns[key]]
+        return self._values[key]
+
+    def keys(self) -> List[str]:
+        return list(self._columns)
+
+
+class _PostgresCursor:
+    """DB-API cursor that accepts SQLite-dialect SQL"""
+
+    # Column types and clauses in the shared schema that PostgreSQL spells differently
+    DDL_REWRITES = [
+        (re.compile(r"INTEGER PRIMARY KEY AUTOINCREMENT"), "BIGSERIAL PRIMARY KEY"),
+        (re.compile(r"\bBLOB\b"), "BYTEA"),
+        (re.compile(r"\bREAL\b"), "DOUBLE PRECISION"),
+        # Flags are written as 0/1 integers, as SQLite stores them
+        (re.compile(r"\bBOOLEAN\b"), "SMALLINT"),
+        # SQLite never enforced these (foreign_keys is off); keep the same semantics
+        (re.compile(r",\s*FOREIGN KEY \(\w+\) REFERENCES \w+\(\w+\)"), ""),
+    ]
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @classmethod
+    def translate(cls, query: str) -> str:
+        if query.lstrip().upper().startswith(("CREATE", "ALTER")):
+            for pattern, replacement in cls.DDL_REWRITES:
+                query = pattern.sub(replacement, query)
+        # Queries never contain literal '?'; '%' must be escaped for psycopg
+        return query.replace("%", "%%").replace("?", "%s")
+
+    def execute(self, query: str, params: Sequence[Any] = ()):
+        self._cursor.execute(self.translate(query), tuple(params))
+        return self
+
+    def executemany(self, query: str, seq_of_params):
+        self._cursor.executemany(self.translate(query), [tuple(params) for params in seq_of_params])
+        return self
+
+    def _wrap(self, rows) -> List[Row]:
+        columns = {column.name: index for index, column in enumerate(self._cursor.description or [])}
+        return [Row(columns, values) for values in rows]
+
+    def fetchone(self) -> Optional[Row]:
+        row = self._cursor.fetchone()
+        return self._wrap([row])[0] if row is not None else None
+
+    def fetchmany(self, size: int) -> List[Row]:
+        return self._wrap(self._cursor.fetchmany(size))
+
+    def fetchall(self) -> List[Row]:
+        return self._wrap(self._cursor.fetchall())
+
+    def __iter__(self) -> Iterator[Row]:
+        return iter(self.fetchall())
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class _PooledConnection:
+    """Connection handed out by PostgresBackend; close() returns it to the pool"""
+
+    def __init__(self, backend: "PostgresBackend", conn):
+        self._backend = backend
+        self._conn = conn
+
+    def cursor(self, name: Optional[str] = None) -> _PostgresCursor:
+        return _PostgresCursor(self._conn.cursor(name=name) if name else self._conn.cursor())
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> _PostgresCursor:
+        return self.cursor().execute(query, params)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if self._conn is not None:
+            self._backend._release(self._conn)
+            self._conn = None
+
+
+class PostgresBackend(StorageBackend):
+    """
+    PostgreSQL (or wire-compatible) server via psycopg 3
+
+    Keeps a small pool of idle connections, since Database opens a
+    connection per call.
+    """
+
+    name = "postgresql"
+
+    def __init__(self, url: str, pool_size: int = 8):
+        if not PSYCOPG_AVAILABLE:
+            raise ImportError("PostgreSQL storage needs psycopg: pip install 'psycopg[binary]'")
+        import psycopg
+        self._psycopg = psycopg
+        self.url = url
+        self._idle: "queue.LifoQueue" = queue.LifoQueue(maxsize=pool_size)
+
+    def connect(self) -> _PooledConnection:
+        try:
+            conn = self._idle.get_nowait()
+            if conn.closed:
+                conn = self._psycopg.connect(self.url)
+        except queue.Empty:
+            conn = self._psycopg.connect(self.url)
+        return _PooledConnection(self, conn)
+
+    def _release(self, conn):
+        # Like sqlite3, closing without commit discards the transaction
+        if conn.closed:
+            return
+        conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def column_names(self, cursor, table: str) -> Set[str]:
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = ?",
+            (table,)
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def streaming_cursor(self, conn: _PooledConnection):
+        # Named cursors are server-side, so fetchmany pulls rows in batches
+        return conn.cursor(name="stream_rows")
+
+    def insert_returning_id(self, cursor, query: str, params: Sequence[Any] = ()) -> int:
+        # PostgreSQL cursors have no lastrowid
+        cursor.execute(f"{query} RETURNING id", params)
+        return cursor.fetchone()[0]
+
+    def reset_sequence(self, cursor, table: str):
+        cursor.execute("SELECT pg_get_serial_sequence(?, 'id')", (table,))
+        sequence = cursor.fetchone()[0]
+        if sequence is None:
+            return  # text primary key
+        cursor.execute(
+            f"SELECT setval(?, COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)",
+            (sequence,)
+        )
+
+    def describe(self) -> str:
+        # Hide credentials
+        return re.sub(r"//[^@/]*@", "//***@", self.url)
+
+
+def create_backend(url: str) -> StorageBackend:
+    """
+    Backend for a database URL
+
+    sqlite:///relative/path.db, sqlite:////absolute/path.db or a bare file
+    path select SQLite; postgresql://... or postgres://... select PostgreSQL.
+    """
+    if url.startswith(("postgresql://", "postgres://")):
+        return PostgresBackend(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if "://" in url:
+        raise ValueError(f"Unsupported database URL: {url}")
+    return SQLiteBackend(url)
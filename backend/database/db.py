@@ -1,18 +1,40 @@
-import sqlite3
 import json
+import base64
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 import os
 
+from database.backends import StorageBackend, SQLiteBackend
+from database.log_codec import encode_payload, decode_payload, summarize_payload
+
 class Database:
-    def __init__(self, db_path: str = "communication_bridge.db"):
-        self.db_path = db_path
+    # Tables that belong to a session and can be paged / exported
+    SESSION_TABLES = ("messages", "agent_logs", "gesture_sequences")
+    
+    # Every table, parents first; used by the migration tool
+    ALL_TABLES = (
+        "users", "sessions", "subscriptions", "credit_usage",
+        "messages", "agent_logs", "gesture_sequences", "gestures", "phrases",
+    )
+    
+    def __init__(self, db_path: str = "communication_bridge.db", backend: Optional[StorageBackend] = None):
+        """
+        db_path: SQLite file, used when no backend is given
+        backend: storage backend, e.g. from database.backends.create_backend(DATABASE_URL)
+        """
+        self.backend = backend or SQLiteBackend(db_path)
+        self.db_path = getattr(self.backend, "db_path", None)
         self.init_db()
     
+    def _connect(self):
+        return self.backend.connect()
+    
     def init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        self.backend.configure(cursor)
+        
         # Users table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -49,9 +71,16 @@ class Database:
                 output_text TEXT NOT NULL,
                 intent TEXT,
                 created_at TEXT NOT NULL,
+                repeat_count INTEGER DEFAULT 1,
+                duration_ms REAL,
                 FOREIGN KEY (session_id) REFERENCES sessions(id)
             )
         """)
+        # Repeated identical gesture messages are collapsed into one row
+        self._add_missing_columns(cursor, "messages", {
+            "repeat_count": "INTEGER DEFAULT 1",
+            "duration_ms": "REAL",
+        })
         
         # Agent logs table
         cursor.execute("""
@@ -62,9 +91,21 @@ class Database:
                 action TEXT NOT NULL,
                 data TEXT,
                 created_at TEXT NOT NULL,
+                duration_ms REAL,
+                intent TEXT,
+                confidence REAL,
+                payload BLOB,
                 FOREIGN KEY (session_id) REFERENCES sessions(id)
             )
         """)
+        # Older files: add the structured columns. Rows written before the
+        # migration keep their JSON text in `data`; new rows use `payload`.
+        self._add_missing_columns(cursor, "agent_logs", {
+            "duration_ms": "REAL",
+            "intent": "TEXT",
+            "confidence": "REAL",
+            "payload": "BLOB",
+        })
         
         # Credits usage table
         cursor.execute("""
@@ -93,11 +134,115 @@ class Database:
             )
         """)
         
+        # Keyset pagination indexes: (created_at, id) is the page key
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions (created_at, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_session_created ON messages (session_id, created_at, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agent_logs_session_created ON agent_logs (session_id, created_at, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agent_logs_created ON agent_logs (created_at, id)")
+        
         conn.commit()
         conn.close()
     
+    def _add_missing_columns(self, cursor, table: str, columns: Dict[str, str]):
+        existing = self.backend.column_names(cursor, table)
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    # Keyset pagination helpers
+    
+    @staticmethod
+    def encode_cursor(row: Dict) -> str:
+        """Opaque cursor pointing just past `row` in (created_at, id) DESC order"""
+        raw = json.dumps([row["created_at"], row["id"]])
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, Any]:
+        """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+        try:
+            created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except Exception:
+            raise ValueError("Invalid cursor")
+        return created_at, row_id
+    
+    def next_cursor(self, rows: List[Dict], limit: int) -> Optional[str]:
+        """Cursor for the page after `rows`, or None if this was the last page"""
+        if len(rows) < limit or not rows:
+            return None
+        return self.encode_cursor(rows[-1])
+    
+    def _keyset_clause(self, before: Optional[str]) -> Tuple[str, tuple]:
+        if not before:
+            return "", ()
+        created_at, row_id = self.decode_cursor(before)
+        return " AND (created_at, id) < (?, ?)", (created_at, row_id)
+    
+    # Row converters
+    
+    @staticmethod
+    def _session_dict(row) -> Dict:
+        return {
+            "id": row["id"],
+            "created_at": row["created_at"],
+            "metadata": json.loads(row["metadata"]),
+            "status": row["status"]
+        }
+    
+    @staticmethod
+    def _message_dict(row) -> Dict:
+        return {
+            "id": row["id"],
+            "session_id": row["session_id"],
+            "input_text": row["input_text"],
+            "output_text": row["output_text"],
+            "intent": row["intent"],
+            "repeat_count": row["repeat_count"],
+            "duration_ms": row["duration_ms"],
+            "created_at": row["created_at"]
+        }
+    
+    # agent_logs columns needed without the payload; decoding is skipped
+    # entirely unless the caller asks for `data`
+    AGENT_LOG_SUMMARY_COLUMNS = "id, session_id, agent_name, action, created_at, duration_ms, intent, confidence"
+    
+    @staticmethod
+    def _agent_log_data(row) -> Optional[Dict]:
+        if row["payload"] is not None:
+            return decode_payload(row["payload"])
+        if row["data"] is not None:
+            return json.loads(row["data"])
+        return None
+    
+    @classmethod
+    def _agent_log_dict(cls, row, include_data: bool = True) -> Dict:
+        log = {
+            "id": row["id"],
+            "session_id": row["session_id"],
+            "agent_name": row["agent_name"],
+            "action": row["action"],
+            "duration_ms": row["duration_ms"],
+            "intent": row["intent"],
+            "confidence": row["confidence"],
+            "created_at": row["created_at"]
+        }
+        if include_data:
+            log["data"] = cls._agent_log_data(row)
+        return log
+    
+    @staticmethod
+    def _gesture_sequence_dict(row) -> Dict:
+        return {
+            "id": row["id"],
+            "session_id": row["session_id"],
+            "source_text": row["source_text"],
+            "gesture_sequence": row["gesture_sequence"],
+            "method": row["method"],
+            "created_at": row["created_at"]
+        }
+    
     def create_session(self, session_id: str, metadata: Optional[Dict] = None):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO sessions (id, created_at, metadata) VALUES (?, ?, ?)",
@@ -107,120 +252,291 @@ class Database:
         conn.close()
     
     def get_session(self, session_id: str) -> Optional[Dict]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
         row = cursor.fetchone()
         conn.close()
         
         if row:
-            return {
-                "id": row["id"],
-                "created_at": row["created_at"],
-                "metadata": json.loads(row["metadata"]),
-                "status": row["status"]
-            }
+            return self._session_dict(row)
         return None
     
-    def get_recent_sessions(self, limit: int = 20) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def get_recent_sessions(self, limit: int = 20, before: Optional[str] = None) -> List[Dict]:
+        keyset, keyset_params = self._keyset_clause(before)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT * FROM sessions ORDER BY created_at DESC LIMIT ?",
-            (limit,)
+            f"SELECT * FROM sessions WHERE 1 = 1{keyset} ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*keyset_params, limit)
         )
         rows = cursor.fetchall()
         conn.close()
         
-        return [
-            {
-                "id": row["id"],
-                "created_at": row["created_at"],
-                "metadata": json.loads(row["metadata"]),
-                "status": row["status"]
-            }
-            for row in rows
-        ]
+        return [self._session_dict(row) for row in rows]
     
-    def store_message(self, session_id: str, input_text: str, output_text: str, intent: str, confidence: float = 1.0):
-        conn = sqlite3.connect(self.db_path)
+    def store_message(self, session_id: str, input_text: str, output_text: str, intent: str, confidence: float = 1.0) -> int:
+        """Insert a message; returns its id"""
+        conn = self._connect()
         cursor = conn.cursor()
-        cursor.execute(
+        message_id = self.backend.insert_returning_id(
+            cursor,
             "INSERT INTO messages (session_id, input_text, output_text, intent, created_at) VALUES (?, ?, ?, ?, ?)",
             (session_id, input_text, output_text, intent, datetime.utcnow().isoformat())
         )
         conn.commit()
         conn.close()
+        return message_id
     
-    def get_messages(self, session_id: str, limit: int = 50) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def update_message_repeats(self, message_id: int, repeat_count: int, duration_ms: float):
+        """Record how often, and for how long, a message was repeated"""
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT * FROM messages WHERE session_id = ? ORDER BY created_at DESC LIMIT ?",
-            (session_id, limit)
+            "UPDATE messages SET repeat_count = ?, duration_ms = ? WHERE id = ?",
+            (repeat_count, duration_ms, message_id)
+        )
+        conn.commit()
+        conn.close()
+    
+    def get_messages(self, session_id: str, limit: int = 50, before: Optional[str] = None) -> List[Dict]:
+        keyset, keyset_params = self._keyset_clause(before)
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT * FROM messages WHERE session_id = ?{keyset} ORDER BY created_at DESC, id DESC LIMIT ?",
+            (session_id, *keyset_params, limit)
         )
         rows = cursor.fetchall()
         conn.close()
         
-        return [
-            {
-                "id": row["id"],
-                "session_id": row["session_id"],
-                "input_text": row["input_text"],
-                "output_text": row["output_text"],
-                "intent": row["intent"],
-                "created_at": row["created_at"]
-            }
-            for row in rows
-        ]
+        return [self._message_dict(row) for row in rows]
     
-    def log_agent_action(self, session_id: str, agent_name: str, action: str, data: Dict[str, Any]):
-        conn = sqlite3.connect(self.db_path)
+    def log_agent_action(
+        self,
+        session_id: str,
+        agent_name: str,
+        action: str,
+        data: Dict[str, Any],
+        duration_ms: Optional[float] = None
+    ):
+        summary = summarize_payload(data)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
-            "INSERT INTO agent_logs (session_id, agent_name, action, data, created_at) VALUES (?, ?, ?, ?, ?)",
-            (session_id, agent_name, action, json.dumps(data), datetime.utcnow().isoformat())
+            """INSERT INTO agent_logs
+                (session_id, agent_name, action, created_at, duration_ms, intent, confidence, payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                session_id, agent_name, action, datetime.utcnow().isoformat(),
+                duration_ms, summary["intent"], summary["confidence"], encode_payload(data)
+            )
         )
         conn.commit()
         conn.close()
     
-    def get_agent_logs(self, session_id: Optional[str] = None, limit: int = 50) -> List[Dict]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def get_agent_logs(
+        self,
+        session_id: Optional[str] = None,
+        limit: int = 50,
+        before: Optional[str] = None,
+        include_data: bool = True
+    ) -> List[Dict]:
+        keyset, keyset_params = self._keyset_clause(before)
+        columns = "*" if include_data else self.AGENT_LOG_SUMMARY_COLUMNS
+        conn = self._connect()
         cursor = conn.cursor()
         
         if session_id:
             cursor.execute(
-                "SELECT * FROM agent_logs WHERE session_id = ? ORDER BY created_at DESC LIMIT ?",
-                (session_id, limit)
+                f"SELECT {columns} FROM agent_logs WHERE session_id = ?{keyset} ORDER BY created_at DESC, id DESC LIMIT ?",
+                (session_id, *keyset_params, limit)
             )
         else:
             cursor.execute(
-                "SELECT * FROM agent_logs ORDER BY created_at DESC LIMIT ?",
-                (limit,)
+                f"SELECT {columns} FROM agent_logs WHERE 1 = 1{keyset} ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*keyset_params, limit)
             )
         
         rows = cursor.fetchall()
         conn.close()
         
-        return [
-            {
-                "id": row["id"],
-                "session_id": row["session_id"],
-                "agent_name": row["agent_name"],
-                "action": row["action"],
-                "data": json.loads(row["data"]),
-                "created_at": row["created_at"]
-            }
-            for row in rows
-        ]
+        return [self._agent_log_dict(row, include_data) for row in rows]
+    
+    def iter_session_rows(self, table: str, session_id: str, batch_size: int = 500) -> Iterator[Dict]:
+        """
+        Yield every row of a session table, oldest first
+        
+        Rows are pulled with fetchmany so memory stays constant however
+        large the session is.
+        """
+        converters = {
+            "messages": self._message_dict,
+            "agent_logs": self._agent_log_dict,
+            "gesture_sequences": self._gesture_sequence_dict,
+        }
+        if table not in converters:
+            raise ValueError(f"Unknown session table: {table}")
+        convert = converters[table]
+        
+        conn = self._connect()
+        try:
+            cursor = self.backend.streaming_cursor(conn)
+            cursor.execute(
+                f"SELECT * FROM {table} WHERE session_id = ? ORDER BY created_at, id",
+                (session_id,)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield convert(row)
+        finally:
+            conn.close()
+
+    # Migration
 
+    def table_columns(self, table: str) -> List[str]:
+        if table not in self.ALL_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        conn = self._connect()
+        columns = self.backend.column_names(conn.cursor(), table)
+        conn.close()
+        return sorted(columns)
+
+    def fetch_rows_after(self, table: str, after_id: Any, limit: int) -> List[Dict]:
+        """Rows with id > after_id in id order, as raw columns (None starts from the beginning)"""
+        if table not in self.ALL_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        conn = self._connect()
+        cursor = conn.cursor()
+        if after_id is None:
+            cursor.execute(f"SELECT * FROM {table} ORDER BY id LIMIT ?", (limit,))
+        else:
+            cursor.execute(f"SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def insert_raw_rows(self, table: str, columns: List[str], rows: List[Dict]) -> int:
+        """Insert rows keeping their ids, then move the id sequence past them"""
+        if table not in self.ALL_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        if not rows:
+            return 0
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            [tuple(row.get(column) for column in columns) for row in rows]
+        )
+        self.backend.reset_sequence(cursor, table)
+        conn.commit()
+        conn.close()
+        return len(rows)
+
+    def count_rows(self, table: str) -> int:
+        if table not in self.ALL_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+    # Retention
+    
+    def fetch_rows_before(self, table: str, cutoff: str, limit: int) -> List[Dict]:
+        """Oldest rows of a session table created before `cutoff`, as raw columns"""
+        if table not in self.SESSION_TABLES:
+            raise ValueError(f"Unknown session table: {table}")
+        conn = self._connect()
+        cursor = conn.cursor()
+        # ids grow with created_at, so walking by id stops at the first young row
+        cursor.execute(
+            f"SELECT * FROM {table} WHERE created_at < ? ORDER BY id LIMIT ?",
+            (cutoff, limit)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+    
+    def delete_rows(self, table: str, ids: List[int]) -> int:
+        """Delete rows by id in one short transaction"""
+        if table not in self.SESSION_TABLES:
+            raise ValueError(f"Unknown session table: {table}")
+        if not ids:
+            return 0
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"DELETE FROM {table} WHERE id IN ({', '.join('?' for _ in ids)})",
+            ids
+        )
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
+    
+    def compact_agent_logs(self, cutoff: str, after_id: int, limit: int) -> Tuple[int, Optional[int]]:
+        """
+        Strip raw LLM text from agent_logs created before `cutoff`
+        
+        Works on at most `limit` rows with id > after_id. Rows still holding
+        JSON text in `data` are rewritten in the binary payload format at the
+        same time. Returns the number of rows rewritten and the last id
+        examined (None when done).
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, data, payload FROM agent_logs WHERE id > ? AND created_at < ? ORDER BY id LIMIT ?",
+            (after_id, cutoff, limit)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            conn.close()
+            return 0, None
+        
+        updates = []
+        for row in rows:
+            data = self._agent_log_data(row)
+            if data is None:
+                continue
+            stripped = data.pop("raw_response", None) is not None
+            if isinstance(data.get("intent"), dict):
+                stripped = data["intent"].pop("raw_response", None) is not None or stripped
+            if stripped or row["data"] is not None:
+                summary = summarize_payload(data)
+                updates.append((encode_payload(data), summary["intent"], summary["confidence"], row["id"]))
+        
+        cursor.executemany(
+            """UPDATE agent_logs
+                SET payload = ?, data = NULL, intent = COALESCE(intent, ?), confidence = COALESCE(confidence, ?)
+                WHERE id = ?""",
+            updates
+        )
+        conn.commit()
+        conn.close()
+        return len(updates), rows[-1]["id"]
+    
+    def incremental_vacuum_enabled(self) -> bool:
+        """Whether incremental_vacuum can release pages (always true outside SQLite)"""
+        return self.backend.incremental_vacuum_enabled()
+    
+    def ensure_incremental_vacuum(self) -> bool:
+        """Switch an existing SQLite file to incremental auto-vacuum (offline; no-op elsewhere)"""
+        return self.backend.ensure_incremental_vacuum()
+    
+    def incremental_vacuum(self, pages: int) -> int:
+        """Release up to `pages` free pages; returns how many were released"""
+        return self.backend.incremental_vacuum(pages)
+    
     def init_gesture_tables(self):
         """Initialize gesture-related tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Gestures table
@@ -260,13 +576,16 @@ class Database:
                 FOREIGN KEY (session_id) REFERENCES sessions(id)
             )
         """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_gesture_sequences_session_created ON gesture_sequences (session_id, created_at, id)"
+        )
         
         conn.commit()
         conn.close()
     
     def store_gesture_sequence(self, session_id: str, source_text: str, gesture_sequence: str, method: str):
         """Store a text-to-gesture translation"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO gesture_sequences (session_id, source_text, gesture_sequence, method, created_at) VALUES (?, ?, ?, ?, ?)",
@@ -275,33 +594,38 @@ class Database:
         conn.commit()
         conn.close()
     
-    def get_gesture_sequences(self, session_id: str, limit: int = 50) -> List[Dict]:
+    def store_gesture_sequences(self, session_id: str, sequences: List[Dict[str, str]]):
+        """Store several text-to-gesture translations in one transaction"""
+        created_at = datetime.utcnow().isoformat()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO gesture_sequences (session_id, source_text, gesture_sequence, method, created_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (session_id, item["source_text"], item["gesture_sequence"], item["method"], created_at)
+                for item in sequences
+            ]
+        )
+        conn.commit()
+        conn.close()
+    
+    def get_gesture_sequences(self, session_id: str, limit: int = 50, before: Optional[str] = None) -> List[Dict]:
         """Get gesture translation history for a session"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        keyset, keyset_params = self._keyset_clause(before)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT * FROM gesture_sequences WHERE session_id = ? ORDER BY created_at DESC LIMIT ?",
-            (session_id, limit)
+            f"SELECT * FROM gesture_sequences WHERE session_id = ?{keyset} ORDER BY created_at DESC, id DESC LIMIT ?",
+            (session_id, *keyset_params, limit)
         )
         rows = cursor.fetchall()
         conn.close()
         
-        return [
-            {
-                "id": row["id"],
-                "session_id": row["session_id"],
-                "source_text": row["source_text"],
-                "gesture_sequence": row["gesture_sequence"],
-                "method": row["method"],
-                "created_at": row["created_at"]
-            }
-            for row in rows
-        ]
+        return [self._gesture_sequence_dict(row) for row in rows]
     
     def add_phrase(self, text: str, category: str, gesture_sequence: str = None, is_custom: bool = False):
         """Add a new phrase to the library"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO phrases (text, category, gesture_sequence, is_custom) VALUES (?, ?, ?, ?)",
@@ -312,8 +636,7 @@ class Database:
     
     def get_phrases(self, category: Optional[str] = None) -> List[Dict]:
         """Get phrases, optionally filtered by category"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
         cursor = conn.cursor()
         
         if category:
@@ -338,7 +661,7 @@ class Database:
     
     def increment_phrase_usage(self, phrase_id: int):
         """Increment usage count for a phrase"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute("UPDATE phrases SET usage_count = usage_count + 1 WHERE id = ?", (phrase_id,))
         conn.commit()
@@ -347,7 +670,7 @@ class Database:
     # User Management Methods
     def create_user(self, user_id: str, email: str, name: str, password_hash: str):
         """Create a new user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO users (id, email, name, password_hash, created_at) VALUES (?, ?, ?, ?, ?)",
@@ -358,8 +681,7 @@ class Database:
     
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
         row = cursor.fetchone()
@@ -381,8 +703,7 @@ class Database:
     
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """Get user by ID"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
         row = cursor.fetchone()
@@ -403,7 +724,7 @@ class Database:
     
     def update_last_login(self, user_id: str):
         """Update user's last login timestamp"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
             "UPDATE users SET last_login = ? WHERE id = ?",
@@ -414,7 +735,7 @@ class Database:
     
     def get_user_credits(self, user_id: str) -> int:
         """Get user's remaining credits"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute("SELECT credits FROM users WHERE id = ?", (user_id,))
         result = cursor.fetchone()
@@ -423,7 +744,7 @@ class Database:
     
     def use_credits(self, user_id: str, amount: int, session_id: str = None, action_type: str = "message"):
         """Deduct credits from user account"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Deduct credits
@@ -448,7 +769,7 @@ class Database:
     
     def add_credits(self, user_id: str, amount: int):
         """Add credits to user account"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
             "UPDATE users SET credits = credits + ? WHERE id = ?",
@@ -459,7 +780,7 @@ class Database:
     
     def update_user_plan(self, user_id: str, plan: str):
         """Update user's subscription plan"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute(
             "UPDATE users SET plan = ? WHERE id = ?",
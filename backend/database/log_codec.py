@@ -0,0 +1,67 @@
+"""
+Agent Log Codec
+Compact binary encoding for agent_logs payloads: compact UTF-8 JSON,
+deflated against a preset dictionary of the keys and phrases the agents
+log on every request
+"""
+import json
+import zlib
+from typing import Dict, Any, Optional
+
+# Format byte written in front of every payload. Never change the dictionary
+# of an existing version; add a new version and keep the old one decodable.
+PAYLOAD_V1 = 1
+
+# Fragments that recur in almost every payload. zlib prefers matches near the
+# end of the dictionary, so the most common ones come last.
+_ZDICT_V1 = "".join([
+    "Stop/wait request detected", "Disagreement detected", "Agreement detected",
+    "Bathroom need detected", "Food need detected", "Water need detected",
+    "Help request detected", "Question detected", "Greeting detected",
+    "Default classification", "Deterministic stub response",
+    '{"reason":"low_confidence","confidence":0.',
+    "1. Semantic meaning: ", "\\n2. Emotional tone: ", "\\n3. Urgency level: ",
+    '"raw_response":"Intent: ', "\\nConfidence: 0.", "\\nExplanation: ",
+    '"format":"speech","generation_method":"template"}',
+    '"format":"speech","generation_method":"ai"}',
+    '{"text":"',
+    '"interpretation_method":"rule_based"}',
+    '"interpretation_method":"ai_enhanced"}',
+    '{"input":"',
+    '{"interpreted":{"original_input":"',
+    '{"original_input":"', '","tokens_detected":[{"token":"', '","meaning":"', '"}],"semantic_meaning":"',
+    '"request_help"', '"ask_question"', '"express_need"', '"greet"', '"respond"',
+    '{"intent":{"intent":"', '{"intent":"', '","confidence":0.', ',"explanation":"',
+]).encode("utf-8")
+
+_ZDICTS = {PAYLOAD_V1: _ZDICT_V1}
+
+
+def encode_payload(data: Dict[str, Any]) -> bytes:
+    """Serialize a log payload to the current binary format"""
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    compressor = zlib.compressobj(level=6, zdict=_ZDICTS[PAYLOAD_V1])
+    return bytes([PAYLOAD_V1]) + compressor.compress(raw) + compressor.flush()
+
+
+def decode_payload(blob: bytes) -> Dict[str, Any]:
+    """Inverse of encode_payload, for any supported format version"""
+    version = blob[0]
+    if version not in _ZDICTS:
+        raise ValueError(f"Unknown agent log payload version: {version}")
+    decompressor = zlib.decompressobj(zdict=_ZDICTS[version])
+    raw = decompressor.decompress(blob[1:]) + decompressor.flush()
+    return json.loads(raw)
+
+
+def summarize_payload(data: Dict[str, Any]) -> Dict[str, Optional[Any]]:
+    """Intent and confidence carried by a payload, for the structured columns"""
+    intent = data.get("intent")
+    confidence = data.get("confidence")
+    if isinstance(intent, dict):
+        confidence = intent.get("confidence", confidence)
+        intent = intent.get("intent")
+    return {
+        "intent": intent if isinstance(intent, str) else None,
+        "confidence": confidence if isinstance(confidence, (int, float)) else None,
+    }
@@ -1,21 +1,118 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from services.startup import LazyService, get_startup_profiler
+startup = get_startup_profiler()  # first import, so module imports below are timed too
+
+from fastapi import FastAPI, HTTPException, Depends, Header, UploadFile, File, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, conlist
+from typing import Optional, Dict, Any, List, Callable, Iterator, Awaitable
+from contextlib import asynccontextmanager
 import uvicorn
 from datetime import datetime
 import uuid
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import time
 
 from coordinator.orchestrator import Coordinator
 from simulation.classroom_sim import ClassroomSimulation
 from database.db import Database
+from database.async_db import AsyncDatabase
+from database.backends import create_backend
 from agents.gesture_agent import GestureAgent
 from auth.auth_handler import AuthHandler
-from services.vision_service import VisionService
 from services.gesture_meanings import GestureMeaningService
-
-app = FastAPI(title="Communication Bridge AI")
+from services.llm_provider import warm_up_llm_providers
+from services.llm_client import get_llm_client
+from services.llm_resilience import get_llm_resilience
+from services.llm_singleflight import get_llm_singleflight
+from services.llm_admission import get_llm_admission
+from services.prompt_templates import get_prompt_metrics
+from services.retention import RetentionService
+from services.message_coalescer import MessageCoalescer
+from services.vision_workers import VisionWorkerPool
+from services.landmark_packets import decode_landmark_packet, hands_from_json
+from services.gesture_classifier import supported_gestures
+from services.rate_limiter import RateLimiter, RateLimitMiddleware
+from services.session_executor import SessionExecutor, SessionBusyError
+from services.utterance_segmenter import UtteranceSegmenter
+from config import RETENTION_INTERVAL_S, DATABASE_URL, VIDEO_SAMPLE_FPS, VIDEO_MAX_UPLOAD_MB, VISION_WORKERS, STARTUP_WARMUP, LLM_PROVIDER, RATE_LIMIT_ENABLED, GESTURE_BATCH_MAX_TEXTS
+
+startup.checkpoint("imports")
+
+async def wait_for_vision_workers(timeout_s: float = 300.0, poll_s: float = 0.1):
+    """Wait for every vision worker to warm up; dead workers are respawned meanwhile"""
+    deadline = time.monotonic() + timeout_s
+    while not vision_workers.ready:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Vision workers not ready after {timeout_s:g}s ({vision_workers.stats['restarts']} restarts)")
+        await asyncio.sleep(poll_s)
+
+async def warm_up(names: List[str]):
+    """Build and exercise subsystems in the background; /health/ready answers 503 until this finishes"""
+    for name in names:
+        with startup.warming(name):
+            if name == "database":
+                # Opens the reader connections and pulls the hot tables into the page cache
+                await asyncio.gather(db.get_phrases(), db.get_recent_sessions(), db.get_user_by_email(""))
+            elif name == "vision":
+                await asyncio.to_thread(lambda: landmark_recognizer.load().warm_up())
+                if vision_workers:
+                    await wait_for_vision_workers()
+                else:
+                    await asyncio.to_thread(lambda: vision_service.load().warm_up())
+            elif name == "llm":
+                await asyncio.to_thread(warm_up_llm_providers)
+            elif name == "video":
+                await asyncio.to_thread(video_analyzer.load)
+            else:
+                raise ValueError(f"Unknown STARTUP_WARMUP entry: {name}")
+    print("✓ Warm-up finished: " + ", ".join(names))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if vision_workers:
+        with startup.phase("vision workers"):
+            vision_workers.start()
+    retention_task = asyncio.create_task(retention_service.run_forever(RETENTION_INTERVAL_S))
+    coalescer_task = asyncio.create_task(message_coalescer.run_forever())
+    utterance_task = asyncio.create_task(utterance_segmenter.run_forever())
+    startup.expect_warmup(STARTUP_WARMUP)
+    warmup_task = asyncio.create_task(warm_up(STARTUP_WARMUP)) if STARTUP_WARMUP else None
+    startup.mark_ready()
+    startup.print_report()
+    yield
+    if warmup_task:
+        warmup_task.cancel()
+    coalescer_task.cancel()
+    utterance_task.cancel()
+    await utterance_segmenter.close()
+    retention_task.cancel()
+    await message_coalescer.flush_all()
+    if video_analyzer.loaded:
+        video_analyzer.close()
+    if vision_workers:
+        vision_workers.close()
+    db.close()
+    if rate_limiter:
+        rate_limiter.backend.close()
+
+app = FastAPI(title="Communication Bridge AI", lifespan=lifespan)
+
+def user_id_for_token(token: str) -> Optional[str]:
+    """User id from a valid JWT (signature and expiry only, no DB lookup)"""
+    payload = auth_handler.decode_token(token)
+    return payload.get("sub") if payload else None
+
+rate_limiter = RateLimiter() if RATE_LIMIT_ENABLED else None
+if rate_limiter:
+    # Added before CORS so 429 responses still carry CORS headers
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, user_id_for_token=user_id_for_token)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,14 +122,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-db = Database()
-db.init_gesture_tables()  # Initialize gesture tables
-coordinator = Coordinator(db)
-simulation = ClassroomSimulation(coordinator, db)
-gesture_agent = GestureAgent()
+def build_vision_service():
+    from services.vision_service import VisionService
+    return VisionService()
+
+def build_landmark_recognizer():
+    from services.gesture_classifier import LandmarkRecognizer
+    return LandmarkRecognizer()
+
+def build_video_analyzer():
+    from services.video_analysis import VideoAnalyzer
+    return VideoAnalyzer()
+
+with startup.phase("database"):
+    sync_db = Database(backend=create_backend(DATABASE_URL))
+    sync_db.init_gesture_tables()  # Initialize gesture tables
+    db = AsyncDatabase(sync_db)  # Handlers await queries; writes go through one writer thread
+with startup.phase("agents"):
+    # LLM clients inside the agents are built on their first call
+    coordinator = Coordinator(db)
+    simulation = ClassroomSimulation(coordinator, db)
+    gesture_agent = GestureAgent()
 auth_handler = AuthHandler()
-vision_service = VisionService()  # Initialize vision service
+# cv2 / MediaPipe load on the first vision request (or at warm-up)
+vision_service = LazyService("vision", build_vision_service)
+# Gestures from browser-tracked landmarks: NumPy only, never loads cv2 / MediaPipe
+landmark_recognizer = LazyService("landmarks", build_landmark_recognizer)
 gesture_meaning_service = GestureMeaningService()  # Initialize gesture meaning service
+retention_service = RetentionService(db.blocking())  # Periodic TTL / archival / vacuum, writing through the writer thread
+message_coalescer = MessageCoalescer(db)  # Collapses repeated gesture messages from continuous capture
+video_analyzer = LazyService("video", build_video_analyzer)  # Worker processes for recorded clips
+vision_workers = VisionWorkerPool() if VISION_WORKERS > 0 else None  # Out-of-process frame inference
+session_executor = SessionExecutor()  # Per-session ordering of coordinator work
+
+async def process_utterance(session_id: str, gestures: List[str], emojis: List[str]) -> Dict[str, Any]:
+    """Run a completed gesture utterance through the agents as one message"""
+    async with session_executor.turn(session_id):
+        return await coordinator.process_communication(
+            input_text=" ".join(emojis),
+            user_type="nonverbal",
+            session_id=session_id
+        )
+
+utterance_segmenter = UtteranceSegmenter(process_utterance)  # One pipeline run per signed sentence
+
+@app.exception_handler(SessionBusyError)
+async def session_busy(request: Request, exc: SessionBusyError):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+async def ensure_loaded(service: LazyService):
+    """Build a lazy service on a worker thread, so its first use does not stall the event loop"""
+    if not service.loaded:
+        await asyncio.to_thread(service.load)
+
+async def paginate(fetch: Callable[[Optional[str]], Awaitable[List[Dict]]], limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+    """Run a keyset-paginated query and return its rows with the next cursor"""
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    try:
+        rows = await fetch(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"rows": rows, "next_cursor": db.next_cursor(rows, limit)}
 
 # Authentication dependency
 async def get_current_user(authorization: Optional[str] = Header(None)):
@@ -49,7 +200,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
             raise HTTPException(status_code=401, detail="Invalid or expired token")
         
         user_id = payload.get("sub")
-        user = db.get_user_by_id(user_id)
+        user = await db.get_user_by_id(user_id)
         
         if not user or not user.get("is_active"):
             raise HTTPException(status_code=401, detail="User not found or inactive")
@@ -80,6 +231,10 @@ class TextToGestureRequest(BaseModel):
     text: str
     session_id: Optional[str] = None
 
+class BatchTextToGestureRequest(BaseModel):
+    texts: conlist(str, min_length=1, max_length=GESTURE_BATCH_MAX_TEXTS)
+    session_id: Optional[str] = None
+
 class AddPhraseRequest(BaseModel):
     text: str
     category: str
@@ -100,13 +255,31 @@ class ProcessFrameRequest(BaseModel):
 async def root():
     return {"status": "Communication Bridge AI is running", "version": "1.0.0"}
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and its event loop answers"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: warm-up finished and every vision worker is warm; 503 until then"""
+    body = {"warmup": dict(startup.warmup)}
+    ready = startup.ready
+    if vision_workers:
+        body["vision_workers"] = vision_workers.ready
+        ready = ready and vision_workers.ready
+    body["status"] = "ready" if ready else "warming_up"
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
 # Authentication Endpoints
 
 @app.post("/auth/signup")
 async def signup(request: SignupRequest):
     """Create a new user account"""
     # Check if user already exists
-    existing_user = db.get_user_by_email(request.email)
+    existing_user = await db.get_user_by_email(request.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -115,7 +288,7 @@ async def signup(request: SignupRequest):
     
     # Create user
     user_id = str(uuid.uuid4())
-    db.create_user(user_id, request.email, request.name, password_hash)
+    await db.create_user(user_id, request.email, request.name, password_hash)
     
     return {
         "message": "User created successfully",
@@ -131,7 +304,7 @@ async def signup(request: SignupRequest):
 async def login(request: LoginRequest):
     """Login and get access token"""
     # Get user
-    user = db.get_user_by_email(request.email)
+    user = await db.get_user_by_email(request.email)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
@@ -140,7 +313,7 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     # Update last login
-    db.update_last_login(user["id"])
+    await db.update_last_login(user["id"])
     
     # Create access token
     token = auth_handler.create_access_token({"sub": user["id"]})
@@ -172,7 +345,7 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 @app.get("/auth/credits")
 async def get_credits(current_user: dict = Depends(get_current_user)):
     """Get user's remaining credits"""
-    credits = db.get_user_credits(current_user["id"])
+    credits = await db.get_user_credits(current_user["id"])
     return {
         "credits": credits,
         "plan": current_user["plan"]
@@ -180,19 +353,19 @@ async def get_credits(current_user: dict = Depends(get_current_user)):
 
 @app.post("/simulate/start")
 async def start_simulation(current_user: dict = Depends(get_current_user)):
-    session_id = simulation.start_session()
+    session_id = await simulation.start_session()
     return {
         "session_id": session_id,
         "status": "started",
         "message": "Classroom simulation initialized",
-        "user_credits": db.get_user_credits(current_user["id"])
+        "user_credits": await db.get_user_credits(current_user["id"])
     }
 
 @app.post("/simulate/step")
 async def simulation_step(request: SimulationStepRequest, current_user: dict = Depends(get_current_user)):
     # Check if user has credits (unless they're on pro plan)
     if current_user["plan"] == "free":
-        credits = db.get_user_credits(current_user["id"])
+        credits = await db.get_user_credits(current_user["id"])
         if credits < 1:
             raise HTTPException(
                 status_code=402,
@@ -200,49 +373,151 @@ async def simulation_step(request: SimulationStepRequest, current_user: dict = D
             )
         
         # Use 1 credit
-        if not db.use_credits(current_user["id"], 1, request.session_id, "message"):
+        if not await db.use_credits(current_user["id"], 1, request.session_id, "message"):
             raise HTTPException(status_code=402, detail="Failed to deduct credits")
     
-    result = await simulation.process_step(request.session_id, request.input_text)
+    async with session_executor.turn(request.session_id):
+        result = await simulation.process_step(request.session_id, request.input_text)
     
     # Add remaining credits to response
-    remaining_credits = db.get_user_credits(current_user["id"])
+    remaining_credits = await db.get_user_credits(current_user["id"])
     result["user_credits"] = remaining_credits
     
     return result
 
 @app.post("/communicate")
 async def communicate(request: CommunicateRequest):
-    result = await coordinator.process_communication(
-        input_text=request.input_text,
-        user_type=request.user_type,
-        session_id=request.session_id
-    )
+    async with session_executor.turn(request.session_id):
+        result = await coordinator.process_communication(
+            input_text=request.input_text,
+            user_type=request.user_type,
+            session_id=request.session_id
+        )
     return result
 
 @app.get("/logs")
-async def get_logs(session_id: Optional[str] = None, limit: int = 50):
-    logs = db.get_agent_logs(session_id, limit)
-    return {"logs": logs}
+async def get_logs(
+    session_id: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_data: bool = True
+):
+    """Agent logs, newest first; include_data=false skips decoding the payloads"""
+    page = await paginate(lambda before: db.get_agent_logs(session_id, limit, before, include_data), limit, cursor)
+    return {"logs": page["rows"], "next_cursor": page["next_cursor"]}
 
 @app.get("/session/{session_id}")
-async def get_session(session_id: str):
-    session = db.get_session(session_id)
+async def get_session(session_id: str, limit: int = 50, cursor: Optional[str] = None):
+    session = await db.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    messages = db.get_messages(session_id)
-    return {"session": session, "messages": messages}
+    page = await paginate(lambda before: db.get_messages(session_id, limit, before), limit, cursor)
+    return {"session": session, "messages": page["rows"], "next_cursor": page["next_cursor"]}
+
+@app.get("/session/{session_id}/export")
+async def export_session(session_id: str, format: str = "ndjson", table: str = "all"):
+    """
+    Stream a session's full history, oldest first
+    
+    format: ndjson (one JSON object per line, tagged with its table) or csv
+    table: messages, agent_logs, gesture_sequences or all (ndjson only)
+    """
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    if table == "all":
+        if format == "csv":
+            raise HTTPException(status_code=400, detail="csv export needs a single table")
+        tables = list(Database.SESSION_TABLES)
+    elif table in Database.SESSION_TABLES:
+        tables = [table]
+    else:
+        raise HTTPException(status_code=400, detail=f"table must be one of {', '.join(Database.SESSION_TABLES)} or all")
+    
+    if not await db.get_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    def ndjson_rows() -> Iterator[str]:
+        for name in tables:
+            for row in db.iter_session_rows(name, session_id):
+                yield json.dumps({"table": name, **row}, ensure_ascii=False) + "\n"
+    
+    def csv_rows() -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = None
+        for row in db.iter_session_rows(tables[0], session_id):
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                writer.writeheader()
+            if "data" in row:
+                row = {**row, "data": json.dumps(row["data"], ensure_ascii=False)}
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    # Sync generators are iterated in the threadpool, off the event loop
+    if format == "csv":
+        return StreamingResponse(
+            csv_rows(),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="session-{session_id}-{tables[0]}.csv"'}
+        )
+    return StreamingResponse(
+        ndjson_rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="session-{session_id}.ndjson"'}
+    )
+
+@app.get("/startup/stats")
+async def get_startup_stats():
+    """Startup time and memory per subsystem, including lazily built ones"""
+    return {
+        **startup.get_stats(),
+        "loaded": {"vision": vision_service.loaded, "landmarks": landmark_recognizer.loaded, "video": video_analyzer.loaded},
+    }
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    """LLM call metrics: circuit state, retries, hedging, latency, coalescing, admission, prompt sizes, shared client"""
+    return {
+        **get_llm_resilience().get_stats(),
+        "coalescing": get_llm_singleflight().get_stats(),
+        "admission": get_llm_admission().get_stats(),
+        "prompts": get_prompt_metrics(),
+        "client": get_llm_client().get_stats() if LLM_PROVIDER == "gemini" else None
+    }
+
+@app.get("/rate-limit/stats")
+async def get_rate_limit_stats():
+    """Allowed and limited requests per endpoint class, and which bucket refused them"""
+    if not rate_limiter:
+        return {"enabled": False}
+    return {"enabled": True, **rate_limiter.get_stats()}
+
+@app.get("/sessions/stats")
+async def get_session_queue_stats():
+    """Per-session ordering: sessions with work pending, queue waits, rejected requests"""
+    return session_executor.get_stats()
+
+@app.get("/retention/stats")
+async def get_retention_stats():
+    """Result of the last retention pass"""
+    return {
+        "ttl_days": retention_service.ttl_days,
+        "archive_dir": retention_service.archive_dir or None,
+        "last_run": retention_service.last_run
+    }
 
 @app.get("/sessions")
-async def list_sessions(limit: int = 20):
-    sessions = db.get_recent_sessions(limit)
-    return {"sessions": sessions}
+async def list_sessions(limit: int = 20, cursor: Optional[str] = None):
+    page = await paginate(lambda before: db.get_recent_sessions(limit, before), limit, cursor)
+    return {"sessions": page["rows"], "next_cursor": page["next_cursor"]}
 
 @app.post("/save_message")
 async def save_message(request: SaveMessageRequest):
     """Save a message directly to the database (for verbal-to-nonverbal mode)"""
     try:
-        db.store_message(
+        await db.store_message(
             session_id=request.session_id,
             input_text=request.input_text,
             output_text=request.output_text,
@@ -259,11 +534,12 @@ async def save_message(request: SaveMessageRequest):
 async def translate_text_to_gesture(request: TextToGestureRequest):
     """Convert text to gesture sequence for non-verbal users"""
     try:
-        result = gesture_agent.text_to_gestures(request.text)
+        # Blocking (and possibly queued behind interactive LLM calls): keep it off the event loop
+        result = await asyncio.to_thread(gesture_agent.text_to_gestures, request.text)
         
         # Store in database if session provided
         if request.session_id:
-            db.store_gesture_sequence(
+            await db.store_gesture_sequence(
                 session_id=request.session_id,
                 source_text=request.text,
                 gesture_sequence=result["gesture_sequence"],
@@ -277,6 +553,34 @@ async def translate_text_to_gesture(request: TextToGestureRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/translate/text-to-gesture/batch")
+async def translate_text_to_gesture_batch(request: BatchTextToGestureRequest):
+    """Convert several texts to gesture sequences with at most one AI call"""
+    try:
+        results = await asyncio.to_thread(gesture_agent.texts_to_gestures, request.texts)
+        
+        # Store all translations in one insert if session provided
+        if request.session_id and results:
+            await db.store_gesture_sequences(
+                session_id=request.session_id,
+                sequences=[
+                    {
+                        "source_text": text,
+                        "gesture_sequence": result["gesture_sequence"],
+                        "method": result["method"]
+                    }
+                    for text, result in zip(request.texts, results)
+                ]
+            )
+        
+        return {
+            "success": True,
+            "count": len(results),
+            "results": results
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/gestures")
 async def get_gestures():
     """Get all available gestures"""
@@ -289,7 +593,7 @@ async def get_gestures():
 async def get_phrases(category: Optional[str] = None):
     """Get common phrases, optionally filtered by category"""
     # Get from database
-    db_phrases = db.get_phrases(category)
+    db_phrases = await db.get_phrases(category)
     
     # Also include built-in phrases
     common_phrases = gesture_agent.get_common_phrases()
@@ -304,7 +608,7 @@ async def get_phrases(category: Optional[str] = None):
 async def add_custom_phrase(request: AddPhraseRequest):
     """Add a custom phrase to the library"""
     try:
-        db.add_phrase(
+        await db.add_phrase(
             text=request.text,
             category=request.category,
             gesture_sequence=request.gesture_sequence,
@@ -315,17 +619,24 @@ async def add_custom_phrase(request: AddPhraseRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/gesture-history/{session_id}")
-async def get_gesture_history(session_id: str, limit: int = 50):
+async def get_gesture_history(session_id: str, limit: int = 50, cursor: Optional[str] = None):
     """Get gesture translation history for a session"""
-    history = db.get_gesture_sequences(session_id, limit)
-    return {"history": history}
+    page = await paginate(lambda before: db.get_gesture_sequences(session_id, limit, before), limit, cursor)
+    return {"history": page["rows"], "next_cursor": page["next_cursor"]}
 
 # Computer Vision Endpoints
 
+async def detect_gestures(frame: str, session_id: Optional[str]) -> Dict[str, Any]:
+    """Run a webcam frame through the vision workers if enabled, else in-process"""
+    if vision_workers:
+        return await vision_workers.process_frame(frame, session_id)
+    await ensure_loaded(vision_service)
+    return vision_service.process_frame(frame, session_id)
+
 @app.post("/vision/process-frame")
 async def process_frame(request: ProcessFrameRequest):
     """Process a webcam frame and detect gestures"""
-    result = vision_service.process_frame(request.frame)
+    result = await detect_gestures(request.frame, request.session_id)
     
     # If gestures detected and session provided, store them
     if request.session_id and result.get("emojis"):
@@ -334,11 +645,140 @@ async def process_frame(request: ProcessFrameRequest):
     
     return result
 
+@app.post("/vision/process-landmarks")
+async def process_landmarks(request: Request):
+    """
+    Detect gestures from hand landmarks tracked in the browser
+    
+    Body is a binary landmark packet (application/octet-stream) or its JSON
+    form; see services/landmark_packets.py.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            hands = hands_from_json(json.loads(body))
+        else:
+            hands = decode_landmark_packet(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await ensure_loaded(landmark_recognizer)
+    return landmark_recognizer.process_landmarks(hands)
+
+@app.websocket("/vision/landmarks/ws")
+async def landmarks_socket(websocket: WebSocket):
+    """Streaming form of /vision/process-landmarks: one result per packet, in order"""
+    await websocket.accept()
+    await ensure_loaded(landmark_recognizer)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                if message.get("bytes") is not None:
+                    hands = decode_landmark_packet(message["bytes"])
+                else:
+                    hands = hands_from_json(json.loads(message.get("text") or ""))
+                result = landmark_recognizer.process_landmarks(hands)
+            except ValueError as e:
+                result = {"error": str(e), "hands_detected": 0, "gestures": [], "emojis": []}
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/vision/stats")
+async def get_vision_stats():
+    """Frame processing cost, ROI tracking and write coalescing for repeated gesture messages"""
+    return {
+        "processing": vision_service.get_stats() if vision_service.loaded else None,
+        "landmarks": landmark_recognizer.get_stats() if landmark_recognizer.loaded else None,
+        "workers": vision_workers.get_stats() if vision_workers else None,
+        "message_coalescing": message_coalescer.get_stats(),
+        "utterances": utterance_segmenter.get_stats()
+    }
+
+def discard_file(out):
+    out.close()
+    os.remove(out.name)
+
+async def save_upload(upload: UploadFile) -> str:
+    """Stream an uploaded file to a temporary path (VideoCapture needs a file), writing on a thread"""
+    suffix = os.path.splitext(upload.filename or "")[1] or ".mp4"
+    limit = VIDEO_MAX_UPLOAD_MB * 1024 * 1024
+    size = 0
+    out = await asyncio.to_thread(tempfile.NamedTemporaryFile, suffix=suffix, delete=False)
+    try:
+        while chunk := await upload.read(1024 * 1024):
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {VIDEO_MAX_UPLOAD_MB} MB")
+            await asyncio.to_thread(out.write, chunk)
+        await asyncio.to_thread(out.close)
+    except BaseException:
+        await asyncio.to_thread(discard_file, out)
+        raise
+    return out.name
+
+async def read_uploads(uploads: List[UploadFile]) -> List[bytes]:
+    """Read uploaded files into memory, stopping as soon as together they exceed the upload limit"""
+    limit = VIDEO_MAX_UPLOAD_MB * 1024 * 1024
+    size = 0
+    contents = []
+    for upload in uploads:
+        chunks = []
+        while chunk := await upload.read(1024 * 1024):
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {VIDEO_MAX_UPLOAD_MB} MB")
+            chunks.append(chunk)
+        contents.append(b"".join(chunks))
+    return contents
+
+@app.post("/vision/analyze-video")
+async def analyze_video(
+    files: List[UploadFile] = File(...),
+    sample_fps: float = Form(VIDEO_SAMPLE_FPS),
+    current_user: dict = Depends(get_current_user)
+):
+    """Gesture timeline for each uploaded video clip (clips run in parallel)"""
+    if sample_fps < 0:
+        raise HTTPException(status_code=400, detail="sample_fps must not be negative")
+    paths = []
+    try:
+        for upload in files:
+            paths.append(await save_upload(upload))
+        await ensure_loaded(video_analyzer)
+        results = await video_analyzer.analyze_videos(paths, sample_fps)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        for path in paths:
+            await asyncio.to_thread(os.remove, path)
+    for upload, result in zip(files, results):
+        result["source"] = upload.filename
+    return {"clips": results}
+
+@app.post("/vision/analyze-frames")
+async def analyze_frames(
+    files: List[UploadFile] = File(...),
+    fps: float = Form(VIDEO_SAMPLE_FPS),
+    current_user: dict = Depends(get_current_user)
+):
+    """Gesture timeline for an ordered batch of image frames captured `fps` times a second"""
+    if fps <= 0:
+        raise HTTPException(status_code=400, detail="fps must be positive")
+    images = await read_uploads(files)
+    try:
+        await ensure_loaded(video_analyzer)
+        return await video_analyzer.analyze_images(images, fps)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/vision/gestures")
 async def get_supported_gestures():
     """Get list of supported gestures"""
     return {
-        "gestures": vision_service.get_supported_gestures()
+        "gestures": supported_gestures()
     }
 
 @app.post("/vision/gesture-to-text")
@@ -348,7 +788,7 @@ async def gesture_to_text(request: ProcessFrameRequest, current_user: dict = Dep
     Complete flow: Webcam → Gesture → Emoji → AI Response
     """
     # Process frame
-    vision_result = vision_service.process_frame(request.frame)
+    vision_result = await detect_gestures(request.frame, request.session_id)
     
     if not vision_result.get("emojis"):
         return {
@@ -361,11 +801,12 @@ async def gesture_to_text(request: ProcessFrameRequest, current_user: dict = Dep
     emoji_input = " ".join(vision_result["emojis"])
     
     # Process through communication pipeline
-    comm_result = await coordinator.process_communication(
-        input_text=emoji_input,
-        user_type="nonverbal",
-        session_id=request.session_id
-    )
+    async with session_executor.turn(request.session_id):
+        comm_result = await coordinator.process_communication(
+            input_text=emoji_input,
+            user_type="nonverbal",
+            session_id=request.session_id
+        )
     
     return {
         "success": True,
@@ -376,6 +817,32 @@ async def gesture_to_text(request: ProcessFrameRequest, current_user: dict = Dep
         "ai_response": comm_result.get("output", {}).get("text", "")
     }
 
+@app.post("/vision/utterance")
+async def gesture_utterance(request: ProcessFrameRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Continuous-capture form of /vision/gesture-to-text: gestures are collected
+    per session and the AI responds once per utterance, when the signer
+    pauses or shows a terminator gesture (UTTERANCE_TERMINATORS)
+    """
+    if not request.session_id:
+        raise HTTPException(status_code=400, detail="session_id is required")
+    vision_result = await detect_gestures(request.frame, request.session_id)
+    gesture_names = [g["gesture"] for g in vision_result.get("gestures", [])]
+    utterance = await utterance_segmenter.add_frame(request.session_id, gesture_names, vision_result.get("emojis", []))
+    comm_result = utterance.get("communication_result")
+    return {
+        **utterance,
+        "vision_result": vision_result,
+        "ai_response": comm_result.get("output", {}).get("text", "") if comm_result else None,
+        # Utterances closed while no frames arrived (capture stopped mid-sentence)
+        "completed": utterance_segmenter.take_results(request.session_id)
+    }
+
+@app.get("/vision/completed-utterances/{session_id}")
+async def completed_utterances(session_id: str, current_user: dict = Depends(get_current_user)):
+    """Utterances closed by the pause timeout after the last frame, not yet returned"""
+    return {"utterances": utterance_segmenter.take_results(session_id)}
+
 @app.post("/vision/interpret-gesture")
 async def interpret_gesture(request: ProcessFrameRequest, current_user: dict = Depends(get_current_user)):
     """
@@ -383,7 +850,7 @@ async def interpret_gesture(request: ProcessFrameRequest, current_user: dict = D
     Enhanced flow: Webcam → Gesture → Meaning → Contextual Response
     """
     # Process frame to detect gestures
-    vision_result = vision_service.process_frame(request.frame)
+    vision_result = await detect_gestures(request.frame, request.session_id)
     
     if not vision_result.get("gestures"):
         return {
@@ -405,13 +872,14 @@ async def interpret_gesture(request: ProcessFrameRequest, current_user: dict = D
     # Store in database if session provided
     if request.session_id:
         emoji_text = " ".join(vision_result["emojis"])
-        db.store_message(
-            session_id=request.session_id,
-            input_text=f"[Gesture] {', '.join(gesture_names)}",
-            output_text=interpretation["response"],
-            intent="gesture_interpretation",
-            confidence=vision_result.get("confidence", 0.0)
-        )
+        async with session_executor.turn(request.session_id):
+            await message_coalescer.store_message(
+                session_id=request.session_id,
+                input_text=f"[Gesture] {', '.join(gesture_names)}",
+                output_text=interpretation["response"],
+                intent="gesture_interpretation",
+                confidence=vision_result.get("confidence", 0.0)
+            )
     
     return {
         "success": True,
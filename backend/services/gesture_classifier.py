@@ -0,0 +1,427 @@
+"""
+Gesture Classifier
+Small NumPy-only MLP over normalized hand landmarks, trained with
+train_gesture_classifier.py and used in place of the hand-written threshold
+rules when a model file exists. Both run on landmarks alone, so gestures
+from client-side hand tracking are recognized without OpenCV or MediaPipe
+"""
+import os
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import GESTURE_MIN_CONFIDENCE, GESTURE_MODEL_PATH
+
+# MediaPipe hand landmark indices
+WRIST = 0
+THUMB_IP = 3
+THUMB_TIP = 4
+INDEX_FINGER_PIP = 6
+INDEX_FINGER_TIP = 8
+MIDDLE_FINGER_MCP = 9
+MIDDLE_FINGER_PIP = 10
+MIDDLE_FINGER_TIP = 12
+RING_FINGER_PIP = 14
+RING_FINGER_TIP = 16
+PINKY_PIP = 18
+PINKY_TIP = 20
+NUM_LANDMARKS = 21
+
+# Label for recorded samples that show no supported gesture
+NO_GESTURE = "none"
+
+# Recognized gestures and the emoji each one is sent to the agents as
+GESTURE_EMOJIS = {
+    "wave": "👋",
+    "thumbs_up": "👍",
+    "thumbs_down": "👎",
+    "peace": "✌️",
+    "ok": "👌",
+    "pointing_up": "☝️",
+    "fist": "✊",
+    "open_palm": "🖐️",
+    "raised_hand": "🙋",
+    "stop": "✋",
+    "i_love_you": "🤟",  # ILY sign - pinky, index, and thumb extended
+    "call_me": "🤙",  # Shaka/call me sign - thumb and pinky extended
+    "rock_on": "🤘",  # Rock on sign - index and pinky extended
+    "crossed_fingers": "🤞",  # Crossed fingers - index and middle crossed
+    "pinch": "🤏",  # Pinching gesture - thumb and index close
+    "three": "🖖",  # Vulcan salute or number three
+    "pray": "🙏",  # Praying hands - palms together
+    "clap": "👏"  # Clapping - two open palms
+}
+
+
+def supported_gestures() -> List[Dict[str, str]]:
+    """Gesture names and emojis, without loading OpenCV or MediaPipe"""
+    return [{"gesture": gesture, "emoji": emoji} for gesture, emoji in GESTURE_EMOJIS.items()]
+
+
+class _Point:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x: float, y: float, z: float):
+        self.x, self.y, self.z = x, y, z
+
+
+class LandmarkArray:
+    """21x3 array exposed like MediaPipe's NormalizedLandmarkList (`.landmark[i].x`)"""
+
+    def __init__(self, points: np.ndarray):
+        self.landmark = [_Point(float(x), float(y), float(z)) for x, y, z in points]
+
+
+def landmarks_to_array(hand_landmarks) -> np.ndarray:
+    """MediaPipe landmark list -> float32 array of shape (21, 3)"""
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32)
+
+
+def landmark_features(points: np.ndarray, hand_label: str = "Right") -> np.ndarray:
+    """
+    Position-, scale- and rotation-normalized features for one hand
+
+    Landmarks are taken relative to the wrist, left hands are mirrored onto
+    right ones, and the hand is rotated so the wrist -> middle knuckle axis
+    points up and scaled so that axis has length 1. The axis direction is
+    appended as (cos, sin) so gestures that differ only by orientation
+    (thumbs up / thumbs down) stay separable.
+    """
+    p = np.asarray(points, dtype=np.float32).reshape(NUM_LANDMARKS, 3)
+    p = p - p[WRIST]
+    if hand_label == "Left":
+        p = p * np.array([-1.0, 1.0, 1.0], dtype=np.float32)
+    axis = p[MIDDLE_FINGER_MCP, :2]
+    scale = float(np.hypot(axis[0], axis[1])) or 1e-6
+    cos, sin = axis / scale
+    # Rotation taking (cos, sin) to (0, -1), i.e. "up" in image coordinates
+    rotation = np.array([[-sin, cos], [-cos, -sin]], dtype=np.float32)
+    xy = (p[1:, :2] @ rotation.T) / scale
+    return np.concatenate([xy.ravel(), p[1:, 2] / scale, [cos, sin]]).astype(np.float32)
+
+
+class GestureClassifier:
+    """
+    One-hidden-layer MLP (ReLU, softmax) over landmark_features
+
+    Predictions below `min_confidence`, or of the "none" class, are reported
+    as no gesture, like the rules returning None.
+    """
+
+    def __init__(
+        self,
+        classes: Sequence[str],
+        mean: np.ndarray,
+        std: np.ndarray,
+        w1: np.ndarray,
+        b1: np.ndarray,
+        w2: np.ndarray,
+        b2: np.ndarray,
+        min_confidence: float = GESTURE_MIN_CONFIDENCE
+    ):
+        self.classes = list(classes)
+        # Input standardization folded into the first layer
+        self.w1 = (w1 / std[:, None]).astype(np.float32)
+        self.b1 = (b1 - (mean / std) @ w1).astype(np.float32)
+        self.w2 = w2.astype(np.float32)
+        self.b2 = b2.astype(np.float32)
+        self._params = {"mean": mean, "std": std, "w1": w1, "b1": b1, "w2": w2, "b2": b2}
+        self.min_confidence = min_confidence
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities for one feature vector or a batch of them"""
+        hidden = np.maximum(features @ self.w1 + self.b1, 0.0)
+        logits = hidden @ self.w2 + self.b2
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict(self, points: np.ndarray, hand_label: str = "Right") -> Tuple[Optional[str], float]:
+        """(gesture or None, probability) for one hand's (21, 3) landmarks"""
+        proba = self.predict_proba(landmark_features(points, hand_label))
+        best = int(proba.argmax())
+        gesture = self.classes[best]
+        if gesture == NO_GESTURE or proba[best] < self.min_confidence:
+            return None, float(proba[best])
+        return gesture, float(proba[best])
+
+    @classmethod
+    def train(
+        cls,
+        features: np.ndarray,
+        labels: Sequence[str],
+        hidden: int = 32,
+        epochs: int = 400,
+        learning_rate: float = 0.01,
+        weight_decay: float = 1e-4,
+        seed: int = 0
+    ) -> "GestureClassifier":
+        """Full-batch Adam on softmax cross-entropy"""
+        rng = np.random.default_rng(seed)
+        classes = sorted(set(labels))
+        y = np.array([classes.index(label) for label in labels])
+        mean = features.mean(axis=0)
+        std = features.std(axis=0) + 1e-6
+        x = (features - mean) / std
+        n, d = x.shape
+        targets = np.eye(len(classes))[y]
+
+        params = {
+            "w1": rng.normal(0, np.sqrt(2.0 / d), (d, hidden)),
+            "b1": np.zeros(hidden),
+            "w2": rng.normal(0, np.sqrt(1.0 / hidden), (hidden, len(classes))),
+            "b2": np.zeros(len(classes)),
+        }
+        moments = {k: (np.zeros_like(v), np.zeros_like(v)) for k, v in params.items()}
+        beta1, beta2 = 0.9, 0.999
+
+        for step in range(1, epochs + 1):
+            pre = x @ params["w1"] + params["b1"]
+            h = np.maximum(pre, 0.0)
+            logits = h @ params["w2"] + params["b2"]
+            logits -= logits.max(axis=1, keepdims=True)
+            proba = np.exp(logits)
+            proba /= proba.sum(axis=1, keepdims=True)
+
+            d_logits = (proba - targets) / n
+            d_h = d_logits @ params["w2"].T
+            d_h[pre <= 0] = 0.0
+            grads = {
+                "w1": x.T @ d_h + weight_decay * params["w1"],
+                "b1": d_h.sum(axis=0),
+                "w2": h.T @ d_logits + weight_decay * params["w2"],
+                "b2": d_logits.sum(axis=0),
+            }
+            for k, g in grads.items():
+                m, v = moments[k]
+                m[:] = beta1 * m + (1 - beta1) * g
+                v[:] = beta2 * v + (1 - beta2) * g * g
+                m_hat = m / (1 - beta1 ** step)
+                v_hat = v / (1 - beta2 ** step)
+                params[k] -= learning_rate * m_hat / (np.sqrt(v_hat) + 1e-8)
+
+        return cls(classes, mean, std, **params)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, classes=np.array(self.classes), **self._params)
+
+    @classmethod
+    def load(cls, path: str, min_confidence: float = GESTURE_MIN_CONFIDENCE) -> "GestureClassifier":
+        with np.load(path) as data:
+            return cls(
+                [str(c) for c in data["classes"]],
+                data["mean"], data["std"], data["w1"], data["b1"], data["w2"], data["b2"],
+                min_confidence=min_confidence
+            )
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "classes": [c for c in self.classes if c != NO_GESTURE],
+            "hidden_units": self.w1.shape[1],
+            "min_confidence": self.min_confidence,
+        }
+
+
+def load_classifier(path: str) -> Optional[GestureClassifier]:
+    """The trained model at `path`, or None (rule-based gestures) if there is none"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return GestureClassifier.load(path)
+    except Exception as e:
+        print(f"⚠ Could not load gesture model {path}: {e}")
+        return None
+
+
+def features_for(samples: List[Dict[str, Any]]) -> np.ndarray:
+    """Feature matrix for recorded samples ({"landmarks": [[x, y, z] * 21], "hand": ...})"""
+    return np.stack([
+        landmark_features(np.array(s["landmarks"], dtype=np.float32), s.get("hand", "Right"))
+        for s in samples
+    ])
+
+
+def _distance(point1, point2) -> float:
+    """Euclidean distance between two landmarks"""
+    return float(np.sqrt(
+        (point1.x - point2.x) ** 2 +
+        (point1.y - point2.y) ** 2 +
+        (point1.z - point2.z) ** 2
+    ))
+
+
+def count_fingers_up(landmarks) -> Dict[str, bool]:
+    """Which fingers are extended (tip above the PIP joint; the thumb is checked horizontally)"""
+    lm = landmarks.landmark
+    return {
+        "thumb": lm[THUMB_TIP].x < lm[THUMB_IP].x - 0.05 or lm[THUMB_TIP].x > lm[THUMB_IP].x + 0.05,
+        "index": lm[INDEX_FINGER_TIP].y < lm[INDEX_FINGER_PIP].y,
+        "middle": lm[MIDDLE_FINGER_TIP].y < lm[MIDDLE_FINGER_PIP].y,
+        "ring": lm[RING_FINGER_TIP].y < lm[RING_FINGER_PIP].y,
+        "pinky": lm[PINKY_TIP].y < lm[PINKY_PIP].y
+    }
+
+
+def rule_gesture(landmarks, hand_label: str = "Right") -> Optional[str]:
+    """
+    Hand-written threshold rules
+
+    Args:
+        landmarks: MediaPipe hand landmarks, or a LandmarkArray
+        hand_label: "Left" or "Right"
+
+    Returns:
+        Gesture name or None
+    """
+    lm = landmarks.landmark
+    thumb_tip, thumb_ip = lm[THUMB_TIP], lm[THUMB_IP]
+    index_tip, middle_tip = lm[INDEX_FINGER_TIP], lm[MIDDLE_FINGER_TIP]
+    ring_tip, pinky_tip = lm[RING_FINGER_TIP], lm[PINKY_TIP]
+    wrist = lm[WRIST]
+
+    fingers_up = count_fingers_up(landmarks)
+    thumb, index, middle, ring, pinky = (
+        fingers_up["thumb"], fingers_up["index"], fingers_up["middle"], fingers_up["ring"], fingers_up["pinky"]
+    )
+
+    # Thumbs up: thumb up, other fingers down
+    if thumb and not any([index, middle, ring, pinky]):
+        return "thumbs_up"
+
+    # Thumbs down: thumb down, other fingers curled
+    if not thumb and thumb_tip.y > thumb_ip.y and not any([index, middle, ring, pinky]):
+        return "thumbs_down"
+
+    # Peace sign: index and middle up, others down
+    if index and middle and not ring and not pinky:
+        return "peace"
+
+    # OK sign: thumb and index forming a circle
+    if _distance(thumb_tip, index_tip) < 0.05 and middle and ring and pinky:
+        return "ok"
+
+    # Pointing up: only index finger up
+    if index and not any([middle, ring, pinky]):
+        return "pointing_up"
+
+    # Fist: all fingers down
+    if not any(fingers_up.values()):
+        return "fist"
+
+    # I Love You sign: thumb, index and pinky up (middle and ring down)
+    if thumb and index and pinky and not middle and not ring:
+        return "i_love_you"
+
+    # Call me / Shaka: thumb and pinky up (others down)
+    if thumb and pinky and not any([index, middle, ring]):
+        return "call_me"
+
+    # Rock on: index and pinky up (thumb, middle, ring down)
+    if index and pinky and not thumb and not middle and not ring:
+        return "rock_on"
+
+    # Three fingers / Vulcan salute: index, middle, ring up
+    if index and middle and ring and not pinky:
+        return "three"
+
+    # Pinch: thumb and index very close together, others down
+    if _distance(thumb_tip, index_tip) < 0.03 and not any([middle, ring, pinky]):
+        return "pinch"
+
+    # Open palm / Stop: all fingers up
+    if all([thumb, index, middle, ring, pinky]):
+        # Raised hand if the fingers are well above the wrist
+        avg_finger_y = (index_tip.y + middle_tip.y + ring_tip.y + pinky_tip.y) / 4
+        if avg_finger_y < wrist.y - 0.1:
+            return "raised_hand"
+        return "open_palm"
+
+    # Wave: open palm with horizontal movement (detected over multiple frames)
+    # For now, just detect open palm
+    if all([index, middle, ring, pinky]):
+        return "wave"
+
+    return None
+
+
+class LandmarkRecognizer:
+    """
+    Gestures from hand landmarks: the trained classifier if one is loaded,
+    else the hand-written rules
+
+    Needs only NumPy, so landmarks tracked in the browser are served without
+    OpenCV or MediaPipe; VisionService uses it for the hands MediaPipe finds.
+    """
+
+    def __init__(self, classifier_path: str = GESTURE_MODEL_PATH):
+        """
+        Args:
+            classifier_path: trained landmark classifier; the rules are used
+                when the file does not exist ("" forces them)
+        """
+        self.classifier = load_classifier(classifier_path)
+        self.stats = {"landmark_frames": 0, "hands": 0}
+
+    def recognize(self, landmarks, hand_label: str, score: float) -> Tuple[Optional[str], float]:
+        """
+        (gesture or None, confidence) for one hand
+
+        landmarks is a (21, 3) array or a MediaPipe landmark list; the
+        confidence is the model's probability, or the handedness score for
+        the rules.
+        """
+        if self.classifier:
+            if not isinstance(landmarks, np.ndarray):
+                landmarks = landmarks_to_array(landmarks)
+            return self.classifier.predict(landmarks, hand_label)
+        if isinstance(landmarks, np.ndarray):
+            landmarks = LandmarkArray(landmarks)
+        return rule_gesture(landmarks, hand_label), score
+
+    def gesture_result(self, hands: List[Tuple[Any, str, float]]) -> Dict[str, Any]:
+        """Gestures and emojis for (landmarks, hand label, handedness score) per hand"""
+        gestures = []
+        emojis = []
+        for landmarks, hand_label, score in hands:
+            gesture, confidence = self.recognize(landmarks, hand_label, score)
+            if gesture:
+                gestures.append({
+                    "gesture": gesture,
+                    "hand": hand_label,
+                    "confidence": confidence
+                })
+                emoji = GESTURE_EMOJIS.get(gesture, "")
+                if emoji:
+                    emojis.append(emoji)
+
+        return {
+            "hands_detected": len(hands),
+            "gestures": gestures,
+            "emojis": emojis,
+            "confidence": sum(g["confidence"] for g in gestures) / len(gestures) if gestures else 0.0
+        }
+
+    def process_landmarks(self, hands: List[Tuple[str, np.ndarray, float]]) -> Dict[str, Any]:
+        """
+        Recognize gestures from client-side hand tracking
+
+        Args:
+            hands: (hand label, (21, 3) normalized landmarks, handedness score),
+                as decoded by services.landmark_packets
+        """
+        self.stats["landmark_frames"] += 1
+        self.stats["hands"] += len(hands)
+        return self.gesture_result([(points, label, score) for label, points, score in hands])
+
+    def warm_up(self):
+        """Run the model once so the first real hand does not pay for it"""
+        if self.classifier:
+            self.classifier.predict(np.zeros((NUM_LANDMARKS, 3), dtype=np.float32))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "gesture_model": self.classifier.describe() if self.classifier else "rules",
+        }
@@ -0,0 +1,89 @@
+"""
+Landmark Packets
+Wire formats for clients that run hand tracking themselves (e.g. MediaPipe in
+the browser) and send only keypoints instead of webcam images
+
+Binary packet (little-endian, 2 + 260 bytes per hand):
+    uint8   version (1)
+    uint8   number of hands
+    per hand:
+        uint8    handedness (0 = Left, 1 = Right)
+        3 bytes  padding
+        float32  handedness score
+        float32  landmarks[21][3]   normalized x, y, z as MediaPipe reports them
+
+JSON equivalent:
+    {"hands": [{"hand": "Right", "score": 0.98, "landmarks": [[x, y, z], ...]}]}
+    (landmarks may also be a flat list of 63 numbers)
+"""
+from typing import Any, List, Tuple
+
+import numpy as np
+
+PACKET_VERSION = 1
+MAX_HANDS = 4
+HAND_LABELS = ("Left", "Right")
+
+HAND_RECORD = np.dtype([
+    ("hand", "u1"),
+    ("pad", "V3"),
+    ("score", "<f4"),
+    ("landmarks", "<f4", (21, 3)),
+])
+
+# (hand label, (21, 3) landmarks, handedness score)
+Hand = Tuple[str, np.ndarray, float]
+
+
+def decode_landmark_packet(data: bytes) -> List[Hand]:
+    """Hands from a binary landmark packet; ValueError if it is malformed"""
+    if len(data) < 2 or data[0] != PACKET_VERSION:
+        raise ValueError("Unsupported landmark packet")
+    count = data[1]
+    if count > MAX_HANDS or len(data) != 2 + count * HAND_RECORD.itemsize:
+        raise ValueError(f"Landmark packet size does not match {count} hands")
+    records = np.frombuffer(data, HAND_RECORD, count=count, offset=2)
+    hands = []
+    for record in records:
+        if record["hand"] > 1 or not np.isfinite(record["landmarks"]).all():
+            raise ValueError("Invalid hand record")
+        hands.append((HAND_LABELS[record["hand"]], record["landmarks"], float(record["score"])))
+    return hands
+
+
+def encode_landmark_packet(hands: List[Hand]) -> bytes:
+    """Binary packet for hands (what a client sends; used by tests and tools)"""
+    records = np.zeros(len(hands), HAND_RECORD)
+    for record, (label, points, score) in zip(records, hands):
+        record["hand"] = HAND_LABELS.index(label)
+        record["score"] = score
+        record["landmarks"] = np.asarray(points, dtype=np.float32).reshape(21, 3)
+    return bytes([PACKET_VERSION, len(hands)]) + records.tobytes()
+
+
+def hands_from_json(payload: Any) -> List[Hand]:
+    """Hands from the JSON form (as parsed by json.loads); ValueError if it is malformed"""
+    if not isinstance(payload, dict):
+        raise ValueError("Landmark JSON must be an object with a 'hands' list")
+    hands = payload.get("hands")
+    if not isinstance(hands, list) or len(hands) > MAX_HANDS:
+        raise ValueError(f"'hands' must be a list of at most {MAX_HANDS} hands")
+    parsed = []
+    for hand in hands:
+        if not isinstance(hand, dict):
+            raise ValueError("Each hand must be an object")
+        label = hand.get("hand", "Right")
+        if label not in HAND_LABELS:
+            raise ValueError("'hand' must be Left or Right")
+        try:
+            points = np.asarray(hand["landmarks"], dtype=np.float32).reshape(21, 3)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("'landmarks' must hold 21 x, y, z points")
+        if not np.isfinite(points).all():
+            raise ValueError("Invalid landmark values")
+        try:
+            score = float(hand.get("score", 1.0))
+        except (TypeError, ValueError):
+            raise ValueError("'score' must be a number")
+        parsed.append((label, points, score))
+    return parsed
@@ -0,0 +1,288 @@
+"""
+LLM Admission
+Schedules LLM calls onto a fixed number of slots by priority (interactive
+before background) and reports overload (calls in flight and how long
+interactive calls queue), so the Coordinator can serve new requests from its
+rule-based paths instead of queueing them behind Gemini
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, Optional
+
+from config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_QUEUE_TIMEOUT_MS,
+    LLM_DEGRADE_IN_FLIGHT,
+    LLM_DEGRADE_QUEUE_WAIT_MS,
+    LLM_DEGRADE_WINDOW_S,
+    LLM_BACKGROUND_SHARE,
+    LLM_BACKGROUND_MAX_WAIT_MS,
+    LLM_BACKGROUND_QUEUE_TIMEOUT_MS,
+)
+from services.llm_provider import LLMError
+
+INTERACTIVE = "interactive"  # someone is waiting on the answer
+BACKGROUND = "background"    # can wait: nobody blocks on it, e.g. batch translation
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run the LLM calls made inside this block (and the tasks and threads it starts) at `priority`"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {PRIORITIES}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class LLMOverloadedError(LLMError):
+    """Raised when a call waited too long for a free LLM slot"""
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued", "granted", "wake")
+
+    def __init__(self, priority: str, wake: Callable[[], None]):
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.wake = wake
+
+
+class LLMAdmission:
+    """
+    Priority scheduler for LLM call slots, and the overload signal
+
+    At most `max_concurrency` calls run at once. A freed slot goes to the
+    oldest waiting interactive call; background calls only get slots no
+    interactive call is waiting for, and never hold more than
+    `background_share` of them, so interactive calls always find headroom.
+    Starvation protection: a background call that has waited
+    `background_max_wait_ms` goes ahead of interactive ones (still within
+    its share). A call that gets no slot within its class's queue timeout
+    fails with LLMOverloadedError, so the agent falls back.
+
+    Blocking calls wait on the same queues from worker threads. On the event
+    loop thread they cannot wait (the slot could only be freed by the loop
+    they block) and fail at once when no slot is free.
+
+    `overloaded()` looks at interactive work only: true while
+    `degrade_in_flight` or more calls are running or waiting interactively,
+    or while interactive calls admitted in the last `window_s` seconds (or
+    the oldest one still waiting) queued `degrade_queue_wait_ms` on average.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        queue_timeout_ms: float = LLM_QUEUE_TIMEOUT_MS,
+        degrade_in_flight: int = LLM_DEGRADE_IN_FLIGHT,
+        degrade_queue_wait_ms: float = LLM_DEGRADE_QUEUE_WAIT_MS,
+        window_s: float = LLM_DEGRADE_WINDOW_S,
+        background_share: float = LLM_BACKGROUND_SHARE,
+        background_max_wait_ms: float = LLM_BACKGROUND_MAX_WAIT_MS,
+        background_queue_timeout_ms: float = LLM_BACKGROUND_QUEUE_TIMEOUT_MS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.background_slots = max(1, int(max_concurrency * background_share))
+        self.background_max_wait = background_max_wait_ms / 1000.0
+        self.queue_timeouts = {
+            INTERACTIVE: queue_timeout_ms / 1000.0,
+            BACKGROUND: background_queue_timeout_ms / 1000.0,
+        }
+        self.degrade_in_flight = degrade_in_flight
+        self.degrade_queue_wait = degrade_queue_wait_ms / 1000.0
+        self.window_s = window_s
+        self._lock = threading.Lock()
+        self._running = {priority: 0 for priority in PRIORITIES}
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        # (admitted_at, seconds waited) per class
+        self._waits = {priority: deque(maxlen=1000) for priority in PRIORITIES}
+        self.stats = {
+            priority: {"admitted": 0, "queued": 0, "queue_timeouts": 0, "promoted": 0}
+            for priority in PRIORITIES
+        }
+        self.degraded_requests = 0
+
+    # Scheduling (all under self._lock)
+
+    def _may_run(self, priority: str) -> bool:
+        if sum(self._running.values()) >= self.max_concurrency:
+            return False
+        return priority == INTERACTIVE or self._running[BACKGROUND] < self.background_slots
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        background = self._queues[BACKGROUND]
+        background_ok = bool(background) and self._may_run(BACKGROUND)
+        if background_ok and time.monotonic() - background[0].enqueued >= self.background_max_wait:
+            self.stats[BACKGROUND]["promoted"] += 1
+            return background.popleft()
+        if self._queues[INTERACTIVE] and self._may_run(INTERACTIVE):
+            return self._queues[INTERACTIVE].popleft()
+        if background_ok and not self._queues[INTERACTIVE]:
+            return background.popleft()
+        return None
+
+    def _grant(self, priority: str, waited: float):
+        self._running[priority] += 1
+        self._waits[priority].append((time.monotonic(), waited))
+        self.stats[priority]["admitted"] += 1
+
+    def _dispatch(self):
+        while True:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            waiter.granted = True
+            self._grant(waiter.priority, time.monotonic() - waiter.enqueued)
+            waiter.wake()
+
+    def _try_now(self, priority: str) -> bool:
+        """Take a slot without queueing, if nobody of this or a higher class is waiting"""
+        ahead = self._queues[INTERACTIVE] or (priority == BACKGROUND and self._queues[BACKGROUND])
+        if not ahead and self._may_run(priority):
+            self._grant(priority, 0.0)
+            return True
+        return False
+
+    def _enqueue(self, priority: str, wake: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(priority, wake)
+        self._queues[priority].append(waiter)
+        self.stats[priority]["queued"] += 1
+        return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Remove a waiter that gave up; True if it had been granted a slot meanwhile"""
+        if waiter.granted:
+            return True
+        self._queues[waiter.priority].remove(waiter)
+        self.stats[waiter.priority]["queue_timeouts"] += 1
+        return False
+
+    def _release(self, priority: str):
+        with self._lock:
+            self._running[priority] -= 1
+            self._dispatch()
+
+    def _timed_out(self, priority: str) -> LLMOverloadedError:
+        return LLMOverloadedError(
+            f"No LLM slot free for {priority} call within {self.queue_timeouts[priority] * 1000:.0f} ms"
+        )
+
+    # Public API
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None):
+        """Hold an LLM call slot (priority defaults to the current llm_priority)"""
+        priority = priority or current_priority()
+        loop = asyncio.get_running_loop()
+        future = None
+        with self._lock:
+            if not self._try_now(priority):
+                future = loop.create_future()
+                waiter = self._enqueue(
+                    priority,
+                    lambda: loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+                )
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, self.queue_timeouts[priority])
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with self._lock:
+                    granted = self._abandon(waiter)
+                if granted:
+                    self._release(priority)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                raise self._timed_out(priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    @contextmanager
+    def slot_blocking(self, priority: Optional[str] = None):
+        """Blocking variant of slot(), for calls made from worker threads"""
+        priority = priority or current_priority()
+        try:
+            asyncio.get_running_loop()
+            on_loop = True
+        except RuntimeError:
+            on_loop = False
+        event = threading.Event()
+        with self._lock:
+            admitted = self._try_now(priority)
+            if not admitted:
+                if on_loop:
+                    self.stats[priority]["queue_timeouts"] += 1
+                    raise LLMOverloadedError("No LLM slot free and blocking calls cannot wait on the event loop")
+                waiter = self._enqueue(priority, event.set)
+        if not admitted and not event.wait(self.queue_timeouts[priority]):
+            with self._lock:
+                granted = self._abandon(waiter)
+            if not granted:
+                raise self._timed_out(priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def queue_wait(self, priority: str = INTERACTIVE) -> float:
+        """Mean queue wait (seconds) of a class over the window, counting calls still waiting"""
+        now = time.monotonic()
+        with self._lock:
+            waits = self._waits[priority]
+            while waits and now - waits[0][0] > self.window_s:
+                waits.popleft()
+            samples = [waited for _, waited in waits]
+            samples.extend(now - waiter.enqueued for waiter in self._queues[priority])
+        return sum(samples) / len(samples) if samples else 0.0
+
+    @property
+    def in_flight(self) -> int:
+        """Calls running plus interactive calls waiting for a slot"""
+        return sum(self._running.values()) + len(self._queues[INTERACTIVE])
+
+    def overloaded(self) -> bool:
+        return self.in_flight >= self.degrade_in_flight or self.queue_wait() >= self.degrade_queue_wait
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "background_slots": self.background_slots,
+            "overloaded": self.overloaded(),
+            "degraded_requests": self.degraded_requests,
+            "classes": {
+                priority: {
+                    **self.stats[priority],
+                    "running": self._running[priority],
+                    "waiting": len(self._queues[priority]),
+                    "queue_wait_ms": round(self.queue_wait(priority) * 1000, 1),
+                }
+                for priority in PRIORITIES
+            },
+        }
+
+
+_shared_admission: Optional[LLMAdmission] = None
+
+
+def get_llm_admission() -> LLMAdmission:
+    """Process-wide LLM call scheduler"""
+    global _shared_admission
+    if _shared_admission is None:
+        _shared_admission = LLMAdmission()
+    return _shared_admission
@@ -0,0 +1,129 @@
+"""
+LLM Client
+The one Gemini client shared by every agent: configures the SDK, picks the
+model and opens the connection once per process, and holds each agent's
+generation settings
+"""
+import threading
+from typing import Dict, Any, List, Optional
+
+from config import (
+    GEMINI_API_KEY,
+    LLM_MODEL,
+    LLM_FALLBACK_MODELS,
+    LLM_TRANSPORT,
+    LLM_CALL_TIMEOUT_S,
+    LLM_GENERATION_CONFIGS,
+    LLM_MAX_OUTPUT_TOKENS_SCALE,
+)
+from services.llm_provider import LLMError
+
+
+def _resource_name(model_name: str) -> str:
+    return model_name if model_name.startswith("models/") else f"models/{model_name}"
+
+
+class LLMClient:
+    """
+    Process-wide Gemini configuration and connection
+
+    The SDK keeps one transport per service for the whole process (an HTTP/2
+    channel with gRPC, a keep-alive session with REST); every agent's
+    GenerativeModel goes through it, so the agents share one connection
+    instead of each configuring and probing the SDK on its own.
+    """
+
+    def __init__(
+        self,
+        api_key: str = GEMINI_API_KEY,
+        model_names: Optional[List[str]] = None,
+        transport: str = LLM_TRANSPORT,
+        generation_configs: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        self.api_key = api_key
+        self.model_names = model_names or [LLM_MODEL] + [m for m in LLM_FALLBACK_MODELS if m != LLM_MODEL]
+        self.transport = transport
+        self.generation_configs = LLM_GENERATION_CONFIGS if generation_configs is None else generation_configs
+        self.model_name: Optional[str] = None
+        self._genai = None
+        self._warm = False
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._genai is not None
+
+    def connect(self):
+        """Import and configure the SDK and select the model (once; blocking)"""
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key, transport=self.transport)
+                    self.model_name = self._select_model(genai)
+                    self._genai = genai
+                    print(f"✓ LLM client: {self.model_name} over {self.transport}")
+        return self._genai
+
+    def _select_model(self, genai) -> str:
+        """First configured model the key can use"""
+        from google.api_core import exceptions
+
+        for model_name in self.model_names:
+            try:
+                genai.get_model(_resource_name(model_name), request_options=self.request_options())
+                return model_name
+            except exceptions.NotFound:
+                continue
+            except Exception as e:
+                # Offline or key rejected: keep the preferred model, calls report the error
+                print(f"⚠ Could not look up Gemini model {model_name}: {e}")
+                return model_name
+        raise LLMError(f"None of the Gemini models {', '.join(self.model_names)} is available")
+
+    def request_options(self) -> Dict[str, Any]:
+        """
+        Per-call SDK options: bounded by LLM_CALL_TIMEOUT_S and never retried
+        by the SDK, whose default policy keeps retrying for a minute when the
+        API is unreachable. Retries and deadlines belong to llm_resilience.
+        """
+        return {"timeout": LLM_CALL_TIMEOUT_S, "retry": None}
+
+    def generation_config(self, agent_name: str) -> Dict[str, Any]:
+        """Generation settings for an agent ({} = model defaults)"""
+        config = dict(self.generation_configs.get(agent_name, {}))
+        if "max_output_tokens" in config:
+            config["max_output_tokens"] = max(1, int(config["max_output_tokens"] * LLM_MAX_OUTPUT_TOKENS_SCALE))
+        return config
+
+    def model(self, agent_name: str):
+        """GenerativeModel with the agent's generation settings, on the shared transport"""
+        genai = self.connect()
+        return genai.GenerativeModel(self.model_name, generation_config=self.generation_config(agent_name) or None)
+
+    def warm_up(self):
+        """Open the generation connection ahead of the first call (token count only, nothing is generated)"""
+        genai = self.connect()
+        if not self._warm:
+            genai.GenerativeModel(self.model_name).count_tokens("warm-up", request_options=self.request_options())
+            self._warm = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "transport": self.transport,
+            "connected": self.connected,
+            "warm": self._warm,
+            "generation": {name: self.generation_config(name) for name in self.generation_configs},
+        }
+
+
+_shared_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide Gemini client"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = LLMClient()
+    return _shared_client
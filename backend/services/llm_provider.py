@@ -0,0 +1,467 @@
+"""
+LLM Provider
+Model-provider abstraction used by all agents, with a Gemini backend and a
+local deterministic stub for offline and performance testing
+"""
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Any, Optional, List, Tuple, Union, Callable, Iterator, AsyncIterator
+
+from config import (
+    GEMINI_API_KEY,
+    LLM_PROVIDER,
+    LLM_STUB_LATENCY_MS,
+    LLM_STUB_JITTER_MS,
+    LLM_STUB_ERROR_RATE,
+    LLM_STUB_ERROR_KIND,
+    LLM_STUB_SEED,
+    LLM_GENERATION_CONFIGS,
+)
+from services.prompt_templates import estimate_tokens
+
+
+class LLMError(Exception):
+    """Raised when an LLM call fails"""
+
+
+class LLMRateLimitError(LLMError):
+    """Raised when the provider rejects a call because of quota / rate limits"""
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when the provider does not answer in time"""
+
+
+class LLMProvider:
+    """Base class for LLM backends used by the agents"""
+
+    name = "base"
+
+    def generate(self, prompt: str) -> str:
+        """Generate a completion for the prompt (blocking)"""
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str) -> str:
+        """Generate a completion without blocking the event loop"""
+        return await asyncio.to_thread(self.generate, prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the completion in chunks (blocking)"""
+        yield self.generate(prompt)
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the completion in chunks without blocking the event loop"""
+        yield await self.generate_async(prompt)
+
+    def generate_prefixed(self, prefix: str, prompt: str) -> str:
+        """
+        Generate with a static prefix the provider may cache server-side
+
+        Providers without prompt caching just send prefix + prompt.
+        """
+        return self.generate(prefix + prompt)
+
+    async def generate_prefixed_async(self, prefix: str, prompt: str) -> str:
+        return await self.generate_async(prefix + prompt)
+
+    def prefix_cached(self, prefix: str) -> bool:
+        """True if generate_prefixed sends only the prompt, the prefix being cached server-side"""
+        return False
+
+    def warm_up(self):
+        """Open connections ahead of the first call (blocking; no-op by default)"""
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini backend: one agent's view of the shared LLMClient"""
+
+    name = "gemini"
+
+    # Gemini context caching only accepts prefixes above a minimum size
+    CACHE_MIN_TOKENS = 32768
+    CACHE_TTL = timedelta(hours=1)
+
+    def __init__(self, client, agent_name: str = "agent"):
+        self.client = client
+        self.model = client.model(agent_name)
+        self.model_name = client.model_name
+        self.generation_config = client.generation_config(agent_name)
+        self._genai = client.connect()
+        self.request_options = client.request_options()
+        # prefix hash -> (model bound to the cached prefix or None, expires_at)
+        self._prefix_models: Dict[str, Tuple[Any, float]] = {}
+        self._prefix_lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        response = self.model.generate_content(prompt, request_options=self.request_options)
+        return response.text
+
+    def warm_up(self):
+        self.client.warm_up()
+
+    async def generate_async(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt, request_options=self.request_options)
+        return response.text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True, request_options=self.request_options):
+            yield chunk.text
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True, request_options=self.request_options)
+        async for chunk in response:
+            yield chunk.text
+
+    def _cached_prefix_model(self, prefix: str):
+        """Model bound to a server-side cache of `prefix`, or None if not cacheable"""
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        with self._prefix_lock:
+            entry = self._prefix_models.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+
+            model = None
+            if estimate_tokens(prefix) >= self.CACHE_MIN_TOKENS:
+                try:
+                    from google.generativeai import caching
+                    cached = caching.CachedContent.create(
+                        model=self.model_name,
+                        contents=[prefix],
+                        ttl=self.CACHE_TTL,
+                    )
+                    model = self._genai.GenerativeModel.from_cached_content(
+                        cached, generation_config=self.generation_config or None
+                    )
+                except Exception as e:
+                    print(f"Gemini context caching unavailable, sending full prompt: {e}")
+            # Refresh a little before the server-side TTL runs out
+            self._prefix_models[key] = (model, now + self.CACHE_TTL.total_seconds() * 0.9)
+            return model
+
+    def prefix_cached(self, prefix: str) -> bool:
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self._prefix_lock:
+            entry = self._prefix_models.get(key)
+        return bool(entry and entry[0] is not None and entry[1] > time.monotonic())
+
+    def generate_prefixed(self, prefix: str, prompt: str) -> str:
+        model = self._cached_prefix_model(prefix)
+        if model is None:
+            return self.generate(prefix + prompt)
+        return model.generate_content(prompt, request_options=self.request_options).text
+
+    async def generate_prefixed_async(self, prefix: str, prompt: str) -> str:
+        model = await asyncio.to_thread(self._cached_prefix_model, prefix)
+        if model is None:
+            return await self.generate_async(prefix + prompt)
+        response = await model.generate_content_async(prompt, request_options=self.request_options)
+        return response.text
+
+
+# A rule is (pattern, response). The pattern is a substring or a compiled
+# regex; the response is a string or a callable taking the prompt.
+StubRule = Tuple[Union[str, "re.Pattern"], Union[str, Callable[[str], str]]]
+
+
+class StubLLMProvider(LLMProvider):
+    """
+    Local deterministic stand-in for Gemini
+
+    Supports latency injection, error injection, canned responses (exact
+    prompt match), rule-based responses and chunked streaming. Responses
+    for the built-in agent prompts are shaped so the agents' parsers
+    accept them.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_kind: str = "error",
+        canned: Optional[Dict[str, str]] = None,
+        rules: Optional[List[StubRule]] = None,
+        default_response: str = "OK",
+        stream_chunk_size: int = 16,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.canned = dict(canned or {})
+        self.rules: List[StubRule] = list(rules or []) + self.default_rules()
+        self.default_response = default_response
+        self.stream_chunk_size = stream_chunk_size
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._fail_next = 0
+
+        self.stats = {"calls": 0, "errors": 0, "streams": 0}
+
+    @staticmethod
+    def default_rules() -> List[StubRule]:
+        """Rules matching the prompts built by the agents"""
+        return [
+            ("Classify the intent", "Intent: respond\nConfidence: 0.9\nExplanation: Deterministic stub response"),
+            ("Interpret the following non-verbal communication",
+             "1. Semantic meaning: the student is communicating a simple message\n"
+             "2. Emotional tone: neutral\n"
+             "3. Urgency level: low"),
+            ("supportive teacher/caregiver", "Thank you for telling me. I'm here to help you."),
+            (re.compile(r'^\d+\. "', re.M),
+             lambda prompt: "\n".join(
+                 f"{number}. 👤 ❓"
+                 for number in range(1, len(re.findall(r'^\d+\. "', prompt, re.M)) + 1)
+             )),
+            ("gesture translation assistant", "👤 ❓"),
+        ]
+
+    # Test controls
+
+    def set_latency(self, latency_ms: float, jitter_ms: float = 0.0):
+        """Change the injected latency at runtime"""
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def set_error_rate(self, error_rate: float, error_kind: str = "error"):
+        """Change the injected error rate at runtime"""
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+
+    def fail_next(self, count: int = 1):
+        """Force the next `count` calls to fail with the configured error kind"""
+        with self._lock:
+            self._fail_next += count
+
+    def add_rule(self, pattern, response):
+        """Add a rule that takes precedence over the existing ones"""
+        self.rules.insert(0, (pattern, response))
+
+    # Internals
+
+    def _plan_call(self) -> Tuple[float, bool]:
+        """Pick the latency (seconds) and whether this call fails"""
+        with self._lock:
+            self.stats["calls"] += 1
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            delay = max(0.0, self.latency_ms + jitter) / 1000.0
+            if self._fail_next > 0:
+                self._fail_next -= 1
+                fail = True
+            else:
+                fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.stats["errors"] += 1
+        return delay, fail
+
+    def _error(self) -> LLMError:
+        if self.error_kind == "rate_limit":
+            return LLMRateLimitError("429 Resource has been exhausted (stub)")
+        if self.error_kind == "timeout":
+            return LLMTimeoutError("Deadline exceeded (stub)")
+        return LLMError("Stub LLM error")
+
+    def _respond(self, prompt: str) -> str:
+        if prompt in self.canned:
+            return self.canned[prompt]
+        for pattern, response in self.rules:
+            if isinstance(pattern, str):
+                matched = pattern in prompt
+            else:
+                matched = pattern.search(prompt) is not None
+            if matched:
+                return response(prompt) if callable(response) else response
+        return self.default_response
+
+    def _chunks(self, text: str) -> List[str]:
+        size = max(1, self.stream_chunk_size)
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    # LLMProvider API
+
+    def generate(self, prompt: str) -> str:
+        delay, fail = self._plan_call()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise self._error()
+        return self._respond(prompt)
+
+    async def generate_async(self, prompt: str) -> str:
+        delay, fail = self._plan_call()
+        if delay:
+            await asyncio.sleep(delay)
+        if fail:
+            raise self._error()
+        return self._respond(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        delay, fail = self._plan_call()
+        self.stats["streams"] += 1
+        chunks = self._chunks(self._respond(prompt))
+        # Spread the latency across chunks so time-to-first-token is measurable
+        per_chunk = delay / len(chunks)
+        for index, chunk in enumerate(chunks):
+            if per_chunk:
+                time.sleep(per_chunk)
+            if fail and index == len(chunks) // 2:
+                raise self._error()
+            yield chunk
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        delay, fail = self._plan_call()
+        self.stats["streams"] += 1
+        chunks = self._chunks(self._respond(prompt))
+        per_chunk = delay / len(chunks)
+        for index, chunk in enumerate(chunks):
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+            if fail and index == len(chunks) // 2:
+                raise self._error()
+            yield chunk
+
+
+class LazyLLMProvider(LLMProvider):
+    """
+    Defers building a provider (and importing its SDK) until the first call
+
+    Async calls build it on a worker thread so the event loop is not blocked.
+    If building fails, every call raises LLMError, so agents fall back to
+    their rules just as when no provider was configured.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], LLMProvider], agent_name: str = "agent"):
+        self.name = name
+        self.agent_name = agent_name
+        self.generation_config = LLM_GENERATION_CONFIGS.get(agent_name, {})
+        self._factory = factory
+        self._provider: Optional[LLMProvider] = None
+        self._error: Optional[Exception] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._provider is not None
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self._provider, "model_name", "")
+
+    def load(self) -> LLMProvider:
+        if self._provider is None:
+            with self._lock:
+                if self._provider is None:
+                    if self._error is not None:
+                        raise LLMError(f"{self.name} unavailable: {self._error}")
+                    from services.startup import get_startup_profiler
+                    try:
+                        with get_startup_profiler().phase(f"llm:{self.agent_name}", lazy=True):
+                            self._provider = self._factory()
+                    except Exception as e:
+                        print(f"Error initializing {self.name} in {self.agent_name}: {e}")
+                        self._error = e
+                        raise LLMError(f"{self.name} unavailable: {e}")
+        return self._provider
+
+    async def _load_async(self) -> LLMProvider:
+        if self._provider is not None:
+            return self._provider
+        return await asyncio.to_thread(self.load)
+
+    def generate(self, prompt: str) -> str:
+        return self.load().generate(prompt)
+
+    async def generate_async(self, prompt: str) -> str:
+        return await (await self._load_async()).generate_async(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        yield from self.load().stream(prompt)
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        async for chunk in (await self._load_async()).stream_async(prompt):
+            yield chunk
+
+    def generate_prefixed(self, prefix: str, prompt: str) -> str:
+        return self.load().generate_prefixed(prefix, prompt)
+
+    async def generate_prefixed_async(self, prefix: str, prompt: str) -> str:
+        return await (await self._load_async()).generate_prefixed_async(prefix, prompt)
+
+    def prefix_cached(self, prefix: str) -> bool:
+        return self._provider is not None and self._provider.prefix_cached(prefix)
+
+    def warm_up(self):
+        self.load().warm_up()
+
+
+# Every lazily built provider, so startup warm-up can build them ahead of traffic
+_lazy_providers: List[LazyLLMProvider] = []
+
+
+def warm_up_llm_providers() -> int:
+    """
+    Build all lazy providers and open their connections now (blocking);
+    returns how many are warm. Every provider is tried; if any failed, an
+    LLMError naming them is raised afterwards so warm-up reports it. Agents
+    still fall back to their rules while a provider stays unavailable.
+    """
+    warm = 0
+    # error message -> agents that failed with it (they share one client, so usually one entry)
+    failures: Dict[str, List[str]] = {}
+    for provider in _lazy_providers:
+        try:
+            provider.warm_up()
+            warm += 1
+        except Exception as e:
+            print(f"⚠ LLM warm-up failed for {provider.agent_name}: {e}")
+            failures.setdefault(str(e), []).append(provider.agent_name)
+    if failures:
+        raise LLMError("; ".join(f"{', '.join(agents)}: {error}" for error, agents in failures.items()))
+    return warm
+
+
+def create_llm_provider(agent_name: str = "agent") -> Optional[LLMProvider]:
+    """
+    Build the configured LLM provider
+
+    Returns None when no provider is usable (e.g. Gemini without an API key),
+    in which case agents use their rule-based fallbacks. Gemini is built on
+    the first call on the shared LLMClient, with the agent's generation
+    settings; if that fails, calls raise LLMError and agents fall back
+    the same way. Providers are wrapped
+    in the process-wide resilience policy, single-flight group and admission
+    gate, so all agents share one circuit breaker and one concurrency limit,
+    and identical in-flight prompts are sent once.
+    """
+    from services.llm_resilience import ResilientLLMProvider, get_llm_resilience
+    from services.llm_singleflight import get_llm_singleflight
+    from services.llm_admission import get_llm_admission
+
+    if LLM_PROVIDER == "stub":
+        provider = StubLLMProvider(
+            latency_ms=LLM_STUB_LATENCY_MS,
+            jitter_ms=LLM_STUB_JITTER_MS,
+            error_rate=LLM_STUB_ERROR_RATE,
+            error_kind=LLM_STUB_ERROR_KIND,
+            seed=LLM_STUB_SEED,
+        )
+    elif not GEMINI_API_KEY:
+        return None
+    else:
+        # The Gemini SDK is slow to import; build it on first use
+        from services.llm_client import get_llm_client
+        client = get_llm_client()
+        provider = LazyLLMProvider("gemini", lambda: GeminiProvider(client, agent_name), agent_name)
+        _lazy_providers.append(provider)
+
+    return ResilientLLMProvider(provider, get_llm_resilience(), get_llm_singleflight(), get_llm_admission())
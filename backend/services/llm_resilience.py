@@ -0,0 +1,420 @@
+"""
+LLM Resilience
+Shared circuit breaker, hedged requests and jittered retries for LLM calls,
+so tail latency stays bounded when Gemini is slow or failing
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, Iterator, AsyncIterator
+
+from config import (
+    LLM_CALL_TIMEOUT_S,
+    LLM_DEADLINE_S,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_MS,
+    LLM_BACKOFF_MAX_MS,
+    LLM_CB_FAILURE_THRESHOLD,
+    LLM_CB_RESET_TIMEOUT_S,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_DELAY_MS,
+    LLM_HEDGE_MAX_DELAY_MS,
+)
+from services.llm_provider import LLMProvider, LLMError, LLMTimeoutError
+from services.llm_singleflight import SingleFlight
+from services.llm_admission import LLMAdmission, current_priority
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the provider while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed    -> calls go through, failures are counted
+    open      -> calls fail fast until reset_timeout has passed
+    half_open -> a single trial call decides between closed and open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may be made now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # Half open: let exactly one trial call through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a half-open trial that ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def reset(self):
+        """Force the breaker closed (tests / manual recovery)"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds)"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class LLMResilience:
+    """Policy shared by every agent's LLM calls"""
+
+    # Below this many samples the p95 is too noisy to hedge on
+    MIN_HEDGE_SAMPLES = 20
+
+    def __init__(
+        self,
+        failure_threshold: int = LLM_CB_FAILURE_THRESHOLD,
+        reset_timeout: float = LLM_CB_RESET_TIMEOUT_S,
+        call_timeout: float = LLM_CALL_TIMEOUT_S,
+        deadline: float = LLM_DEADLINE_S,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base_ms: float = LLM_BACKOFF_BASE_MS,
+        backoff_max_ms: float = LLM_BACKOFF_MAX_MS,
+        hedge_enabled: bool = LLM_HEDGE_ENABLED,
+        hedge_min_delay_ms: float = LLM_HEDGE_MIN_DELAY_MS,
+        hedge_max_delay_ms: float = LLM_HEDGE_MAX_DELAY_MS,
+    ):
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base_ms / 1000.0
+        self.backoff_max = backoff_max_ms / 1000.0
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay_ms / 1000.0
+        self.hedge_max_delay = hedge_max_delay_ms / 1000.0
+        self._rng = random.Random()
+        self.stats = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "short_circuited": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+        }
+
+    def hedge_delay(self) -> float:
+        """Delay after which a duplicate request is sent (observed p95, clamped)"""
+        p95 = self.latency.percentile(0.95) if len(self.latency) >= self.MIN_HEDGE_SAMPLES else None
+        if p95 is None:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p95))
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def check_breaker(self):
+        if not self.breaker.allow():
+            self.stats["short_circuited"] += 1
+            raise CircuitOpenError("LLM circuit open - using fallback")
+
+    def record_success(self, started: float):
+        self.breaker.record_success()
+        self.latency.record(time.perf_counter() - started)
+        self.stats["successes"] += 1
+
+    def record_failure(self):
+        self.breaker.record_failure()
+        self.stats["failures"] += 1
+
+    async def _hedged(self, fn: Callable[[], Awaitable[str]]) -> str:
+        """Run fn, sending a duplicate if it has not answered by the hedge delay"""
+        if not self.hedge_enabled or self.breaker.state != CircuitBreaker.CLOSED:
+            return await fn()
+
+        tasks = [asyncio.ensure_future(fn())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            if done:
+                return tasks[0].result()
+
+            self.stats["hedged"] += 1
+            tasks.append(asyncio.ensure_future(fn()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def call_async(self, fn: Callable[[], Awaitable[str]]) -> str:
+        """Call fn with breaker, per-call timeout, hedging and jittered retries"""
+        self.stats["calls"] += 1
+        deadline = time.monotonic() + self.deadline
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            self.check_breaker()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._hedged(fn), timeout=min(self.call_timeout, remaining))
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                self.record_failure()
+                last_error = LLMTimeoutError(f"LLM call exceeded {self.call_timeout:.1f}s")
+            except Exception as e:
+                self.record_failure()
+                last_error = e
+            except BaseException:
+                # Cancelled: neither success nor failure, but a half-open trial must not stay taken
+                self.breaker.release_trial()
+                raise
+            else:
+                self.record_success(started)
+                return result
+
+            if attempt < self.max_retries:
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    break
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+        raise last_error or LLMTimeoutError("LLM deadline exceeded")
+
+    def call(self, fn: Callable[[], str]) -> str:
+        """Blocking variant: breaker and jittered retries, no hedging"""
+        self.stats["calls"] += 1
+        deadline = time.monotonic() + self.deadline
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            self.check_breaker()
+            started = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                self.record_failure()
+                last_error = e
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            else:
+                self.record_success(started)
+                return result
+
+            if attempt < self.max_retries:
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    break
+                self.stats["retries"] += 1
+                time.sleep(delay)
+
+        raise last_error or LLMTimeoutError("LLM deadline exceeded")
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return {
+            **self.stats,
+            "circuit_state": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+        }
+
+
+class ResilientLLMProvider(LLMProvider):
+    """
+    Wraps a provider so every call goes through the shared LLMResilience policy
+
+    When a SingleFlight group is given, identical concurrent async prompts
+    share one resilient call (including its retries and hedges). When an
+    LLMAdmission scheduler is given, each resilient call holds one of its
+    slots, at the caller's llm_priority. Only callers of the same priority
+    share a call, so an interactive caller never waits on a flight queued
+    behind the background share.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        resilience: "LLMResilience",
+        singleflight: Optional[SingleFlight] = None,
+        admission: Optional[LLMAdmission] = None,
+    ):
+        self.provider = provider
+        self.resilience = resilience
+        self.singleflight = singleflight
+        self.admission = admission
+        self.name = provider.name
+
+    async def _admitted(self, fn: Callable[[], Awaitable[str]]) -> str:
+        if self.admission is None:
+            return await fn()
+        async with self.admission.slot():
+            return await fn()
+
+    def _admitted_blocking(self, fn: Callable[[], str]) -> str:
+        if self.admission is None:
+            return fn()
+        with self.admission.slot_blocking():
+            return fn()
+
+    def _settings_key(self) -> str:
+        """Model and generation settings: agents with different settings never share a response"""
+        settings = sorted(getattr(self.provider, "generation_config", {}).items())
+        return f"{getattr(self.provider, 'model_name', '')}|{settings}"
+
+    def generate(self, prompt: str) -> str:
+        return self._admitted_blocking(lambda: self.resilience.call(lambda: self.provider.generate(prompt)))
+
+    async def generate_async(self, prompt: str) -> str:
+        def call():
+            return self._admitted(lambda: self.resilience.call_async(lambda: self.provider.generate_async(prompt)))
+
+        if self.singleflight is None:
+            return await call()
+        key = SingleFlight.make_key(self.name, self._settings_key(), current_priority(), prompt)
+        return await self.singleflight.do(key, call)
+
+    def generate_prefixed(self, prefix: str, prompt: str) -> str:
+        return self._admitted_blocking(lambda: self.resilience.call(lambda: self.provider.generate_prefixed(prefix, prompt)))
+
+    async def generate_prefixed_async(self, prefix: str, prompt: str) -> str:
+        def call():
+            return self._admitted(
+                lambda: self.resilience.call_async(lambda: self.provider.generate_prefixed_async(prefix, prompt))
+            )
+
+        if self.singleflight is None:
+            return await call()
+        key = SingleFlight.make_key(self.name, self._settings_key(), current_priority(), prefix, prompt)
+        return await self.singleflight.do(key, call)
+
+    def prefix_cached(self, prefix: str) -> bool:
+        return self.provider.prefix_cached(prefix)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        # A partially consumed stream cannot be retried or hedged, only guarded
+        self.resilience.check_breaker()
+        started = time.perf_counter()
+        try:
+            for chunk in self.provider.stream(prompt):
+                yield chunk
+        except Exception:
+            self.resilience.record_failure()
+            raise
+        except BaseException:
+            # Closed early (GeneratorExit) or cancelled: no outcome, but free a half-open trial
+            self.resilience.breaker.release_trial()
+            raise
+        self.resilience.record_success(started)
+
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        self.resilience.check_breaker()
+        started = time.perf_counter()
+        try:
+            async for chunk in self.provider.stream_async(prompt):
+                yield chunk
+        except Exception:
+            self.resilience.record_failure()
+            raise
+        except BaseException:
+            # Closed early or cancelled, as in stream
+            self.resilience.breaker.release_trial()
+            raise
+        self.resilience.record_success(started)
+
+
+_shared_resilience: Optional[LLMResilience] = None
+
+
+def get_llm_resilience() -> LLMResilience:
+    """Process-wide resilience policy shared by all agents"""
+    global _shared_resilience
+    if _shared_resilience is None:
+        _shared_resilience = LLMResilience()
+    return _shared_resilience
@@ -0,0 +1,76 @@
+"""
+LLM Single-Flight
+Deduplicates identical in-flight LLM prompts so concurrent callers share
+one upstream request
+"""
+import asyncio
+import hashlib
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key
+
+    The first caller for a key starts the request; callers arriving while
+    it is in flight await the same task. Nothing is cached once it completes.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0, "max_waiters": 0}
+        self._waiters: Dict[str, int] = {}
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Stable key for a prompt (and whatever else selects the response)"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats["calls"] += 1
+        task = self._in_flight.get(key)
+
+        if task is None:
+            self.stats["executed"] += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            self._waiters[key] = 1
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.stats["coalesced"] += 1
+            self._waiters[key] += 1
+            self.stats["max_waiters"] = max(self.stats["max_waiters"], self._waiters[key])
+
+        # Shield so one caller being cancelled does not cancel the shared request
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            self._waiters.pop(key, None)
+        # Avoid "exception was never retrieved" when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self.stats["calls"]
+        return {
+            **self.stats,
+            "in_flight": len(self._in_flight),
+            "coalesced_ratio": round(self.stats["coalesced"] / calls, 3) if calls else 0.0,
+        }
+
+
+_shared_singleflight: Optional[SingleFlight] = None
+
+
+def get_llm_singleflight() -> SingleFlight:
+    """Process-wide single-flight group for LLM prompts"""
+    global _shared_singleflight
+    if _shared_singleflight is None:
+        _shared_singleflight = SingleFlight()
+    return _shared_singleflight
@@ -0,0 +1,135 @@
+"""
+Message Coalescer
+Collapses runs of identical gesture messages from continuous capture into a
+single row with a repeat count and duration
+"""
+import asyncio
+import time
+from typing import Dict, Any
+
+from config import MESSAGE_COALESCE_WINDOW_S
+
+
+class _Run:
+    """The message currently being repeated in one session"""
+
+    __slots__ = ("key", "message_id", "first_seen", "last_seen", "count", "flushed_count")
+
+    def __init__(self, key: tuple, message_id: int, now: float):
+        self.key = key
+        self.message_id = message_id
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 1
+        self.flushed_count = 1
+
+    @property
+    def duration_ms(self) -> float:
+        return round((self.last_seen - self.first_seen) * 1000, 1)
+
+
+class MessageCoalescer:
+    """
+    Per-session write coalescer in front of store_message
+
+    The first message of a run is inserted immediately so it shows up in
+    get_messages right away. Identical messages arriving within `window_s`
+    of the previous one only bump an in-memory counter; the row's
+    repeat_count and duration_ms are written once the run ends (a different
+    message arrives, or the run goes idle and the sweep flushes it).
+    """
+
+    def __init__(self, db, window_s: float = MESSAGE_COALESCE_WINDOW_S):
+        self.db = db  # AsyncDatabase
+        self.window_s = window_s
+        self._runs: Dict[str, _Run] = {}
+        # Serializes run turnover (flush + insert); the writer is single-threaded anyway
+        self._lock = asyncio.Lock()
+        self.stats = {"messages": 0, "inserted": 0, "coalesced": 0, "updates": 0}
+
+    async def store_message(
+        self,
+        session_id: str,
+        input_text: str,
+        output_text: str,
+        intent: str,
+        confidence: float = 1.0
+    ) -> int:
+        """Same arguments as Database.store_message; returns the row id"""
+        self.stats["messages"] += 1
+        if self.window_s <= 0:
+            self.stats["inserted"] += 1
+            return await self.db.store_message(session_id, input_text, output_text, intent, confidence)
+
+        key = (input_text, output_text, intent)
+        # Repeats only touch memory, so they never wait behind a write
+        if self._extend(session_id, key):
+            return self._runs[session_id].message_id
+
+        async with self._lock:
+            # Another frame may have started this run while we waited
+            if self._extend(session_id, key):
+                return self._runs[session_id].message_id
+            run = self._runs.pop(session_id, None)
+            if run:
+                await self._flush(run)
+            message_id = await self.db.store_message(session_id, input_text, output_text, intent, confidence)
+            self._runs[session_id] = _Run(key, message_id, time.monotonic())
+            self.stats["inserted"] += 1
+            return message_id
+
+    def _extend(self, session_id: str, key: tuple) -> bool:
+        run = self._runs.get(session_id)
+        now = time.monotonic()
+        if run is None or run.key != key or now - run.last_seen > self.window_s:
+            return False
+        run.count += 1
+        run.last_seen = now
+        self.stats["coalesced"] += 1
+        return True
+
+    async def _flush(self, run: _Run):
+        # A live run keeps counting (outside the lock) while the write is
+        # pending; only what was written counts as flushed
+        count, duration_ms = run.count, run.duration_ms
+        if count != run.flushed_count:
+            await self.db.update_message_repeats(run.message_id, count, duration_ms)
+            run.flushed_count = count
+            self.stats["updates"] += 1
+
+    async def flush_idle(self):
+        """
+        Write out and forget runs idle longer than the window; long-held runs
+        get their current count written too, so the row stays close to live
+        """
+        async with self._lock:
+            now = time.monotonic()
+            for session_id, run in list(self._runs.items()):
+                if now - run.last_seen > self.window_s:
+                    del self._runs[session_id]
+                await self._flush(run)
+
+    async def flush_all(self):
+        """Write out every pending count (shutdown)"""
+        async with self._lock:
+            runs, self._runs = self._runs, {}
+            for run in runs.values():
+                await self._flush(run)
+
+    async def run_forever(self):
+        """Periodic sweep so runs that simply stop are still written out"""
+        while True:
+            await asyncio.sleep(max(self.window_s, 0.5))
+            try:
+                await self.flush_idle()
+            except Exception as e:
+                print(f"Message coalescer flush failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        messages = self.stats["messages"]
+        return {
+            **self.stats,
+            "window_s": self.window_s,
+            "open_runs": len(self._runs),
+            "coalesced_ratio": round(self.stats["coalesced"] / messages, 3) if messages else 0.0,
+        }
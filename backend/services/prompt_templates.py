@@ -0,0 +1,109 @@
+"""
+Prompt Templates
+Prompts split into a static prefix (compiled once per version and shared
+across agents) and a small per-call suffix, with request/response size
+metrics
+"""
+import threading
+from typing import Dict, Any, Tuple, Callable
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 UTF-8 bytes per token) without a network call"""
+    if not text:
+        return 0
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+class PromptTemplate:
+    """A static prefix plus a str.format suffix template"""
+
+    def __init__(self, name: str, version: str, prefix: str, suffix_template: str):
+        self.name = name
+        self.version = version
+        self.prefix = prefix
+        self.suffix_template = suffix_template
+        self.prefix_tokens = estimate_tokens(prefix)
+
+    def render_suffix(self, **values) -> str:
+        return self.suffix_template.format(**values)
+
+    def render(self, **values) -> str:
+        """Full prompt, for providers without prefix caching"""
+        return self.prefix + self.render_suffix(**values)
+
+    def record_usage(self, suffix: str, response_text: str, prefix_cached: bool = False):
+        """Record request/response sizes for this call; prefix_cached if the provider sent only the suffix"""
+        _metrics.record(
+            self.name, self.prefix_tokens, estimate_tokens(suffix), estimate_tokens(response_text), prefix_cached
+        )
+
+
+class PromptMetrics:
+    """Per-template request and response token counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_template: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, prefix_tokens: int, suffix_tokens: int, response_tokens: int,
+               prefix_cached: bool = False):
+        with self._lock:
+            entry = self._by_template.setdefault(name, {
+                "calls": 0,
+                "cached_calls": 0,
+                "prefix_tokens": 0,
+                "cached_prefix_tokens": 0,
+                "suffix_tokens": 0,
+                "response_tokens": 0,
+            })
+            entry["calls"] += 1
+            entry["prefix_tokens"] += prefix_tokens
+            if prefix_cached:
+                entry["cached_calls"] += 1
+                entry["cached_prefix_tokens"] += prefix_tokens
+            entry["suffix_tokens"] += suffix_tokens
+            entry["response_tokens"] += response_tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {}
+            for name, entry in self._by_template.items():
+                calls = entry["calls"] or 1
+                request_tokens = entry["prefix_tokens"] + entry["suffix_tokens"]
+                stats[name] = {
+                    **entry,
+                    "avg_request_tokens": round(request_tokens / calls, 1),
+                    "avg_response_tokens": round(entry["response_tokens"] / calls, 1),
+                }
+                # Only meaningful once the provider actually served the prefix from its cache
+                if entry["cached_calls"]:
+                    stats[name]["avg_uncached_request_tokens"] = round(
+                        (request_tokens - entry["cached_prefix_tokens"]) / calls, 1
+                    )
+            return stats
+
+
+_metrics = PromptMetrics()
+_templates: Dict[Tuple[str, str], PromptTemplate] = {}
+_templates_lock = threading.RLock()
+
+
+def get_prompt_template(name: str, version: str, build: Callable[[], PromptTemplate]) -> PromptTemplate:
+    """Return the compiled template for (name, version), building it once"""
+    key = (name, version)
+    template = _templates.get(key)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(key)
+            if template is None:
+                template = build()
+                # Drop templates compiled for older versions of the same prompt
+                for stale in [k for k in _templates if k[0] == name]:
+                    del _templates[stale]
+                _templates[key] = template
+    return template
+
+
+def get_prompt_metrics() -> Dict[str, Any]:
+    return _metrics.get_stats()
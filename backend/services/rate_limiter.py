@@ -0,0 +1,351 @@
+"""
+Rate Limiter
+Token buckets per client (user, or IP when unauthenticated) and per session,
+with separate budgets for vision, LLM-backed and cheap endpoints
+"""
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from config import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_BUDGETS,
+    RATE_LIMIT_SESSION_SHARE,
+    RATE_LIMIT_TRUSTED_PROXIES,
+)
+
+# (allowed, seconds until a token is available, tokens left)
+Decision = Tuple[bool, float, float]
+
+# Endpoints that spend vision inference or LLM calls; everything else not
+# exempt is "default". Login and signup cost a bcrypt hash, so they share
+# the LLM budget.
+VISION_PREFIXES = ("/vision/process-", "/vision/analyze-", "/vision/gesture-to-text", "/vision/interpret-gesture", "/vision/utterance")
+LLM_PREFIXES = ("/communicate", "/simulate/step", "/translate/", "/auth/login", "/auth/signup")
+EXEMPT_PREFIXES = ("/health/", "/docs", "/openapi.json")
+
+# JSON bodies up to this size are read to find their session_id. Larger
+# ones (base64 webcam frames) are not, so their clients name the session in
+# the X-Session-Id header or the session_id query parameter.
+SESSION_BODY_LIMIT = 64 * 1024
+
+
+def endpoint_class(path: str) -> Optional[str]:
+    """Budget for a path: "vision", "llm", "default", or None for exempt"""
+    if path == "/" or path.startswith(EXEMPT_PREFIXES):
+        return None
+    if path.startswith(VISION_PREFIXES):
+        return "vision"
+    if path.startswith(LLM_PREFIXES):
+        return "llm"
+    return "default"
+
+
+def refill(tokens: float, updated: float, now: float, rate: float, burst: float, cost: float) -> Tuple[Decision, float]:
+    """Token bucket step shared by the backends; returns the decision and the new token count"""
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return (True, 0.0, tokens - cost), tokens - cost
+    wait = (cost - tokens) / rate if rate > 0 else math.inf
+    return (False, wait, tokens), tokens
+
+
+class RateLimitBackend:
+    """Bucket storage; `take` is atomic per key"""
+
+    # Whether take() does I/O and must run off the event loop
+    blocking = False
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Decision:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Buckets in this process (one uvicorn worker)"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [tokens, updated, seconds until full]
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Decision:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = self._buckets[key] = [burst, now, 0.0]
+            decision, bucket[0] = refill(bucket[0], bucket[1], now, rate, burst, cost)
+            bucket[1] = now
+            bucket[2] = (burst - bucket[0]) / rate if rate > 0 else math.inf
+            return decision
+
+    def _prune(self, now: float):
+        """Forget buckets that have refilled completely; they behave like new ones"""
+        for key, (_, updated, to_full) in list(self._buckets.items()):
+            if now - updated >= to_full:
+                del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Buckets in a SQLite file shared by every worker process on the host
+
+    Each take is one short write transaction. Timestamps are wall-clock, as
+    monotonic clocks are not comparable across processes.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # losing recent bucket state on a crash is harmless
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Decision:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            decision, tokens = refill(tokens, updated, now, rate, burst, cost)
+            conn.execute(
+                "INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return decision
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+def create_rate_limit_backend(url: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    """"memory" (per process) or "sqlite:///path" (shared by the workers on one host)"""
+    if url == "memory":
+        return MemoryRateLimitBackend()
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteRateLimitBackend(path)
+    raise ValueError(f"Unsupported RATE_LIMIT_BACKEND: {url}")
+
+
+class RateLimiter:
+    """
+    Budgets per endpoint class, checked against the client's bucket and,
+    when the request names one, the session's bucket
+
+    A request is refused if either bucket is empty: the client bucket caps
+    everything a client sends, and the session bucket, holding
+    `session_share` of that budget, keeps one conversation (e.g. a
+    classroom on one account) from using all of it. Budgets are per bucket,
+    never a shared pool, so a noisy client only ever exhausts its own.
+    Session ids come from the request, so session buckets belong to the
+    client: naming another client's session only spends the caller's own
+    tokens.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[RateLimitBackend] = None,
+        budgets: Optional[Dict[str, Tuple[float, float]]] = None,
+        session_share: float = RATE_LIMIT_SESSION_SHARE
+    ):
+        self.backend = backend or create_rate_limit_backend()
+        # class -> (tokens per second, burst)
+        self.budgets = budgets or RATE_LIMIT_BUDGETS
+        self.session_share = session_share
+        self.stats: Dict[str, Dict[str, int]] = {
+            name: {"allowed": 0, "limited": 0} for name in self.budgets
+        }
+        self.limited_by = {"client": 0, "session": 0}
+
+    async def check(self, endpoint: str, client_key: str, session_id: Optional[str] = None) -> Decision:
+        """Take one token from each applicable bucket"""
+        rate, burst = self.budgets[endpoint]
+        buckets = [("client", f"{endpoint}:{client_key}", rate, burst)]
+        if session_id:
+            buckets.append((
+                "session", f"{endpoint}:session:{client_key}:{session_id}",
+                rate * self.session_share, max(1.0, burst * self.session_share)
+            ))
+
+        allowed, retry_after, remaining = True, 0.0, math.inf
+        for kind, key, bucket_rate, bucket_burst in buckets:
+            if self.backend.blocking:
+                decision = await asyncio.to_thread(self.backend.take, key, bucket_rate, bucket_burst)
+            else:
+                decision = self.backend.take(key, bucket_rate, bucket_burst)
+            if not decision[0]:
+                allowed = False
+                self.limited_by[kind] += 1
+            retry_after = max(retry_after, decision[1])
+            remaining = min(remaining, decision[2])
+
+        self.stats[endpoint]["allowed" if allowed else "limited"] += 1
+        return allowed, retry_after, remaining
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            "backend": type(self.backend).__name__,
+            "budgets": {name: {"per_s": rate, "burst": burst} for name, (rate, burst) in self.budgets.items()},
+            "session_share": self.session_share,
+            "endpoints": self.stats,
+            "limited_by": self.limited_by,
+        }
+        if isinstance(self.backend, MemoryRateLimitBackend):
+            stats["buckets"] = len(self.backend)
+        return stats
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying a RateLimiter to HTTP requests
+
+    The client is the user id from a valid bearer token, else the peer IP
+    (or X-Real-IP / X-Forwarded-For when the peer is a trusted proxy). The
+    session is the X-Session-Id header, else the session_id query
+    parameter, else for JSON bodies up to SESSION_BODY_LIMIT the body's
+    session_id; such bodies are read here and replayed to the app. Larger
+    bodies are passed through unread, so a request that names its session
+    only inside one is limited per client alone. Refused requests get 429
+    with Retry-After.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, user_id_for_token=None, trusted_proxies: List[str] = RATE_LIMIT_TRUSTED_PROXIES):
+        self.app = app
+        self.limiter = limiter
+        self.user_id_for_token = user_id_for_token
+        self.trusted_proxies = set(trusted_proxies)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        endpoint = endpoint_class(scope["path"])
+        if endpoint is None or endpoint not in self.limiter.budgets:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        session_id = headers.get("x-session-id") or self._query_session(scope)
+        if session_id is None and self._small_json(headers):
+            body, receive = await self._buffer_body(receive)
+            session_id = self._body_session(body)
+
+        allowed, retry_after, _ = await self.limiter.check(endpoint, self._client_key(scope, headers), session_id)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        seconds = max(1, math.ceil(retry_after)) if math.isfinite(retry_after) else 3600
+        payload = json.dumps({"detail": "Rate limit exceeded", "limit": endpoint, "retry_after": seconds}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"retry-after", str(seconds).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    def _client_key(self, scope, headers: Dict[str, str]) -> str:
+        authorization = headers.get("authorization", "")
+        if self.user_id_for_token and authorization[:7].lower() == "bearer ":
+            user_id = self.user_id_for_token(authorization[7:].strip())
+            if user_id is not None:
+                return f"user:{user_id}"
+        ip = scope["client"][0] if scope.get("client") else "unknown"
+        if ip in self.trusted_proxies:
+            forwarded = headers.get("x-real-ip") or headers.get("x-forwarded-for", "").split(",")[-1].strip()
+            ip = forwarded or ip
+        return f"ip:{ip}"
+
+    @staticmethod
+    def _query_session(scope) -> Optional[str]:
+        values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("session_id")
+        return values[0] if values else None
+
+    @staticmethod
+    def _small_json(headers: Dict[str, str]) -> bool:
+        try:
+            length = int(headers.get("content-length", ""))
+        except ValueError:
+            return False
+        return headers.get("content-type", "").startswith("application/json") and 0 < length <= SESSION_BODY_LIMIT
+
+    @staticmethod
+    async def _buffer_body(receive):
+        """Read the whole request body; returns it and a receive that replays it"""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away; let the app see the disconnect
+                async def replay_disconnect():
+                    return message
+                return b"", replay_disconnect
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay
+
+    @staticmethod
+    def _body_session(body: bytes) -> Optional[str]:
+        try:
+            session_id = json.loads(body).get("session_id")
+        except (ValueError, AttributeError):
+            return None
+        return str(session_id) if session_id else None
@@ -0,0 +1,171 @@
+"""
+Retention Service
+Periodically compacts, archives and deletes old rows so the database file
+and query times stay bounded
+"""
+import asyncio
+import base64
+import gzip
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List
+
+from config import (
+    RETENTION_AGENT_LOGS_DAYS,
+    RETENTION_MESSAGES_DAYS,
+    RETENTION_GESTURE_SEQUENCES_DAYS,
+    RETENTION_COMPACT_AGENT_LOGS_DAYS,
+    RETENTION_ARCHIVE_DIR,
+    RETENTION_INTERVAL_S,
+    RETENTION_CHUNK_SIZE,
+    RETENTION_VACUUM_PAGES,
+)
+
+
+class RetentionService:
+    """
+    Applies per-table TTLs in small chunks
+
+    Each chunk is its own short transaction, with a pause between chunks,
+    so request handlers never wait long for the write lock. In the server
+    `db` is AsyncDatabase.blocking(), so those transactions queue on the
+    single writer thread with the handlers' writes. Purged rows are
+    optionally appended to gzipped per-day NDJSON files before deletion
+    (at-least-once: a crash between archive and delete re-archives a chunk).
+    """
+
+    def __init__(
+        self,
+        db,
+        ttl_days: Optional[Dict[str, int]] = None,
+        compact_agent_logs_days: int = RETENTION_COMPACT_AGENT_LOGS_DAYS,
+        archive_dir: str = RETENTION_ARCHIVE_DIR,
+        chunk_size: int = RETENTION_CHUNK_SIZE,
+        vacuum_pages: int = RETENTION_VACUUM_PAGES,
+        chunk_pause: float = 0.05,
+    ):
+        self.db = db
+        self.ttl_days = ttl_days if ttl_days is not None else {
+            "agent_logs": RETENTION_AGENT_LOGS_DAYS,
+            "messages": RETENTION_MESSAGES_DAYS,
+            "gesture_sequences": RETENTION_GESTURE_SEQUENCES_DAYS,
+        }
+        self.compact_agent_logs_days = compact_agent_logs_days
+        self.archive_dir = archive_dir
+        self.chunk_size = chunk_size
+        self.vacuum_pages = vacuum_pages
+        self.chunk_pause = chunk_pause
+        self._vacuum_checked = False
+        self._compacted_through_id = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def _cutoff(days: int) -> str:
+        return (datetime.utcnow() - timedelta(days=days)).isoformat()
+
+    def _archive(self, table: str, rows: List[Dict]):
+        """Append rows to <archive_dir>/<table>/<YYYY-MM-DD>.ndjson.gz"""
+        by_day = defaultdict(list)
+        for row in rows:
+            by_day[row["created_at"][:10]].append(row)
+
+        table_dir = os.path.join(self.archive_dir, table)
+        os.makedirs(table_dir, exist_ok=True)
+        for day, day_rows in by_day.items():
+            # Appending creates a new gzip member; gzip readers concatenate them
+            with gzip.open(os.path.join(table_dir, f"{day}.ndjson.gz"), "at", encoding="utf-8") as archive:
+                for row in day_rows:
+                    archive.write(json.dumps(row, ensure_ascii=False, default=self._encode_value) + "\n")
+
+    @staticmethod
+    def _encode_value(value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return {"base64": base64.b64encode(bytes(value)).decode("ascii")}
+        raise TypeError(f"Cannot archive value of type {type(value).__name__}")
+
+    def purge_table(self, table: str, days: int) -> Dict[str, int]:
+        cutoff = self._cutoff(days)
+        deleted = archived = 0
+        while True:
+            rows = self.db.fetch_rows_before(table, cutoff, self.chunk_size)
+            if not rows:
+                break
+            if self.archive_dir:
+                self._archive(table, rows)
+                archived += len(rows)
+            deleted += self.db.delete_rows(table, [row["id"] for row in rows])
+            if len(rows) < self.chunk_size:
+                break
+            time.sleep(self.chunk_pause)
+        return {"deleted": deleted, "archived": archived}
+
+    def compact_agent_logs(self) -> int:
+        cutoff = self._cutoff(self.compact_agent_logs_days)
+        compacted = 0
+        # The cutoff only moves forward, so rows already examined stay compacted
+        after_id = self._compacted_through_id
+        while after_id is not None:
+            self._compacted_through_id = after_id
+            updated, after_id = self.db.compact_agent_logs(cutoff, after_id, self.chunk_size)
+            compacted += updated
+            if after_id is not None:
+                time.sleep(self.chunk_pause)
+        return compacted
+
+    def run_once(self) -> Dict[str, Any]:
+        """One full retention pass (blocking)"""
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"tables": {}}
+
+        if not self._vacuum_checked:
+            # Converting needs a full VACUUM that locks the file, so it is left to the CLI
+            result["incremental_vacuum"] = self.db.incremental_vacuum_enabled()
+            if not result["incremental_vacuum"]:
+                print("⚠ Database file predates incremental auto-vacuum; freed pages are not released. "
+                      "Run `python -m services.retention --convert-vacuum` with the server stopped.")
+            self._vacuum_checked = True
+
+        for table, days in self.ttl_days.items():
+            if days > 0:
+                result["tables"][table] = self.purge_table(table, days)
+
+        # Compact after purging so rows about to be deleted are not rewritten
+        if self.compact_agent_logs_days > 0:
+            result["agent_logs_compacted"] = self.compact_agent_logs()
+
+        if self.vacuum_pages > 0:
+            result["pages_vacuumed"] = self.db.incremental_vacuum(self.vacuum_pages)
+
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["finished_at"] = datetime.utcnow().isoformat()
+        self.last_run = result
+        return result
+
+    async def run_forever(self, interval: float = RETENTION_INTERVAL_S):
+        """Run a pass every `interval` seconds, off the event loop"""
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                print(f"Retention pass failed: {e}")
+            await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    # One-off pass: python -m services.retention (from backend/)
+    # Offline conversion of an old SQLite file: python -m services.retention --convert-vacuum
+    import sys
+    from config import DATABASE_URL
+    from database.db import Database
+    from database.backends import create_backend
+
+    # The database the server uses, not the default SQLite file
+    db = Database(backend=create_backend(DATABASE_URL))
+    if "--convert-vacuum" in sys.argv[1:]:
+        converted = db.ensure_incremental_vacuum()
+        print("✓ Converted to incremental auto-vacuum" if converted else "✓ Already using incremental auto-vacuum")
+    else:
+        print(json.dumps(RetentionService(db).run_once(), indent=2))
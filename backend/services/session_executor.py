@@ -0,0 +1,85 @@
+"""
+Session Executor
+Runs the work of one session in arrival order while different sessions run
+in parallel
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+from config import SESSION_QUEUE_MAX
+
+
+class SessionBusyError(Exception):
+    """Raised when a session already has the maximum number of requests queued"""
+
+
+class _SessionTurns:
+    """FIFO turn-taking for one session"""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()  # waiters are woken in arrival order
+        self.pending = 0            # running + waiting
+
+
+class SessionExecutor:
+    """
+    One turn at a time per session, no coordination between sessions
+
+    `async with executor.turn(session_id):` waits for the session's earlier
+    requests to finish, so context updates, step counters and stored
+    messages follow arrival order. At most `max_queue` requests (including
+    the running one) may be pending per session; more raise
+    SessionBusyError rather than building an unbounded backlog. A request
+    whose client disconnects while waiting simply leaves the queue. Idle
+    sessions hold no state.
+    """
+
+    def __init__(self, max_queue: int = SESSION_QUEUE_MAX):
+        self.max_queue = max_queue
+        self._sessions: Dict[str, _SessionTurns] = {}
+        self.stats = {"turns": 0, "waited": 0, "rejected": 0, "wait_ms": 0.0, "max_pending": 0}
+
+    @asynccontextmanager
+    async def turn(self, session_id: Optional[str]):
+        """Run the block as the session's next turn (no-op without a session id)"""
+        if not session_id:
+            yield
+            return
+
+        turns = self._sessions.get(session_id)
+        if turns is None:
+            turns = self._sessions[session_id] = _SessionTurns()
+        if turns.pending >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise SessionBusyError(f"Session {session_id} already has {turns.pending} requests pending")
+
+        turns.pending += 1
+        self.stats["max_pending"] = max(self.stats["max_pending"], turns.pending)
+        try:
+            if turns.lock.locked():
+                self.stats["waited"] += 1
+            started = time.perf_counter()
+            async with turns.lock:
+                self.stats["turns"] += 1
+                self.stats["wait_ms"] += (time.perf_counter() - started) * 1000
+                yield
+        finally:
+            turns.pending -= 1
+            if turns.pending == 0 and self._sessions.get(session_id) is turns:
+                del self._sessions[session_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        turns = self.stats["turns"]
+        return {
+            "active_sessions": len(self._sessions),
+            "max_queue": self.max_queue,
+            "turns": turns,
+            "waited": self.stats["waited"],
+            "rejected": self.stats["rejected"],
+            "max_pending": self.stats["max_pending"],
+            "avg_wait_ms": round(self.stats["wait_ms"] / turns, 2) if turns else 0.0,
+        }
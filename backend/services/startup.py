@@ -0,0 +1,155 @@
+"""
+Startup Profiling
+Times each subsystem as it is built (at import, in the lifespan, or lazily on
+first use) along with the resident memory it added, and defers heavy
+subsystems until something needs them
+"""
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def rss_mb() -> float:
+    """Current resident set size (falls back to the peak where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # KiB on Linux, bytes on macOS
+        return peak / 2 ** 20 if peak > 2 ** 32 else peak / 1024
+
+
+class StartupProfiler:
+    """Per-subsystem build times and memory, for GET /startup/stats"""
+
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.created_rss = rss_mb()
+        self.ready_at: Optional[float] = None
+        self.phases: List[Dict[str, Any]] = []
+        # Warm-up stage: subsystem -> "pending", "warm" or "failed: <error>"
+        self.warmup: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def checkpoint(self, name: str):
+        """Record everything since the profiler was created as one phase (e.g. imports)"""
+        now = time.perf_counter()
+        with self._lock:
+            self.phases.append({
+                "name": name,
+                "ms": round((now - self.created) * 1000, 1),
+                "rss_mb": round(rss_mb() - self.created_rss, 1),
+                "lazy": False,
+                "at_s": 0.0,
+            })
+
+    @contextmanager
+    def phase(self, name: str, lazy: bool = False):
+        """Time a block; `lazy` marks subsystems built on first use rather than at startup"""
+        started, rss_before = time.perf_counter(), rss_mb()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append({
+                    "name": name,
+                    "ms": round((time.perf_counter() - started) * 1000, 1),
+                    "rss_mb": round(rss_mb() - rss_before, 1),
+                    "lazy": lazy,
+                    "at_s": round(started - self.created, 3),
+                })
+
+    def mark_ready(self):
+        """Startup finished: the server is about to accept requests"""
+        self.ready_at = time.perf_counter()
+
+    def expect_warmup(self, names: List[str]):
+        """Register subsystems that must finish warming up before the server is ready"""
+        for name in names:
+            self.warmup[name] = "pending"
+
+    @contextmanager
+    def warming(self, name: str):
+        """
+        Warm one subsystem up, timed as a "warm-up:<name>" phase
+
+        A failed warm-up is recorded but does not hold readiness back: the
+        subsystem is built again on first use, as it would be without warm-up.
+        """
+        try:
+            with self.phase(f"warm-up:{name}"):
+                yield
+        except Exception as e:
+            self.warmup[name] = f"failed: {e}"
+            print(f"⚠ Warm-up of {name} failed: {e}")
+        else:
+            self.warmup[name] = "warm"
+
+    @property
+    def ready(self) -> bool:
+        """Startup finished and no warm-up is still pending"""
+        return self.ready_at is not None and "pending" not in self.warmup.values()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "startup_s": round(self.ready_at - self.created, 3) if self.ready_at else None,
+            "rss_mb_at_import": round(self.created_rss, 1),
+            "rss_mb": round(rss_mb(), 1),
+            "phases": list(self.phases),
+            "warmup": dict(self.warmup),
+        }
+
+    def print_report(self):
+        stats = self.get_stats()
+        print(f"✓ Startup in {stats['startup_s']}s, {stats['rss_mb']:.0f} MB resident")
+        for phase in stats["phases"]:
+            kind = "lazy" if phase["lazy"] else "eager"
+            print(f"   {phase['name']:<20} {phase['ms']:>8.1f} ms {phase['rss_mb']:>+7.1f} MB  ({kind})")
+
+
+_profiler: Optional[StartupProfiler] = None
+
+
+def get_startup_profiler() -> StartupProfiler:
+    """Process-wide profiler; created by the first import, i.e. early in main.py"""
+    global _profiler
+    if _profiler is None:
+        _profiler = StartupProfiler()
+    return _profiler
+
+
+class LazyService(Generic[T]):
+    """
+    Proxy that builds a service on first attribute access
+
+    `load()` builds it explicitly (e.g. for warm-up from a thread); building
+    happens once even under concurrent first use, and is recorded as a lazy
+    startup phase.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def load(self) -> T:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    with get_startup_profiler().phase(self._name, lazy=True):
+                        self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
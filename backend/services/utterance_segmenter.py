@@ -0,0 +1,199 @@
+"""
+Utterance Segmenter
+Groups the gestures streamed from continuous capture into utterances, so the
+agent pipeline runs once per sentence instead of once per gesture
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Set, Callable, Awaitable
+
+from config import (
+    UTTERANCE_PAUSE_S,
+    UTTERANCE_TERMINATORS,
+    UTTERANCE_MAX_GESTURES,
+)
+
+# (session_id, gestures, emojis) -> pipeline result
+ProcessUtterance = Callable[[str, List[str], List[str]], Awaitable[Dict[str, Any]]]
+
+# Completed utterances kept per session for GET pickup, and for how long
+RESULTS_PER_SESSION = 5
+RESULT_TTL_S = 120.0
+
+
+class _Utterance:
+    """Gestures collected so far in one session"""
+
+    __slots__ = ("gestures", "emojis", "started", "last_seen", "last_frame")
+
+    def __init__(self, now: float):
+        self.gestures: List[str] = []
+        self.emojis: List[str] = []
+        self.started = now
+        self.last_seen = now
+        # Gestures of the previous frame: a gesture held across frames counts once
+        self.last_frame: tuple = ()
+
+
+class UtteranceSegmenter:
+    """
+    Per-session gesture accumulator in front of the agent pipeline
+
+    Each frame's gestures are appended to the session's open utterance; a
+    gesture held over consecutive frames counts once, and counts again after
+    a frame without it. The utterance closes when
+    - a terminator gesture is shown (not part of the utterance),
+    - a frame arrives after `pause_s` without new gestures, or
+    - it reaches `max_gestures`,
+    and `process` then runs once on the whole sequence. The request whose
+    frame closed it gets the result. Utterances left open because capture
+    stopped are closed by the sweep, each processed in its own task; their
+    results wait in `results` for the client to collect. If `process`
+    fails (e.g. the session is busy), the result has status "failed" with
+    the error and the gestures, so the sentence is reported, not dropped.
+    """
+
+    def __init__(
+        self,
+        process: ProcessUtterance,
+        pause_s: float = UTTERANCE_PAUSE_S,
+        terminators: Optional[List[str]] = None,
+        max_gestures: int = UTTERANCE_MAX_GESTURES
+    ):
+        self.process = process
+        self.pause_s = pause_s
+        self.terminators = set(UTTERANCE_TERMINATORS if terminators is None else terminators)
+        self.max_gestures = max_gestures
+        self._open: Dict[str, _Utterance] = {}
+        # session_id -> (completed_at, utterance result)
+        self.results: Dict[str, deque] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {
+            "frames": 0, "gestures": 0, "utterances": 0, "failed": 0,
+            "by_terminator": 0, "by_pause": 0, "by_length": 0, "by_sweep": 0,
+        }
+
+    async def add_frame(self, session_id: str, gestures: List[str], emojis: List[str]) -> Dict[str, Any]:
+        """Feed one frame's gestures; returns the open utterance, or the completed one with its result"""
+        self.stats["frames"] += 1
+        now = time.monotonic()
+        utterance = self._open.get(session_id)
+
+        if utterance and utterance.gestures and now - utterance.last_seen >= self.pause_s:
+            # The signer paused; this frame starts the next utterance
+            closed = self._close(session_id, "by_pause")
+            if gestures:
+                self._append(session_id, gestures, emojis, now)
+            return await self._complete(session_id, closed, "pause")
+
+        if self.terminators.intersection(gestures):
+            if utterance and utterance.gestures:
+                return await self._complete(session_id, self._close(session_id, "by_terminator"), "terminator")
+            self._open.pop(session_id, None)
+            return self._listening(session_id)
+
+        if gestures:
+            utterance = self._append(session_id, gestures, emojis, now)
+            if len(utterance.gestures) >= self.max_gestures:
+                return await self._complete(session_id, self._close(session_id, "by_length"), "length")
+        elif utterance:
+            utterance.last_frame = ()
+        return self._listening(session_id)
+
+    def _append(self, session_id: str, gestures: List[str], emojis: List[str], now: float) -> _Utterance:
+        utterance = self._open.get(session_id)
+        if utterance is None:
+            utterance = self._open[session_id] = _Utterance(now)
+        frame = tuple(gestures)
+        if frame != utterance.last_frame:
+            utterance.gestures.extend(gestures)
+            utterance.emojis.extend(emojis)
+            self.stats["gestures"] += len(gestures)
+        # Holding a gesture is not a pause
+        utterance.last_seen = now
+        utterance.last_frame = frame
+        return utterance
+
+    def _close(self, session_id: str, reason: str) -> _Utterance:
+        self.stats["utterances"] += 1
+        self.stats[reason] += 1
+        return self._open.pop(session_id)
+
+    async def _complete(self, session_id: str, utterance: _Utterance, closed_by: str) -> Dict[str, Any]:
+        completed = {
+            "status": "complete",
+            "closed_by": closed_by,
+            "gestures": utterance.gestures,
+            "emojis": utterance.emojis,
+            "duration_ms": round((utterance.last_seen - utterance.started) * 1000, 1),
+        }
+        try:
+            completed["communication_result"] = await self.process(session_id, utterance.gestures, utterance.emojis)
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"⚠ Utterance of session {session_id} failed: {e}")
+            return {**completed, "status": "failed", "error": str(e), "communication_result": None}
+        return completed
+
+    async def _complete_later(self, session_id: str, utterance: _Utterance):
+        """Sweep task: process one closed utterance and keep its result for pickup"""
+        result = await self._complete(session_id, utterance, "pause")
+        self.results.setdefault(session_id, deque(maxlen=RESULTS_PER_SESSION)).append((time.monotonic(), result))
+
+    def _listening(self, session_id: str) -> Dict[str, Any]:
+        utterance = self._open.get(session_id)
+        return {
+            "status": "listening",
+            "gestures": list(utterance.gestures) if utterance else [],
+            "emojis": list(utterance.emojis) if utterance else [],
+        }
+
+    def take_results(self, session_id: str) -> List[Dict[str, Any]]:
+        """Utterances the sweep completed for a session since the last call"""
+        results = self.results.pop(session_id, None)
+        return [result for _, result in results] if results else []
+
+    async def sweep(self):
+        """Close utterances whose capture stopped mid-sentence, and expire uncollected results"""
+        now = time.monotonic()
+        for session_id, utterance in list(self._open.items()):
+            if now - utterance.last_seen < self.pause_s or self._open.get(session_id) is not utterance:
+                continue
+            if not utterance.gestures:
+                del self._open[session_id]
+                continue
+            # One task per utterance, so a slow pipeline run does not hold up other sessions
+            task = asyncio.create_task(self._complete_later(session_id, self._close(session_id, "by_sweep")))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        for session_id, results in list(self.results.items()):
+            while results and now - results[0][0] > RESULT_TTL_S:
+                results.popleft()
+            if not results:
+                del self.results[session_id]
+
+    async def run_forever(self):
+        """Periodic sweep"""
+        while True:
+            await asyncio.sleep(max(self.pause_s / 2, 0.25))
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Utterance sweep failed: {e}")
+
+    async def close(self):
+        """Wait for utterances the sweep is still processing (shutdown)"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        utterances = self.stats["utterances"]
+        return {
+            **self.stats,
+            "pause_s": self.pause_s,
+            "terminators": sorted(self.terminators),
+            "open_utterances": len(self._open),
+            "processing": len(self._tasks),
+            "gestures_per_utterance": round(self.stats["gestures"] / utterances, 2) if utterances else 0.0,
+        }
@@ -0,0 +1,191 @@
+"""
+Video Analysis
+Offline gesture analysis of recorded clips: frames are streamed from the
+file, run through MediaPipe in tracking mode in order, and collapsed into a
+time-aligned gesture timeline. Clips are analyzed in parallel worker processes.
+
+Usage:
+    python -m services.video_analysis lesson1.mp4 lesson2.mp4 [--fps 10] [--workers 2]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from config import VIDEO_ANALYSIS_WORKERS, VIDEO_SAMPLE_FPS
+
+
+def iter_video_frames(path: str, sample_fps: float = VIDEO_SAMPLE_FPS) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Yield (timestamp_ms, BGR frame) from a video file, one frame in memory at a time
+
+    Frames are sampled at roughly `sample_fps` (0 keeps every frame); skipped
+    frames are grabbed without being decoded.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        step = max(1, round(fps / sample_fps)) if sample_fps > 0 and fps > 0 else 1
+        index = 0
+        while capture.grab():
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                # Container timestamps when present, else derived from the frame rate
+                timestamp = capture.get(cv2.CAP_PROP_POS_MSEC)
+                if not timestamp and index and fps:
+                    timestamp = index * 1000.0 / fps
+                yield round(timestamp, 1), frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def iter_image_frames(images: Sequence[bytes], fps: float) -> Iterator[Tuple[float, np.ndarray]]:
+    """Yield (timestamp_ms, BGR frame) for encoded images taken `fps` times a second"""
+    for index, data in enumerate(images):
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Could not decode frame {index}")
+        yield round(index * 1000.0 / fps, 1), frame
+
+
+def build_timeline(frames: Sequence[Tuple[float, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Collapse per-frame results into segments of consecutive frames showing
+    the same gestures; frames without gestures end a segment
+    """
+    timeline = []
+    current = None
+    for timestamp, result in frames:
+        gestures = sorted(g["gesture"] for g in result.get("gestures", []))
+        if current and gestures == current["gestures"]:
+            current["end_ms"] = timestamp
+            current["frames"] += 1
+            current["confidence"] += result.get("confidence", 0.0)
+            continue
+        if current:
+            timeline.append(current)
+            current = None
+        if gestures:
+            current = {
+                "start_ms": timestamp,
+                "end_ms": timestamp,
+                "gestures": gestures,
+                "emojis": result.get("emojis", []),
+                "frames": 1,
+                "confidence": result.get("confidence", 0.0),
+            }
+    if current:
+        timeline.append(current)
+    for segment in timeline:
+        segment["confidence"] = round(segment["confidence"] / segment["frames"], 3)
+    return timeline
+
+
+def analyze_frames(frames: Iterator[Tuple[float, np.ndarray]]) -> Dict[str, Any]:
+    """Run one clip's frames through a fresh single-stream VisionService"""
+    from services.vision_service import VisionService
+
+    # Every frame of a recording matters, and tracking state must not leak between clips
+    vision = VisionService(skip_threshold=0, single_stream=True)
+    if not vision.mediapipe_available:
+        raise RuntimeError("MediaPipe not installed")
+    try:
+        results = [(timestamp, vision.process_image(frame, "clip")) for timestamp, frame in frames]
+    finally:
+        vision.cleanup()
+
+    stats = vision.get_stats()
+    return {
+        "frames_analyzed": len(results),
+        "duration_ms": results[-1][0] if results else 0.0,
+        "hands_frames": sum(1 for _, result in results if result.get("hands_detected")),
+        "avg_inference_ms": stats["avg_inference_ms"],
+        "timeline": build_timeline(results),
+    }
+
+
+def analyze_video(path: str, sample_fps: float = VIDEO_SAMPLE_FPS) -> Dict[str, Any]:
+    """Gesture timeline for a video file"""
+    return {"source": path, **analyze_frames(iter_video_frames(path, sample_fps))}
+
+
+def analyze_images(images: Sequence[bytes], fps: float) -> Dict[str, Any]:
+    """Gesture timeline for an ordered batch of encoded frames"""
+    return {"source": "frames", **analyze_frames(iter_image_frames(images, fps))}
+
+
+class VideoAnalyzer:
+    """
+    Process pool for clip analysis
+
+    MediaPipe inference is CPU-bound and holds the GIL for part of each
+    frame, so clips are analyzed in separate processes (started with
+    `spawn`, since MediaPipe and the server's threads do not survive fork).
+    The pool is created on first use.
+    """
+
+    def __init__(self, max_workers: int = VIDEO_ANALYSIS_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            self.close()
+            raise RuntimeError("Video analysis worker crashed")
+
+    async def analyze_videos(self, paths: Sequence[str], sample_fps: float = VIDEO_SAMPLE_FPS) -> List[Dict[str, Any]]:
+        """Analyze clips concurrently, one per worker; results in input order"""
+        return await asyncio.gather(*(self._run(analyze_video, path, sample_fps) for path in paths))
+
+    async def analyze_images(self, images: Sequence[bytes], fps: float) -> Dict[str, Any]:
+        return await self._run(analyze_images, list(images), fps)
+
+    def analyze_videos_sync(self, paths: Sequence[str], sample_fps: float = VIDEO_SAMPLE_FPS) -> List[Dict[str, Any]]:
+        return list(self._executor().map(analyze_video, paths, [sample_fps] * len(paths)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gesture timelines for recorded clips")
+    parser.add_argument("videos", nargs="+", help="video files")
+    parser.add_argument("--fps", type=float, default=VIDEO_SAMPLE_FPS, help="frames analyzed per second (0 = all)")
+    parser.add_argument("--workers", type=int, default=VIDEO_ANALYSIS_WORKERS, help="clips analyzed in parallel")
+    args = parser.parse_args()
+
+    analyzer = VideoAnalyzer(max_workers=min(args.workers, len(args.videos)))
+    try:
+        for result in analyzer.analyze_videos_sync(args.videos, args.fps):
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+    finally:
+        analyzer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
 import cv2
 import numpy as np
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
 import base64
+import time
+
+from config import (
+    VISION_INFERENCE_WIDTH,
+    VISION_ROI_ENABLED,
+    VISION_ROI_PADDING,
+    VISION_ROI_REFRESH_FRAMES,
+    VISION_SKIP_MAD_THRESHOLD,
+    GESTURE_MODEL_PATH,
+)
+from services.gesture_classifier import GESTURE_EMOJIS, LandmarkRecognizer, supported_gestures
 
 class VisionService:
     """
@@ -10,7 +22,63 @@ class VisionService:
     Compatible with MediaPipe v0.10.30+
     """
     
-    def __init__(self):
+    # Per-session tracking state kept for at most this many sessions
+    MAX_TRACKED_SESSIONS = 256
+    
+    # (width, height) of the grayscale thumbnail compared by the skip gate
+    SIGNATURE_SIZE = (64, 48)
+    # Side of the square blocks whose mean difference is tested (divides both)
+    SIGNATURE_BLOCK = 8
+    
+    def __init__(
+        self,
+        inference_width: int = VISION_INFERENCE_WIDTH,
+        roi_enabled: bool = VISION_ROI_ENABLED,
+        roi_padding: float = VISION_ROI_PADDING,
+        roi_refresh_frames: int = VISION_ROI_REFRESH_FRAMES,
+        skip_threshold: float = VISION_SKIP_MAD_THRESHOLD,
+        classifier_path: str = GESTURE_MODEL_PATH,
+        single_stream: bool = False
+    ):
+        """
+        Args:
+            inference_width: frames wider than this are downscaled before
+                detection (0 keeps the full resolution)
+            roi_enabled: once a hand is found, detect within a padded box
+                around the previous landmarks instead of the whole frame
+            roi_padding: box padding, as a fraction of the hand's size
+            roi_refresh_frames: run on the full frame at least this often so
+                newly raised hands are picked up
+            skip_threshold: frames whose mean absolute grayscale difference
+                from the last processed frame stays below this in every block
+                of the thumbnail reuse its result (0 processes every frame)
+            classifier_path: trained landmark classifier; the hand-written
+                rules are used when the file does not exist ("" forces them)
+            single_stream: all frames come from one camera in order (a
+                recorded clip). Only then, and without ROI crops, does
+                MediaPipe track the hand from frame to frame; a shared
+                service interleaves sessions and crops, which would feed
+                its tracker priors from the wrong picture, so it detects
+                on every frame (the ROI keeps that cheap)
+        """
+        self.inference_width = inference_width
+        self.roi_enabled = roi_enabled
+        self.roi_padding = roi_padding
+        self.roi_refresh_frames = roi_refresh_frames
+        self.skip_threshold = skip_threshold
+        self.recognizer = LandmarkRecognizer(classifier_path)
+        self.classifier = self.recognizer.classifier
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {
+            "frames_received": 0,
+            "frames_skipped": 0,
+            "frames": 0,
+            "roi_frames": 0,
+            "roi_misses": 0,
+            "decode_ms": 0.0,
+            "inference_ms": 0.0,
+        }
+        
         try:
             import mediapipe as mp
             
@@ -20,7 +88,7 @@ class VisionService:
             
             # Initialize hands detector
             self.hands = self.mp_hands.Hands(
-                static_image_mode=False,
+                static_image_mode=not (single_stream and not roi_enabled),
                 max_num_hands=2,
                 min_detection_confidence=0.5,
                 min_tracking_confidence=0.5
@@ -30,6 +98,8 @@ class VisionService:
             print("✅ MediaPipe initialized successfully")
             print(f"   Version: {mp.__version__}")
             print("   Hand gesture detection enabled")
+            if self.classifier:
+                print(f"   Gesture model: {classifier_path}")
                 
         except ImportError:
             self.mediapipe_available = False
@@ -47,37 +117,40 @@ class VisionService:
             print("  Vision features disabled - system will use manual input")
         
         # Gesture mappings
-        self.gesture_to_emoji = {
-            "wave": "👋",
-            "thumbs_up": "👍",
-            "thumbs_down": "👎",
-            "peace": "✌️",
-            "ok": "👌",
-            "pointing_up": "☝️",
-            "fist": "✊",
-            "open_palm": "🖐️",
-            "raised_hand": "🙋",
-            "stop": "✋",
-            "i_love_you": "🤟",  # ILY sign - pinky, index, and thumb extended
-            "call_me": "🤙",  # Shaka/call me sign - thumb and pinky extended
-            "rock_on": "🤘",  # Rock on sign - index and pinky extended
-            "crossed_fingers": "🤞",  # Crossed fingers - index and middle crossed
-            "pinch": "🤏",  # Pinching gesture - thumb and index close
-            "three": "🖖",  # Vulcan salute or number three
-            "pray": "🙏",  # Praying hands - palms together
-            "clap": "👏"  # Clapping - two open palms
-        }
+        self.gesture_to_emoji = GESTURE_EMOJIS
     
-    def process_frame(self, frame_data: str) -> Dict[str, Any]:
+    def process_frame(self, frame_data: str, session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a single frame from webcam
         
         Args:
             frame_data: Base64 encoded image
+            session_id: Webcam session, used to track the hand between frames
+                and to reuse results for unchanged frames; without one every
+                frame is processed on its own
         
         Returns:
             Dict with detected gestures and landmarks
         """
+        try:
+            img_bytes = self._frame_bytes(frame_data)
+        except Exception as e:
+            print(f"Error processing frame: {e}")
+            return {
+                "error": str(e),
+                "hands_detected": 0,
+                "gestures": [],
+                "emojis": []
+            }
+        return self.process_encoded(img_bytes, session_id)
+    
+    def process_encoded(self, img_bytes, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process an encoded (JPEG/PNG) frame
+        
+        Accepts any bytes-like object, so vision workers can pass a view into
+        shared memory without copying it.
+        """
         if not self.mediapipe_available:
             return {
                 "error": "MediaPipe not installed",
@@ -88,55 +161,26 @@ class VisionService:
             }
         
         try:
-            # Decode base64 image
-            image = self._decode_image(frame_data)
+            started = time.perf_counter()
+            state = self._session_state(session_id)
+            self.stats["frames_received"] += 1
             
-            # Convert BGR to RGB
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            # Near-duplicate of the last processed frame: reuse its result
+            signature = self._frame_signature(img_bytes) if self.skip_threshold > 0 and session_id is not None else None
+            if signature is not None and self._unchanged(state, signature):
+                self.stats["frames_skipped"] += 1
+                return {**state["result"], "cached": True}
             
-            # Process with MediaPipe
-            results = self.hands.process(image_rgb)
+            # Decode image (reduced and downscaled to the inference width)
+            image = self._decode_bytes(img_bytes)
+            if image is None:
+                raise ValueError("Could not decode image")
             
-            if not results.multi_hand_landmarks:
-                return {
-                    "hands_detected": 0,
-                    "gestures": [],
-                    "emojis": [],
-                    "confidence": 0.0
-                }
-            
-            # Detect gestures from landmarks
-            gestures = []
-            emojis = []
-            
-            for hand_landmarks, handedness in zip(
-                results.multi_hand_landmarks,
-                results.multi_handedness
-            ):
-                hand_label = handedness.classification[0].label  # "Left" or "Right"
-                confidence = handedness.classification[0].score
-                
-                # Recognize gesture
-                gesture = self._recognize_gesture(hand_landmarks, hand_label)
-                
-                if gesture:
-                    gestures.append({
-                        "gesture": gesture,
-                        "hand": hand_label,
-                        "confidence": confidence
-                    })
-                    
-                    # Map to emoji
-                    emoji = self.gesture_to_emoji.get(gesture, "")
-                    if emoji:
-                        emojis.append(emoji)
-            
-            return {
-                "hands_detected": len(results.multi_hand_landmarks),
-                "gestures": gestures,
-                "emojis": emojis,
-                "confidence": sum(g["confidence"] for g in gestures) / len(gestures) if gestures else 0.0
-            }
+            result = self._analyze(image, state, started)
+            if signature is not None:
+                state["signature"] = signature
+                state["result"] = result
+            return result
             
         except Exception as e:
             print(f"Error processing frame: {e}")
@@ -147,180 +191,225 @@ class VisionService:
                 "emojis": []
             }
     
-    def _decode_image(self, frame_data: str) -> np.ndarray:
-        """Decode base64 image to numpy array"""
+    def process_image(self, image: np.ndarray, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process an already decoded BGR frame (e.g. from a video file)
+        
+        Frames of one session must be passed in order; the duplicate-frame
+        gate is not applied.
+        """
+        if not self.mediapipe_available:
+            return {"error": "MediaPipe not installed", "hands_detected": 0, "gestures": [], "emojis": [], "confidence": 0.0}
+        started = time.perf_counter()
+        return self._analyze(self._downscale(image), self._session_state(session_id), started)
+    
+    def _analyze(self, image: np.ndarray, state: Dict[str, Any], started: float) -> Dict[str, Any]:
+        decoded = time.perf_counter()
+        
+        # Process with MediaPipe, inside the previous hand ROI when tracking
+        results = self._detect_hands(image, state)
+        self._record_timing(started, decoded, time.perf_counter())
+        state["roi"] = self._landmarks_roi(results.multi_hand_landmarks)
+        
+        return self._build_result(results)
+    
+    def _build_result(self, results) -> Dict[str, Any]:
+        """Gestures and emojis for MediaPipe hand results"""
+        if not results.multi_hand_landmarks:
+            return self.recognizer.gesture_result([])
+        
+        return self.recognizer.gesture_result([
+            (
+                hand_landmarks,
+                handedness.classification[0].label,  # "Left" or "Right"
+                handedness.classification[0].score
+            )
+            for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness)
+        ])
+    
+    @staticmethod
+    def _frame_bytes(frame_data: str) -> bytes:
+        """Encoded image bytes from a base64 string or data URL"""
         # Remove data URL prefix if present
         if "base64," in frame_data:
             frame_data = frame_data.split("base64,")[1]
-        
-        # Decode base64
-        img_bytes = base64.b64decode(frame_data)
-        
+        return base64.b64decode(frame_data)
+    
+    def _decode_image(self, frame_data: str) -> Optional[np.ndarray]:
+        """Decode base64 image to numpy array, no wider than the inference width"""
+        return self._decode_bytes(self._frame_bytes(frame_data))
+    
+    def _decode_bytes(self, img_bytes: bytes) -> Optional[np.ndarray]:
         # Convert to numpy array
         nparr = np.frombuffer(img_bytes, np.uint8)
         
-        # Decode image
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decode image; JPEG decodes at 1/2 or 1/4 scale almost for free
+        image = cv2.imdecode(nparr, self._decode_flag(img_bytes))
+        if image is None:
+            return None
         
-        return image
+        return self._downscale(image)
     
-    def _recognize_gesture(self, landmarks, hand_label: str) -> Optional[str]:
+    def _frame_signature(self, img_bytes: bytes) -> Optional[np.ndarray]:
+        """Tiny grayscale thumbnail for change detection (1/8-scale JPEG decode)"""
+        small = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if small is None:
+            return None
+        return cv2.resize(small, self.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+    
+    def _unchanged(self, state: Dict[str, Any], signature: np.ndarray) -> bool:
         """
-        Recognize gesture from hand landmarks
-        
-        Args:
-            landmarks: MediaPipe hand landmarks
-            hand_label: "Left" or "Right"
+        True if no part of the frame moved since the last processed one
         
-        Returns:
-            Gesture name or None
+        Compares block by block rather than over the whole thumbnail, so a
+        hand moving in a small part of the picture still counts as a change.
         """
-        # Get landmark positions
-        thumb_tip = landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-        index_tip = landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-        middle_tip = landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
-        ring_tip = landmarks.landmark[self.mp_hands.HandLandmark.RING_FINGER_TIP]
-        pinky_tip = landmarks.landmark[self.mp_hands.HandLandmark.PINKY_TIP]
-        
-        wrist = landmarks.landmark[self.mp_hands.HandLandmark.WRIST]
-        
-        thumb_ip = landmarks.landmark[self.mp_hands.HandLandmark.THUMB_IP]
-        index_mcp = landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_MCP]
-        middle_mcp = landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_MCP]
-        ring_mcp = landmarks.landmark[self.mp_hands.HandLandmark.RING_FINGER_MCP]
-        pinky_mcp = landmarks.landmark[self.mp_hands.HandLandmark.PINKY_MCP]
-        
-        # Calculate which fingers are extended
-        fingers_up = self._count_fingers_up(landmarks)
-        
-        # Gesture recognition logic
-        
-        # Thumbs up: thumb up, other fingers down
-        if fingers_up["thumb"] and not any([
-            fingers_up["index"],
-            fingers_up["middle"],
-            fingers_up["ring"],
-            fingers_up["pinky"]
-        ]):
-            return "thumbs_up"
-        
-        # Thumbs down: thumb down, other fingers curled
-        if not fingers_up["thumb"] and thumb_tip.y > thumb_ip.y:
-            if not any([fingers_up["index"], fingers_up["middle"], fingers_up["ring"], fingers_up["pinky"]]):
-                return "thumbs_down"
-        
-        # Peace sign: index and middle up, others down
-        if fingers_up["index"] and fingers_up["middle"]:
-            if not fingers_up["ring"] and not fingers_up["pinky"]:
-                return "peace"
-        
-        # OK sign: thumb and index forming circle
-        thumb_index_dist = self._distance(thumb_tip, index_tip)
-        if thumb_index_dist < 0.05:  # Close together
-            if fingers_up["middle"] and fingers_up["ring"] and fingers_up["pinky"]:
-                return "ok"
-        
-        # Pointing up: only index finger up
-        if fingers_up["index"] and not any([
-            fingers_up["middle"],
-            fingers_up["ring"],
-            fingers_up["pinky"]
-        ]):
-            return "pointing_up"
-        
-        # Fist: all fingers down
-        if not any(fingers_up.values()):
-            return "fist"
-        
-        # I Love You sign: thumb, index, and pinky up (middle and ring down)
-        if fingers_up["thumb"] and fingers_up["index"] and fingers_up["pinky"]:
-            if not fingers_up["middle"] and not fingers_up["ring"]:
-                return "i_love_you"
-        
-        # Call me / Shaka: thumb and pinky up (others down)
-        if fingers_up["thumb"] and fingers_up["pinky"]:
-            if not any([fingers_up["index"], fingers_up["middle"], fingers_up["ring"]]):
-                return "call_me"
-        
-        # Rock on: index and pinky up (thumb, middle, ring down)
-        if fingers_up["index"] and fingers_up["pinky"]:
-            if not fingers_up["thumb"] and not fingers_up["middle"] and not fingers_up["ring"]:
-                return "rock_on"
-        
-        # Three fingers / Vulcan salute: index, middle, ring up
-        if fingers_up["index"] and fingers_up["middle"] and fingers_up["ring"]:
-            if not fingers_up["pinky"]:
-                return "three"
-        
-        # Pinch: thumb and index close together, others down
-        thumb_index_dist = self._distance(thumb_tip, index_tip)
-        if thumb_index_dist < 0.03:  # Very close together
-            if not any([fingers_up["middle"], fingers_up["ring"], fingers_up["pinky"]]):
-                return "pinch"
-        
-        # Open palm / Stop: all fingers up
-        if all([
-            fingers_up["thumb"],
-            fingers_up["index"],
-            fingers_up["middle"],
-            fingers_up["ring"],
-            fingers_up["pinky"]
-        ]):
-            # Check if hand is raised (above wrist level)
-            avg_finger_y = (index_tip.y + middle_tip.y + ring_tip.y + pinky_tip.y) / 4
-            if avg_finger_y < wrist.y - 0.1:  # Fingers significantly above wrist
-                return "raised_hand"
-            else:
-                return "open_palm"
-        
-        # Wave: open palm with horizontal movement (detected over multiple frames)
-        # For now, just detect open palm
-        if all([fingers_up["index"], fingers_up["middle"], fingers_up["ring"], fingers_up["pinky"]]):
-            return "wave"
-        
+        previous = state.get("signature")
+        if previous is None or previous.shape != signature.shape:
+            return False
+        width, height = self.SIGNATURE_SIZE
+        block = self.SIGNATURE_BLOCK
+        diff = np.abs(signature - previous).reshape(height // block, block, width // block, block)
+        return diff.mean(axis=(1, 3)).max() < self.skip_threshold
+    
+    def _decode_flag(self, img_bytes: bytes) -> int:
+        """Largest reduced-decode mode that keeps the image at least inference_width wide"""
+        width = self._image_width(img_bytes)
+        if not self.inference_width or not width:
+            return cv2.IMREAD_COLOR
+        if width >= 4 * self.inference_width:
+            return cv2.IMREAD_REDUCED_COLOR_4
+        if width >= 2 * self.inference_width:
+            return cv2.IMREAD_REDUCED_COLOR_2
+        return cv2.IMREAD_COLOR
+    
+    @staticmethod
+    def _image_width(img_bytes: bytes) -> Optional[int]:
+        """Pixel width from a JPEG or PNG header, without decoding"""
+        if img_bytes[:8] == b"\x89PNG\r\n\x1a\n" and len(img_bytes) >= 24:
+            return int.from_bytes(img_bytes[16:20], "big")
+        if img_bytes[:2] != b"\xff\xd8":
+            return None
+        # Walk JPEG segments up to the start-of-frame marker
+        i = 2
+        while i + 9 < len(img_bytes):
+            if img_bytes[i] != 0xFF:
+                return None
+            marker = img_bytes[i + 1]
+            if marker == 0xFF:
+                i += 1
+                continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                return int.from_bytes(img_bytes[i + 7:i + 9], "big")
+            i += 2 + int.from_bytes(img_bytes[i + 2:i + 4], "big")
         return None
     
-    def _count_fingers_up(self, landmarks) -> Dict[str, bool]:
-        """Count which fingers are extended"""
-        # Get key landmarks
-        thumb_tip = landmarks.landmark[self.mp_hands.HandLandmark.THUMB_TIP]
-        thumb_ip = landmarks.landmark[self.mp_hands.HandLandmark.THUMB_IP]
-        
-        index_tip = landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-        index_pip = landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_PIP]
-        
-        middle_tip = landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
-        middle_pip = landmarks.landmark[self.mp_hands.HandLandmark.MIDDLE_FINGER_PIP]
-        
-        ring_tip = landmarks.landmark[self.mp_hands.HandLandmark.RING_FINGER_TIP]
-        ring_pip = landmarks.landmark[self.mp_hands.HandLandmark.RING_FINGER_PIP]
-        
-        pinky_tip = landmarks.landmark[self.mp_hands.HandLandmark.PINKY_TIP]
-        pinky_pip = landmarks.landmark[self.mp_hands.HandLandmark.PINKY_PIP]
-        
-        # Check if each finger is extended (tip above PIP joint)
-        return {
-            "thumb": thumb_tip.x < thumb_ip.x - 0.05 or thumb_tip.x > thumb_ip.x + 0.05,  # Horizontal check for thumb
-            "index": index_tip.y < index_pip.y,
-            "middle": middle_tip.y < middle_pip.y,
-            "ring": ring_tip.y < ring_pip.y,
-            "pinky": pinky_tip.y < pinky_pip.y
-        }
+    def _downscale(self, image: np.ndarray) -> np.ndarray:
+        height, width = image.shape[:2]
+        if not self.inference_width or width <= self.inference_width:
+            return image
+        scale = self.inference_width / width
+        return cv2.resize(image, (self.inference_width, max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    
+    def _session_state(self, session_id: Optional[str]) -> Dict[str, Any]:
+        """Tracking state of a session; frames without one get a throwaway state (no ROI, no cache)"""
+        if session_id is None:
+            return {"roi": None, "frames_since_full": 0, "signature": None, "result": None}
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = {
+                "roi": None, "frames_since_full": 0, "signature": None, "result": None
+            }
+            if len(self._sessions) > self.MAX_TRACKED_SESSIONS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return state
     
-    def _distance(self, point1, point2) -> float:
-        """Calculate Euclidean distance between two landmarks"""
-        return np.sqrt(
-            (point1.x - point2.x) ** 2 +
-            (point1.y - point2.y) ** 2 +
-            (point1.z - point2.z) ** 2
+    def _detect_hands(self, image: np.ndarray, state: Dict[str, Any]):
+        """Run MediaPipe on the tracked ROI if there is one, else on the whole frame"""
+        roi = state["roi"] if self.roi_enabled else None
+        if roi and state["frames_since_full"] < self.roi_refresh_frames:
+            height, width = image.shape[:2]
+            x0, y0 = int(roi[0] * width), int(roi[1] * height)
+            x1, y1 = int(np.ceil(roi[2] * width)), int(np.ceil(roi[3] * height))
+            results = self.hands.process(cv2.cvtColor(image[y0:y1, x0:x1], cv2.COLOR_BGR2RGB))
+            self.stats["roi_frames"] += 1
+            if results.multi_hand_landmarks:
+                state["frames_since_full"] += 1
+                # Landmarks back to whole-frame coordinates, which the gesture thresholds assume
+                self._to_frame_coords(results.multi_hand_landmarks, roi)
+                return results
+            self.stats["roi_misses"] += 1
+        
+        state["frames_since_full"] = 0
+        return self.hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    
+    def _landmarks_roi(self, hands_landmarks) -> Optional[Tuple[float, float, float, float]]:
+        """Padded normalized (x0, y0, x1, y1) box around all detected hands"""
+        if not hands_landmarks:
+            return None
+        xs = [lm.x for hand in hands_landmarks for lm in hand.landmark]
+        ys = [lm.y for hand in hands_landmarks for lm in hand.landmark]
+        # Pad by the hand's larger side so fast movements stay inside the box
+        pad = max(max(xs) - min(xs), max(ys) - min(ys)) * (0.5 + self.roi_padding)
+        box = (
+            max(0.0, min(xs) - pad),
+            max(0.0, min(ys) - pad),
+            min(1.0, max(xs) + pad),
+            min(1.0, max(ys) + pad),
         )
+        if box[2] - box[0] < 0.05 or box[3] - box[1] < 0.05:
+            return None
+        return box
+    
+    @staticmethod
+    def _to_frame_coords(hands_landmarks, roi: Tuple[float, float, float, float]):
+        x0, y0, x1, y1 = roi
+        crop_width, crop_height = x1 - x0, y1 - y0
+        for hand in hands_landmarks:
+            for lm in hand.landmark:
+                lm.x = x0 + lm.x * crop_width
+                lm.y = y0 + lm.y * crop_height
+                lm.z = lm.z * crop_width
+    
+    def _record_timing(self, started: float, decoded: float, finished: float):
+        self.stats["frames"] += 1
+        self.stats["decode_ms"] += (decoded - started) * 1000
+        self.stats["inference_ms"] += (finished - decoded) * 1000
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-frame processing cost, ROI tracking hit rate and duplicate-frame skip rate"""
+        frames = self.stats["frames"] or 1
+        roi_frames = self.stats["roi_frames"]
+        received = self.stats["frames_received"]
+        return {
+            "frames_received": received,
+            "frames_skipped": self.stats["frames_skipped"],
+            "skip_rate": round(self.stats["frames_skipped"] / received, 3) if received else 0.0,
+            "skip_threshold": self.skip_threshold,
+            "frames": self.stats["frames"],
+            "inference_width": self.inference_width,
+            "roi_enabled": self.roi_enabled,
+            "avg_decode_ms": round(self.stats["decode_ms"] / frames, 2),
+            "avg_inference_ms": round(self.stats["inference_ms"] / frames, 2),
+            "roi_frames": roi_frames,
+            "roi_hit_rate": round((roi_frames - self.stats["roi_misses"]) / roi_frames, 3) if roi_frames else 0.0,
+            "gesture_model": self.classifier.describe() if self.classifier else "rules",
+        }
     
     def get_supported_gestures(self) -> List[Dict[str, str]]:
         """Get list of supported gestures"""
-        return [
-            {"gesture": gesture, "emoji": emoji}
-            for gesture, emoji in self.gesture_to_emoji.items()
-        ]
+        return supported_gestures()
+    
+    def warm_up(self):
+        """
+        Initialize the MediaPipe graph (and gesture model) with a blank frame,
+        so the first real frame does not pay for it
+        """
+        if self.hands:
+            self.hands.process(np.zeros((480, 640, 3), dtype=np.uint8))
+        self.recognizer.warm_up()
     
     def cleanup(self):
         """Clean up resources"""
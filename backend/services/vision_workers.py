@@ -0,0 +1,369 @@
+"""
+Vision Workers
+Runs frame inference in separate processes. Frames reach the workers through
+a shared-memory ring of preallocated slots: the API process copies each
+encoded frame into a free slot once and sends only the slot index, and the
+worker decodes straight out of shared memory. Nothing proportional to the
+frame size is pickled in either direction.
+"""
+import asyncio
+import base64
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Dict, Any, Optional, Set, Tuple
+
+from config import (
+    VISION_WORKERS,
+    VISION_RING_SLOTS,
+    VISION_RING_SLOT_KB,
+    VISION_RING_POLICY,
+    VISION_RING_WAIT_MS,
+    VISION_WORKER_TIMEOUT_S,
+)
+
+
+class FrameRing:
+    """
+    Fixed-size frame slots in one shared memory block
+
+    The creating process owns (and unlinks) the block; workers attach by
+    name. Slot i spans bytes [i * slot_bytes, (i + 1) * slot_bytes).
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=slots * slot_bytes)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, slot: int, data) -> int:
+        """Copy an encoded frame into a slot; returns its length"""
+        length = len(data)
+        if length > self.slot_bytes:
+            raise ValueError(f"Frame of {length} bytes does not fit a {self.slot_bytes}-byte slot")
+        offset = slot * self.slot_bytes
+        self.shm.buf[offset:offset + length] = data
+        return length
+
+    def view(self, slot: int, length: int) -> memoryview:
+        """Zero-copy view of a slot's contents (release it before close)"""
+        offset = slot * self.slot_bytes
+        return self.shm.buf[offset:offset + length]
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(ring_name: str, slots: int, slot_bytes: int, worker: int, tasks, results):
+    """Worker process: (request_id, slot, length, session_id) in, (request_id, slot, result) out"""
+    from services.vision_service import VisionService
+
+    ring = FrameRing(slots, slot_bytes, name=ring_name)
+    vision = VisionService()
+    vision.warm_up()
+    results.put(("ready", worker, None))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, slot, length, session_id = task
+            view = ring.view(slot, length)
+            try:
+                result = vision.process_encoded(view, session_id)
+            finally:
+                view.release()
+            results.put((request_id, slot, result))
+    finally:
+        vision.cleanup()
+        ring.close()
+
+
+def _frame_bytes(frame_data: str) -> bytes:
+    # Same as VisionService._frame_bytes, without importing cv2 in the API process
+    if "base64," in frame_data:
+        frame_data = frame_data.split("base64,")[1]
+    return base64.b64decode(frame_data)
+
+
+# How often the supervisor checks for dead or stuck workers
+SUPERVISE_INTERVAL_S = 1.0
+
+
+def _kill(process):
+    process.kill()
+    process.join(timeout=1)
+
+
+def _error(message: str, **extra) -> Dict[str, Any]:
+    return {"error": message, "hands_detected": 0, "gestures": [], "emojis": [], **extra}
+
+
+class VisionWorkerPool:
+    """
+    VisionService in worker processes, fed through a FrameRing
+
+    Frames of one session always go to the same worker, so its ROI tracking
+    and duplicate-frame cache keep working and frames stay in order. A slot
+    is returned to the free list only once the worker has answered, so it is
+    never overwritten while being read.
+
+    A worker that has not answered a frame within `timeout_s` is treated
+    like a crashed one: it is killed and respawned, and the slots of its
+    frames are reclaimed, so a hung MediaPipe graph cannot hold slots forever.
+    A supervisor task checks the workers every `SUPERVISE_INTERVAL_S`, so
+    one that dies before it is ready (import error, OOM) is replaced too.
+    Killing and joining happen on a thread, so the event loop keeps serving
+    requests meanwhile. Each worker has its own task and result queues, and
+    a replacement gets new ones: a worker killed while writing a result
+    (holding its queue's write lock) cannot wedge the others.
+
+    Backpressure: when every slot is in flight, the "wait" policy waits up to
+    `wait_ms` for one to free up and the "drop" policy answers immediately;
+    either way a frame that gets no slot is dropped with `"dropped": true`.
+    For a live webcam a dropped frame is better than a growing backlog.
+    """
+
+    def __init__(
+        self,
+        workers: int = VISION_WORKERS,
+        slots: int = VISION_RING_SLOTS,
+        slot_kb: int = VISION_RING_SLOT_KB,
+        policy: str = VISION_RING_POLICY,
+        wait_ms: float = VISION_RING_WAIT_MS,
+        timeout_s: float = VISION_WORKER_TIMEOUT_S,
+        worker_main=None
+    ):
+        if policy not in ("wait", "drop"):
+            raise ValueError("policy must be 'wait' or 'drop'")
+        self.workers = workers
+        self.slots = max(slots, workers)
+        self.slot_bytes = slot_kb * 1024
+        self.policy = policy
+        self.wait_ms = wait_ms
+        self.timeout_s = timeout_s
+        self.worker_main = worker_main or _worker_main
+        self.ring: Optional[FrameRing] = None
+        self._closing = False
+        self._ids = itertools.count()
+        self._round_robin = itertools.count()
+        # request_id -> (future, worker, slot, sent_at)
+        self._pending: Dict[int, Tuple[asyncio.Future, int, int, float]] = {}
+        # Workers whose MediaPipe graph is warm
+        self._ready: Set[int] = set()
+        self.stats = {"frames": 0, "dropped": 0, "waits": 0, "timeouts": 0, "restarts": 0, "stuck": 0, "roundtrip_ms": 0.0}
+
+    def start(self):
+        """Create the ring and start the workers (call from the running event loop)"""
+        self._ctx = multiprocessing.get_context("spawn")
+        self._loop = asyncio.get_running_loop()
+        self.ring = FrameRing(self.slots, self.slot_bytes)
+        self._free: asyncio.Queue = asyncio.Queue()
+        for slot in range(self.slots):
+            self._free.put_nowait(slot)
+        self._restart_lock = asyncio.Lock()
+        self._tasks = [None] * self.workers
+        self._results = [None] * self.workers
+        self._listeners = [None] * self.workers
+        self._processes = []
+        for worker in range(self.workers):
+            self._new_queues(worker)
+            self._processes.append(self._spawn(worker))
+        self._supervisor = self._loop.create_task(self._supervise())
+        print(f"✓ Vision workers: {self.workers} processes, {self.slots} x {self.slot_bytes // 1024} KB frame slots")
+
+    def _new_queues(self, worker: int):
+        """Give a worker fresh task and result queues, with a listener thread for the results"""
+        self._tasks[worker] = self._ctx.Queue()
+        self._results[worker] = results = self._ctx.Queue()
+        self._listeners[worker] = threading.Thread(
+            target=self._collect, args=(worker, results), name=f"vision-results-{worker}", daemon=True
+        )
+        self._listeners[worker].start()
+
+    def _spawn(self, worker: int):
+        process = self._ctx.Process(
+            target=self.worker_main,
+            args=(self.ring.name, self.slots, self.slot_bytes, worker, self._tasks[worker], self._results[worker]),
+            name=f"vision-worker-{worker}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _collect(self, worker: int, results):
+        """Listener thread: hand one worker's results back to the event loop until its queue is replaced"""
+        while True:
+            try:
+                item = results.get(timeout=SUPERVISE_INTERVAL_S)
+            except queue.Empty:
+                if self._results[worker] is not results:
+                    break
+                continue
+            if item is None:
+                break
+            if item[0] == "ready":
+                # Worker finished warming up its MediaPipe graph
+                self._loop.call_soon_threadsafe(self._mark_ready, worker, results)
+                continue
+            self._loop.call_soon_threadsafe(self._complete, *item)
+
+    def _mark_ready(self, worker: int, results):
+        if self._results[worker] is results:
+            self._ready.add(worker)
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(SUPERVISE_INTERVAL_S)
+            try:
+                await self._restart_workers()
+            except Exception as e:
+                print(f"⚠ Vision worker supervision failed: {e}")
+
+    def _complete(self, request_id: int, slot: int, result: Dict[str, Any]):
+        entry = self._pending.pop(request_id, None)
+        if entry is None:
+            return  # already failed over by _restart_workers
+        self._free.put_nowait(slot)
+        future = entry[0]
+        if not future.done():
+            future.set_result(result)
+
+    async def _acquire_slot(self) -> Optional[int]:
+        try:
+            return self._free.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        if self.policy == "drop" or self.wait_ms <= 0:
+            return None
+        self.stats["waits"] += 1
+        try:
+            return await asyncio.wait_for(self._free.get(), self.wait_ms / 1000)
+        except asyncio.TimeoutError:
+            return None
+
+    def _worker_for(self, session_id: Optional[str]) -> int:
+        if session_id is None:
+            return next(self._round_robin) % self.workers
+        return zlib.crc32(session_id.encode()) % self.workers
+
+    async def process_frame(self, frame_data: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Same contract as VisionService.process_frame"""
+        try:
+            img_bytes = _frame_bytes(frame_data)
+        except Exception as e:
+            return _error(str(e))
+        if len(img_bytes) > self.slot_bytes:
+            return _error(f"Frame larger than {self.slot_bytes // 1024} KB")
+
+        slot = await self._acquire_slot()
+        if slot is None:
+            self.stats["dropped"] += 1
+            return _error("Vision workers busy", dropped=True)
+
+        started = time.perf_counter()
+        length = self.ring.write(slot, img_bytes)
+        request_id = next(self._ids)
+        worker = self._worker_for(session_id)
+        future = self._loop.create_future()
+        self._pending[request_id] = (future, worker, slot, time.monotonic())
+        self._tasks[worker].put((request_id, slot, length, session_id))
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout_s)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            await self._restart_workers()
+            return _error("Vision worker timed out")
+        self.stats["frames"] += 1
+        self.stats["roundtrip_ms"] += (time.perf_counter() - started) * 1000
+        return result
+
+    async def _restart_workers(self):
+        """Replace workers that crashed or sit on a frame past the timeout, and reclaim their slots"""
+        async with self._restart_lock:
+            if self._closing:
+                return
+            now = time.monotonic()
+            stuck = {owner for _, owner, _, sent_at in self._pending.values() if now - sent_at >= self.timeout_s}
+            for worker, process in enumerate(self._processes):
+                if process.is_alive():
+                    if worker not in stuck:
+                        continue
+                    print(f"⚠ Vision worker {worker} has not answered for {self.timeout_s:g}s, restarting")
+                    self.stats["stuck"] += 1
+                    # Gone before its slots are reused, so it cannot read a slot being overwritten
+                    await asyncio.to_thread(_kill, process)
+                    if self._closing:
+                        return
+                else:
+                    print(f"⚠ Vision worker {worker} exited (code {process.exitcode}), restarting")
+                self.stats["restarts"] += 1
+                self._ready.discard(worker)
+                for request_id, (future, owner, slot, _) in list(self._pending.items()):
+                    if owner == worker:
+                        del self._pending[request_id]
+                        self._free.put_nowait(slot)
+                        if not future.done():
+                            future.set_result(_error("Vision worker restarted"))
+                # Frames sent from here on wait in the new task queue for the new process
+                self._new_queues(worker)
+                self._processes[worker] = await asyncio.to_thread(self._spawn, worker)
+
+    @property
+    def ready(self) -> bool:
+        """Every worker has started and warmed up"""
+        return self.ring is not None and len(self._ready) == self.workers
+    
+    def get_stats(self) -> Dict[str, Any]:
+        frames = self.stats["frames"]
+        return {
+            "workers": self.workers,
+            "alive": sum(p.is_alive() for p in self._processes) if self.ring else 0,
+            "ready": len(self._ready),
+            "slots": self.slots,
+            "slot_kb": self.slot_bytes // 1024,
+            "policy": self.policy,
+            "in_flight": len(self._pending),
+            "frames": frames,
+            "dropped": self.stats["dropped"],
+            "waits": self.stats["waits"],
+            "timeouts": self.stats["timeouts"],
+            "restarts": self.stats["restarts"],
+            "stuck": self.stats["stuck"],
+            "avg_roundtrip_ms": round(self.stats["roundtrip_ms"] / frames, 2) if frames else 0.0,
+        }
+
+    def close(self):
+        """Stop the workers and release the shared memory"""
+        if self.ring is None:
+            return
+        self._closing = True
+        self._supervisor.cancel()
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for results in self._results:
+            results.put(None)
+        for listener in self._listeners:
+            listener.join(timeout=5)
+        for future, _, _, _ in self._pending.values():
+            if not future.done():
+                future.set_result(_error("Vision workers stopped"))
+        self._pending.clear()
+        self.ring.close()
+        self.ring = None
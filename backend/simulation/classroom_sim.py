@@ -8,9 +8,9 @@ class ClassroomSimulation:
         self.db = db
         self.active_sessions = {}
     
-    def start_session(self) -> str:
+    async def start_session(self) -> str:
         session_id = str(uuid.uuid4())
-        self.db.create_session(session_id, metadata={
+        await self.db.create_session(session_id, metadata={
             "type": "classroom_simulation",
             "entities": ["nonverbal_student", "verbal_teacher", "ai_system"]
         })
@@ -30,6 +30,15 @@ function getAuthHeaders() {
     };
 }
 
+// Auth headers plus the session, for requests whose JSON body (a webcam
+// frame) is too large for the rate limiter to read the session_id from
+function getFrameHeaders() {
+    return {
+        ...getAuthHeaders(),
+        ...(currentSessionId ? { 'X-Session-Id': currentSessionId } : {})
+    };
+}
+
 // Check authentication on page load
 async function checkAuthentication() {
     const token = getAuthToken();
@@ -1850,7 +1859,7 @@ async function processCurrentFrame() {
         // Send to backend for processing
         const response = await fetch(`${API_BASE}/vision/process-frame`, {
             method: 'POST',
-            headers: getAuthHeaders(),
+            headers: getFrameHeaders(),
             body: JSON.stringify({
                 frame: frameData,
                 session_id: currentSessionId
@@ -1987,7 +1996,7 @@ async function captureGesture() {
         // Send to backend for interpretation and auto-response
         const response = await fetch(`${API_BASE}/vision/interpret-gesture`, {
             method: 'POST',
-            headers: getAuthHeaders(),
+            headers: getFrameHeaders(),
             body: JSON.stringify({
                 frame: frameData,
                 session_id: currentSessionId
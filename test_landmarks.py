@@ -0,0 +1,103 @@
+"""
+Landmark path test
+Checks that gestures from client-side hand tracking are recognized from the
+keypoints alone, without loading OpenCV or MediaPipe, and that malformed
+landmark data is rejected cleanly
+"""
+
+import os
+import sys
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+os.environ["LLM_PROVIDER"] = "stub"
+sys.path.append('backend')
+
+print("=" * 60)
+print("LANDMARK PATH TEST")
+print("=" * 60)
+
+from services.gesture_classifier import LandmarkRecognizer
+from services.landmark_packets import decode_landmark_packet, encode_landmark_packet, hands_from_json
+from main import app
+
+
+def hand(extended):
+    """Right hand, wrist at the bottom, with the listed fingers pointing up and the rest curled"""
+    points = np.zeros((21, 3), dtype=np.float32)
+    points[0] = (0.5, 0.9, 0.0)
+    # Thumb: tip level with its IP joint, pushed out sideways when extended
+    points[1:5] = [(0.45, 0.8, 0), (0.42, 0.75, 0), (0.40, 0.72, 0), (0.32 if "thumb" in extended else 0.40, 0.72, 0)]
+    for finger, x in (("index", 0.45), ("middle", 0.5), ("ring", 0.55), ("pinky", 0.6)):
+        base = {"index": 5, "middle": 9, "ring": 13, "pinky": 17}[finger]
+        tip_y = 0.4 if finger in extended else 0.75
+        points[base:base + 4] = [(x, 0.7, 0), (x, 0.6, 0), (x, (0.6 + tip_y) / 2, 0), (x, tip_y, 0)]
+    return points
+
+
+def main():
+    # Test 1: The rules run on packet landmarks without OpenCV or MediaPipe
+    print("\n[Test 1] Recognizing decoded packets...")
+    recognizer = LandmarkRecognizer(classifier_path="")
+    packet = encode_landmark_packet([("Right", hand({"index", "middle"}), 0.9), ("Left", hand(set()), 0.8)])
+    result = recognizer.process_landmarks(decode_landmark_packet(packet))
+    assert [g["gesture"] for g in result["gestures"]] == ["peace", "fist"], result
+    assert result["emojis"] == ["✌️", "✊"] and result["hands_detected"] == 2
+    assert recognizer.get_stats()["hands"] == 2 and recognizer.get_stats()["gesture_model"] == "rules"
+    assert "cv2" not in sys.modules and "mediapipe" not in sys.modules
+    print("✓ Gestures recognized; cv2 and mediapipe never imported (not even by main)")
+
+    # Test 2: The JSON form gives the same result
+    print("\n[Test 2] JSON landmarks...")
+    payload = {"hands": [{"hand": "Right", "score": 0.9, "landmarks": hand({"index"}).ravel().tolist()}]}
+    result = recognizer.process_landmarks(hands_from_json(payload))
+    assert [g["gesture"] for g in result["gestures"]] == ["pointing_up"], result
+    print("✓ Flat JSON landmarks recognized")
+
+    # Test 3: Malformed input is a ValueError (400), never a crash
+    print("\n[Test 3] Malformed landmarks...")
+    malformed = [
+        [1, 2],
+        "hands",
+        None,
+        {"hands": [1]},
+        {"hands": "x"},
+        {"hands": [{"landmarks": [0.0] * 62}]},
+        {"hands": [{"hand": "Middle", "landmarks": hand(set()).tolist()}]},
+        {"hands": [{"landmarks": hand(set()).tolist(), "score": [1]}]},
+        {"hands": [{"landmarks": [[float("nan")] * 3] * 21}]},
+    ]
+    for payload in malformed:
+        try:
+            hands_from_json(payload)
+            raise AssertionError(f"accepted {payload!r}")
+        except ValueError:
+            pass
+    for bad_packet in (b"", b"\x02\x00", b"\x01\x01" + b"\x00" * 10):
+        try:
+            decode_landmark_packet(bad_packet)
+            raise AssertionError(f"accepted {bad_packet!r}")
+        except ValueError:
+            pass
+
+    client = TestClient(app)
+    for body in ("[1,2]", '{"hands":[1]}', "not json"):
+        response = client.post("/vision/process-landmarks", content=body, headers={"content-type": "application/json"})
+        assert response.status_code == 400, (body, response.status_code)
+    with client.websocket_connect("/vision/landmarks/ws") as socket:
+        for body in ("[1,2]", '{"hands":[1]}'):
+            socket.send_text(body)
+            assert socket.receive_json()["error"]
+        socket.send_bytes(packet)
+        assert socket.receive_json()["gestures"][0]["gesture"] == "peace"
+    assert "cv2" not in sys.modules and "mediapipe" not in sys.modules
+    print(f"✓ {len(malformed)} malformed JSON bodies rejected; HTTP answers 400 and the WebSocket stays open")
+
+    print("\n" + "=" * 60)
+    print("All landmark tests passed")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+LLM admission scheduler test
+Checks slot scheduling by priority: strict priority for interactive calls,
+the background share, promotion of long-waiting background calls and queue
+timeouts, coalescing only within a priority, plus the Coordinator's
+low-confidence retry under saturation
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+os.environ["LLM_PROVIDER"] = "stub"
+sys.path.append('backend')
+
+print("=" * 60)
+print("LLM ADMISSION TEST")
+print("=" * 60)
+
+from services.llm_admission import (
+    LLMAdmission, LLMOverloadedError, INTERACTIVE, BACKGROUND, current_priority, llm_priority
+)
+from services.llm_provider import StubLLMProvider
+from services.llm_resilience import LLMResilience, ResilientLLMProvider
+from services.llm_singleflight import SingleFlight
+from coordinator.orchestrator import Coordinator
+from database.db import Database
+from database.async_db import AsyncDatabase
+
+
+def make_admission(**kwargs) -> LLMAdmission:
+    settings = dict(max_concurrency=2, queue_timeout_ms=1000, background_share=0.5,
+                    background_max_wait_ms=10000, background_queue_timeout_ms=1000)
+    settings.update(kwargs)
+    return LLMAdmission(**settings)
+
+
+async def hold(admission: LLMAdmission, priority: str, release: asyncio.Event, order: list, name: str):
+    """Take a slot, note when it was granted and keep it until `release` is set"""
+    async with admission.slot(priority):
+        order.append(name)
+        await release.wait()
+
+
+async def main():
+    # Test 1: A freed slot goes to the waiting interactive call first
+    print("\n[Test 1] Strict priority...")
+    admission = make_admission()
+    order, first, second = [], asyncio.Event(), asyncio.Event()
+    holders = [asyncio.create_task(hold(admission, INTERACTIVE, first, order, f"held{i}")) for i in range(2)]
+    await asyncio.sleep(0.01)
+    background = asyncio.create_task(hold(admission, BACKGROUND, second, order, "background"))
+    await asyncio.sleep(0.01)
+    interactive = asyncio.create_task(hold(admission, INTERACTIVE, second, order, "interactive"))
+    await asyncio.sleep(0.01)
+    assert admission.in_flight == 3  # two running, one interactive waiting
+    first.set()
+    await asyncio.sleep(0.05)
+    assert order[2] == "interactive", order
+    second.set()
+    await asyncio.gather(*holders, background, interactive)
+    assert order[3] == "background"
+    print("✓ Interactive call admitted ahead of an earlier background call")
+
+    # Test 2: Background calls never hold more than their share
+    print("\n[Test 2] Background share...")
+    admission = make_admission(max_concurrency=4)
+    order, release = [], asyncio.Event()
+    tasks = [asyncio.create_task(hold(admission, BACKGROUND, release, order, f"bg{i}")) for i in range(3)]
+    await asyncio.sleep(0.02)
+    assert admission.background_slots == 2 and len(order) == 2, order
+    tasks.append(asyncio.create_task(hold(admission, INTERACTIVE, release, order, "interactive")))
+    await asyncio.sleep(0.02)
+    assert "interactive" in order and len(order) == 3
+    release.set()
+    await asyncio.gather(*tasks)
+    print(f"✓ 3 background calls on {admission.background_slots} background slots; interactive call admitted at once")
+
+    # Test 3: A background call that waited too long goes first
+    print("\n[Test 3] Promotion of waiting background calls...")
+    admission = make_admission(background_max_wait_ms=100)
+    order, first, second = [], asyncio.Event(), asyncio.Event()
+    holders = [asyncio.create_task(hold(admission, INTERACTIVE, first, order, f"held{i}")) for i in range(2)]
+    await asyncio.sleep(0.01)
+    background = asyncio.create_task(hold(admission, BACKGROUND, second, order, "background"))
+    await asyncio.sleep(0.15)
+    interactive = asyncio.create_task(hold(admission, INTERACTIVE, second, order, "interactive"))
+    await asyncio.sleep(0.01)
+    first.set()
+    await asyncio.sleep(0.05)
+    assert order[2] == "background", order
+    assert admission.stats[BACKGROUND]["promoted"] == 1
+    second.set()
+    await asyncio.gather(*holders, background, interactive)
+    print("✓ Background call promoted after background_max_wait_ms")
+
+    # Test 4: Calls that get no slot in time fail and leave the queue
+    print("\n[Test 4] Queue timeouts...")
+    admission = make_admission(queue_timeout_ms=100, background_queue_timeout_ms=200)
+    order, release = [], asyncio.Event()
+    holders = [asyncio.create_task(hold(admission, INTERACTIVE, release, order, f"held{i}")) for i in range(2)]
+    await asyncio.sleep(0.01)
+    for priority, timeout in ((INTERACTIVE, 0.1), (BACKGROUND, 0.2)):
+        start = time.perf_counter()
+        try:
+            async with admission.slot(priority):
+                raise AssertionError("slot granted while all slots are held")
+        except LLMOverloadedError:
+            pass
+        waited = time.perf_counter() - start
+        assert timeout <= waited < timeout + 0.1, waited
+        assert admission.stats[priority]["queue_timeouts"] == 1
+    assert not admission._queues[INTERACTIVE] and not admission._queues[BACKGROUND]
+    # Blocking waits cannot be served on the event loop thread: they fail at once
+    start = time.perf_counter()
+    try:
+        with admission.slot_blocking(INTERACTIVE):
+            raise AssertionError("slot granted while all slots are held")
+    except LLMOverloadedError:
+        pass
+    assert time.perf_counter() - start < 0.01
+    release.set()
+    await asyncio.gather(*holders)
+    with admission.slot_blocking(INTERACTIVE):
+        assert admission._running[INTERACTIVE] == 1
+    print("✓ Interactive and background calls time out after their own limits")
+
+    # Test 5: The low-confidence retry keeps the first answer when it gets no slot
+    print("\n[Test 5] Low-confidence retry under saturation...")
+    db_path = "test_llm_admission.db"
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    coordinator = Coordinator(AsyncDatabase(Database(db_path)))
+    intent_calls = []
+
+    def intent_response(prompt: str) -> str:
+        intent_calls.append(current_priority())
+        if len(intent_calls) > 1:
+            raise LLMOverloadedError("No LLM slot free (simulated)")
+        return "Intent: greet\nConfidence: 0.5\nExplanation: first answer"
+
+    coordinator.intent_agent.llm.provider.add_rule("Classify the intent", intent_response)
+    result = await coordinator.process_communication("👋", session_id=None)
+    assert len(intent_calls) >= 2 and set(intent_calls) == {INTERACTIVE}, intent_calls
+    assert result["intent"] == "greet" and result["confidence"] == 0.5
+    assert [step["agent"] for step in result["workflow"]].count("intent_agent_retry") == 1
+    coordinator.db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    print("✓ Retry runs at interactive priority and the first LLM answer is kept")
+
+    # Test 6: An interactive call does not join a flight queued at background priority
+    print("\n[Test 6] Coalescing across priorities...")
+    admission = make_admission(background_queue_timeout_ms=2000)
+    provider = ResilientLLMProvider(
+        StubLLMProvider(canned={"same prompt": "answer"}), LLMResilience(hedge_enabled=False), SingleFlight(), admission
+    )
+    order, release = [], asyncio.Event()
+    holder = asyncio.create_task(hold(admission, BACKGROUND, release, order, "background holder"))
+    await asyncio.sleep(0.01)
+
+    async def background_call():
+        with llm_priority(BACKGROUND):
+            return await provider.generate_async("same prompt")
+
+    queued = asyncio.create_task(background_call())
+    await asyncio.sleep(0.01)
+    assert admission._queues[BACKGROUND]  # the background share is used up
+    start = time.perf_counter()
+    assert await provider.generate_async("same prompt") == "answer"
+    assert time.perf_counter() - start < 0.1 and not queued.done()
+    release.set()
+    assert await queued == "answer"
+    await holder
+    print("✓ Interactive caller got its own slot instead of waiting on the background flight")
+
+    print("\n" + "=" * 60)
+    print("All admission tests passed")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+"""
+Offline pipeline test using the stub LLM provider
+Runs the agent pipeline without Gemini and measures how it behaves
+when the LLM is slow, failing or rate-limited
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+os.environ["LLM_PROVIDER"] = "stub"
+sys.path.append('backend')
+
+print("=" * 60)
+print("STUB LLM PIPELINE TEST")
+print("=" * 60)
+
+from services.llm_provider import StubLLMProvider, LLMRateLimitError
+from services.llm_resilience import LLMResilience, ResilientLLMProvider, CircuitOpenError, get_llm_resilience
+from services.llm_singleflight import get_llm_singleflight
+from coordinator.orchestrator import Coordinator
+from database.db import Database
+from database.async_db import AsyncDatabase
+
+
+def make_coordinator(db_path: str) -> Coordinator:
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    return Coordinator(AsyncDatabase(Database(db_path)))
+
+
+def set_all(coordinator: Coordinator, **kwargs):
+    """Apply the same stub settings to every agent"""
+    for agent in (coordinator.nonverbal_agent, coordinator.intent_agent, coordinator.speech_agent):
+        if "latency_ms" in kwargs:
+            agent.llm.provider.set_latency(kwargs["latency_ms"])
+        if "error_rate" in kwargs:
+            agent.llm.provider.set_error_rate(kwargs["error_rate"], kwargs.get("error_kind", "error"))
+
+
+async def run_scenario(name: str, coordinator: Coordinator, messages: int = 5):
+    start = time.perf_counter()
+    results = [
+        await coordinator.process_communication("👍 yes", session_id=None)
+        for _ in range(messages)
+    ]
+    elapsed = (time.perf_counter() - start) * 1000
+    methods = {r["workflow"][-1]["result"]["generation_method"] for r in results}
+    print(f"  {name:<28} {elapsed / messages:8.1f} ms/message  output methods: {sorted(methods)}")
+    return results
+
+
+async def main():
+    db_path = "test_llm_stub.db"
+    coordinator = make_coordinator(db_path)
+
+    # Test 1: Agents use the stub provider
+    print("\n[Test 1] Agents use the stub provider...")
+    assert isinstance(coordinator.intent_agent.llm.provider, StubLLMProvider)
+    print("✓ Stub provider active for all agents")
+
+    # Test 2: Stub responses parse through the pipeline
+    print("\n[Test 2] Running the pipeline against the stub...")
+    results = await run_scenario("healthy", coordinator)
+    assert results[0]["intent"] == "respond"
+    assert results[0]["workflow"][-1]["result"]["generation_method"] == "ai"
+    print("✓ Pipeline completes with stub responses")
+
+    # Test 3: Latency, errors and rate limits
+    print("\n[Test 3] Injecting latency and errors...")
+    set_all(coordinator, latency_ms=100)
+    await run_scenario("slow (100 ms/call)", coordinator)
+    set_all(coordinator, latency_ms=0, error_rate=1.0)
+    results = await run_scenario("down (100% errors)", coordinator)
+    assert results[0]["workflow"][-1]["result"]["generation_method"] == "template"
+    stats = get_llm_resilience().get_stats()
+    assert stats["circuit_state"] == "open" and stats["short_circuited"] > 0
+    print(f"  circuit {stats['circuit_state']} after {stats['failures']} failures, "
+          f"{stats['short_circuited']} calls short-circuited")
+    get_llm_resilience().breaker.reset()
+    set_all(coordinator, error_rate=1.0, error_kind="rate_limit")
+    await run_scenario("rate limited", coordinator)
+    get_llm_resilience().breaker.reset()
+    print("✓ Agents fall back to rule-based paths when the stub fails")
+
+    # Test 4: Hedged requests bound tail latency
+    print("\n[Test 4] Hedging a slow call...")
+    slow_first = StubLLMProvider()
+    slow_first.add_rule("hedge", lambda prompt: "fast")
+    calls = {"n": 0}
+    original = slow_first.generate_async
+
+    async def slow_then_fast(prompt):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            await asyncio.sleep(1.0)
+        return await original(prompt)
+
+    resilience = LLMResilience(hedge_min_delay_ms=50, hedge_max_delay_ms=50, failure_threshold=2, max_retries=0)
+    start = time.perf_counter()
+    assert await resilience.call_async(lambda: slow_then_fast("hedge")) == "fast"
+    elapsed = (time.perf_counter() - start) * 1000
+    assert elapsed < 500 and resilience.stats["hedge_wins"] == 1
+    print(f"✓ Hedged request answered in {elapsed:.0f} ms instead of 1000 ms")
+
+    slow_first.set_error_rate(1.0)
+    for _ in range(2):
+        try:
+            await resilience.call_async(lambda: slow_first.generate_async("x"))
+        except Exception:
+            pass
+    try:
+        await resilience.call_async(lambda: slow_first.generate_async("x"))
+        raise AssertionError("circuit did not open")
+    except CircuitOpenError:
+        pass
+    print("✓ Circuit opens after the failure threshold")
+
+    # A half-open trial that is cancelled frees the trial for the next call
+    resilience.breaker.reset_timeout = 0.0
+    trial = asyncio.create_task(resilience.call_async(lambda: asyncio.sleep(10, result="late")))
+    await asyncio.sleep(0.01)
+    trial.cancel()
+    try:
+        await trial
+    except asyncio.CancelledError:
+        pass
+    assert await resilience.call_async(lambda: asyncio.sleep(0, result="ok")) == "ok"
+    assert resilience.breaker.state == "closed"
+    print("✓ Cancelled half-open trial does not keep the circuit open")
+
+    # So does a streamed trial whose consumer stops reading
+    provider = ResilientLLMProvider(StubLLMProvider(canned={"ping": "pong"}, stream_chunk_size=1), resilience)
+    for streaming_async in (False, True):
+        for _ in range(resilience.breaker.failure_threshold):
+            resilience.record_failure()
+        if streaming_async:
+            stream = provider.stream_async("ping")
+            assert await stream.__anext__() == "p"
+            await stream.aclose()
+        else:
+            stream = provider.stream("ping")
+            assert next(stream) == "p"
+            stream.close()
+        assert resilience.breaker.allow()
+        resilience.breaker.reset()
+    print("✓ Closing a half-open trial stream early frees the trial")
+
+    # Test 5: Identical concurrent prompts are coalesced
+    print("\n[Test 5] Coalescing a classroom burst...")
+    set_all(coordinator, latency_ms=50, error_rate=0.0)
+    provider_calls = coordinator.intent_agent.llm.provider.stats["calls"]
+    burst = await asyncio.gather(*[
+        coordinator.intent_agent.detect_intent("👍 yes") for _ in range(30)
+    ])
+    executed = coordinator.intent_agent.llm.provider.stats["calls"] - provider_calls
+    assert executed == 1 and all(r["intent"] == "respond" for r in burst)
+    print(f"✓ 30 identical prompts -> {executed} upstream call "
+          f"({get_llm_singleflight().get_stats()['coalesced']} coalesced)")
+
+    # Test 6: Canned, rule-based and streamed responses
+    print("\n[Test 6] Canned, rule and streaming responses...")
+    stub = StubLLMProvider(canned={"ping": "pong"}, stream_chunk_size=2)
+    stub.add_rule("weather", lambda prompt: "sunny")
+    assert stub.generate("ping") == "pong"
+    assert stub.generate("what is the weather") == "sunny"
+    assert "".join(stub.stream("ping")) == "pong"
+    stub.fail_next()
+    try:
+        stub.generate("ping")
+        raise AssertionError("fail_next did not fail")
+    except Exception as e:
+        assert not isinstance(e, AssertionError)
+    stub.set_error_rate(1.0, "rate_limit")
+    try:
+        await stub.generate_async("ping")
+    except LLMRateLimitError:
+        pass
+    print("✓ Stub behaves deterministically")
+
+    os.remove(db_path)
+    print("\n" + "=" * 60)
+    print("All stub tests passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
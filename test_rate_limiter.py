@@ -0,0 +1,150 @@
+"""
+Rate limiter test
+Checks the token bucket arithmetic, both bucket backends, per-client
+session buckets and the ASGI middleware (body replay, X-Session-Id,
+Retry-After and trusted-proxy client addresses)
+"""
+
+import os
+import sys
+import json
+import math
+import asyncio
+
+import httpx
+
+sys.path.append('backend')
+
+print("=" * 60)
+print("RATE LIMITER TEST")
+print("=" * 60)
+
+from services.rate_limiter import (
+    refill, endpoint_class, MemoryRateLimitBackend, SQLiteRateLimitBackend, RateLimiter, RateLimitMiddleware,
+    SESSION_BODY_LIMIT
+)
+
+
+async def echo_app(scope, receive, send):
+    """Answers with the request body it received"""
+    message = await receive()
+    body = message.get("body", b"")
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": json.dumps({"received": body.decode()}).encode()})
+
+
+def check_backend(backend):
+    # Burst of 3, refilling 1 token per second: the 4th immediate take is refused
+    decisions = [backend.take("k", 1.0, 3.0) for _ in range(4)]
+    assert [allowed for allowed, _, _ in decisions] == [True, True, True, False], decisions
+    allowed, wait, tokens = decisions[-1]
+    assert 0.9 < wait <= 1.0 and tokens < 0.1
+    # Keys are independent
+    assert backend.take("other", 1.0, 3.0)[0]
+
+
+async def main():
+    # Test 1: Token bucket arithmetic
+    print("\n[Test 1] Refill...")
+    (allowed, wait, left), tokens = refill(0.0, 0.0, 0.5, rate=2.0, burst=5.0, cost=1.0)
+    assert allowed and wait == 0.0 and tokens == 0.0  # half a second at 2/s buys one token
+    (allowed, wait, left), tokens = refill(0.5, 0.0, 0.0, rate=2.0, burst=5.0, cost=1.0)
+    assert not allowed and wait == 0.25 and tokens == 0.5
+    (_, _, _), tokens = refill(1.0, 0.0, 100.0, rate=2.0, burst=5.0, cost=1.0)
+    assert tokens == 4.0  # capped at the burst before paying
+    assert not refill(5.0, 0.0, 0.0, rate=0.0, burst=5.0, cost=6.0)[0][0]
+    assert math.isinf(refill(0.0, 0.0, 0.0, rate=0.0, burst=5.0, cost=1.0)[0][1])
+    assert endpoint_class("/vision/utterance") == "vision" and endpoint_class("/auth/login") == "llm"
+    assert endpoint_class("/health/ready") is None and endpoint_class("/sessions/stats") == "default"
+    print("✓ Refill, burst cap and wait times")
+
+    # Test 2: Both backends
+    print("\n[Test 2] Backends...")
+    check_backend(MemoryRateLimitBackend())
+    path = "test_rate_limiter.db"
+    backend = SQLiteRateLimitBackend(path)
+    try:
+        check_backend(backend)
+        # A second instance (another worker process) sees the same buckets
+        other = SQLiteRateLimitBackend(path)
+        assert not other.take("k", 1.0, 3.0)[0]
+        other.close()
+    finally:
+        backend.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    memory = MemoryRateLimitBackend(max_keys=2)
+    memory.take("a", 100.0, 1.0)
+    memory.take("b", 1.0, 1.0)
+    await asyncio.sleep(0.02)
+    memory.take("c", 1.0, 1.0)  # "a" has refilled and is pruned, "b" has not
+    assert len(memory) == 2 and "b" in memory._buckets
+    print("✓ Memory and SQLite buckets agree; full buckets are pruned")
+
+    # Test 3: Session buckets belong to the client
+    print("\n[Test 3] Session buckets...")
+    limiter = RateLimiter(MemoryRateLimitBackend(), {"llm": (0.001, 4.0)}, session_share=0.5)
+    results = [(await limiter.check("llm", "user:1", "class-a"))[0] for _ in range(3)]
+    assert results == [True, True, False]  # the session may use half of the burst
+    assert (await limiter.check("llm", "user:1", "class-b"))[0]  # other sessions still have budget
+    # Another client naming the same session spends only its own tokens
+    assert (await limiter.check("llm", "user:2", "class-a"))[0]
+    assert limiter.limited_by == {"client": 0, "session": 1}
+    print("✓ A session uses at most its share, and other clients cannot drain it")
+
+    # Test 4: Middleware
+    print("\n[Test 4] Middleware...")
+    limiter = RateLimiter(MemoryRateLimitBackend(), {"llm": (0.5, 2.0), "default": (100.0, 100.0)}, session_share=1.0)
+    app = RateLimitMiddleware(echo_app, limiter, user_id_for_token=lambda token: "7" if token == "good" else None,
+                              trusted_proxies=["127.0.0.1"])
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 5000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        # The body read for its session_id is replayed to the app unchanged
+        payload = {"session_id": "s1", "input_text": "hello"}
+        response = await client.post("/communicate", json=payload)
+        assert response.status_code == 200 and json.loads(response.json()["received"]) == payload
+        await client.post("/communicate", json=payload)
+        response = await client.post("/communicate", json=payload)
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2" and response.json()["limit"] == "llm"
+        assert limiter.limited_by["session"] == 1
+
+        # A frame body over SESSION_BODY_LIMIT is not read: its session_id only
+        # counts when it is also sent as X-Session-Id
+        frame = {"session_id": "s2", "frame": "x" * (SESSION_BODY_LIMIT + 1)}
+        response = await client.post("/vision/process-frame", json=frame)
+        assert response.status_code == 200 and json.loads(response.json()["received"]) == frame
+        vision = RateLimiter(MemoryRateLimitBackend(), {"vision": (0.001, 4.0)}, session_share=0.5)
+        app.limiter = vision
+        statuses = [(await client.post("/vision/process-frame", json=frame)).status_code for _ in range(3)]
+        assert statuses == [200, 200, 200] and vision.limited_by["session"] == 0
+        vision = RateLimiter(MemoryRateLimitBackend(), {"vision": (0.001, 4.0)}, session_share=0.5)
+        app.limiter = vision
+        statuses = [(await client.post("/vision/process-frame", json=frame, headers={"X-Session-Id": "s2"})).status_code
+                    for _ in range(3)]
+        assert statuses == [200, 200, 429] and vision.limited_by["session"] == 1
+        app.limiter = limiter
+
+        # Behind a trusted proxy, X-Real-IP identifies the client
+        for ip in ("10.0.0.1", "10.0.0.2"):
+            assert (await client.post("/communicate", json={}, headers={"X-Real-IP": ip})).status_code == 200
+        # A bearer token takes precedence over the address
+        assert (await client.post("/communicate", json={}, headers={"Authorization": "Bearer good"})).status_code == 200
+
+    # From an untrusted peer, forwarded addresses are ignored
+    app = RateLimitMiddleware(echo_app, RateLimiter(MemoryRateLimitBackend(), {"llm": (0.001, 1.0)}), trusted_proxies=[])
+    transport = httpx.ASGITransport(app=app, client=("203.0.113.9", 5000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.post("/communicate", json={}, headers={"X-Real-IP": "10.0.0.1"})).status_code == 200
+        assert (await client.post("/communicate", json={}, headers={"X-Real-IP": "10.0.0.2"})).status_code == 429
+        assert (await client.get("/health/ready")).status_code == 200  # exempt
+    print("✓ Body replay, X-Session-Id for large bodies, Retry-After, trusted proxies and exemptions")
+
+    print("\n" + "=" * 60)
+    print("All rate limiter tests passed")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
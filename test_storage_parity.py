@@ -0,0 +1,172 @@
+"""
+Storage backend parity test
+Runs the same Database workload against every available backend and checks
+they return identical results, then migrates SQLite -> PostgreSQL
+
+PostgreSQL is used when TEST_DATABASE_URL is set, or when the `pgserver`
+package is installed (embedded server, no Docker needed). Each run works in
+its own schema, which is dropped afterwards.
+"""
+
+import os
+import sys
+import uuid
+
+sys.path.append('backend')
+
+print("=" * 60)
+print("STORAGE BACKEND PARITY TEST")
+print("=" * 60)
+
+from database.backends import SQLiteBackend, PostgresBackend, PSYCOPG_AVAILABLE
+from database.db import Database
+from database.migrate import migrate, verify
+
+
+def postgres_url():
+    """A PostgreSQL URL to test against, or None"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        return url
+    try:
+        import pgserver
+    except ImportError:
+        return None
+    server = pgserver.get_server(os.path.abspath("test_pgdata"), cleanup_mode="delete")
+    return server.get_uri()
+
+
+def schema_url(url: str, schema: str) -> str:
+    separator = "&" if "?" in url else "?"
+    return f"{url}{separator}options=-csearch_path%3D{schema}"
+
+
+def normalize(value):
+    """Drop timestamps, which differ between runs"""
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items() if k not in ("created_at", "last_login", "next_cursor")}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    return value
+
+
+def workload(db: Database) -> dict:
+    """Exercise the Database API; returns everything it read back"""
+    db.init_gesture_tables()
+    out = {}
+
+    db.create_user("u1", "a@example.com", "Ada", "hash")
+    out["credits_used"] = db.use_credits("u1", 30, "s1", "message")
+    out["credits_refused"] = db.use_credits("u1", 1000, "s1", "message")
+    db.add_credits("u1", 5)
+    db.update_user_plan("u1", "pro")
+    db.update_last_login("u1")
+    out["user"] = db.get_user_by_email("a@example.com")
+    out["user_by_id"] = db.get_user_by_id("u1")
+    out["credits"] = db.get_user_credits("u1")
+
+    for n in range(3):
+        db.create_session(f"s{n}", {"n": n, "emoji": "👍"})
+    out["session"] = db.get_session("s1")
+    out["missing_session"] = db.get_session("nope")
+
+    out["message_ids"] = [db.store_message("s1", f"input {n} 100%", f"output {n}", "respond") for n in range(7)]
+    first = db.get_messages("s1", limit=3)
+    second = db.get_messages("s1", limit=3, before=db.next_cursor(first, 3))
+    out["message_pages"] = [first, second]
+
+    db.log_agent_action("s1", "intent_agent", "completed", {
+        "intent": "greet", "confidence": 0.9, "explanation": "Greeting detected", "raw_response": "Intent: greet"
+    }, duration_ms=12.5)
+    db.log_agent_action("s1", "speech_agent", "started", {"intent": {"intent": "greet", "confidence": 0.9}})
+    out["agent_logs"] = db.get_agent_logs("s1")
+    out["agent_log_summaries"] = db.get_agent_logs(limit=10, include_data=False)
+    out["compacted"] = db.compact_agent_logs("9999", 0, 10)
+    out["agent_logs_compacted"] = db.get_agent_logs("s1")
+
+    db.store_gesture_sequence("s1", "hello", "👋", "keyword_match")
+    db.store_gesture_sequences("s1", [
+        {"source_text": "yes", "gesture_sequence": "👍", "method": "keyword_match"},
+        {"source_text": "no", "gesture_sequence": "👎", "method": "keyword_match"},
+    ])
+    out["gesture_sequences"] = db.get_gesture_sequences("s1")
+    out["export"] = {table: list(db.iter_session_rows(table, "s1", batch_size=2)) for table in Database.SESSION_TABLES}
+
+    db.add_phrase("see you", "greetings", "👋", is_custom=True)
+    db.increment_phrase_usage(1)
+    out["phrases"] = db.get_phrases("greetings")
+
+    old = db.fetch_rows_before("messages", "9999", 2)
+    out["deleted"] = db.delete_rows("messages", [row["id"] for row in old])
+    out["messages_after_delete"] = db.get_messages("s1", limit=50)
+    out["counts"] = {table: db.count_rows(table) for table in Database.ALL_TABLES}
+    return out
+
+
+def compare(name: str, expected: dict, actual: dict):
+    expected, actual = normalize(expected), normalize(actual)
+    mismatched = [key for key in expected if expected[key] != actual.get(key)]
+    for key in mismatched:
+        print(f"  ✗ {key}:\n    sqlite:  {expected[key]}\n    {name}: {actual.get(key)}")
+    assert not mismatched, f"{name} differs from sqlite"
+
+
+def main():
+    sqlite_path = "test_parity.db"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(sqlite_path + suffix):
+            os.remove(sqlite_path + suffix)
+
+    # Test 1: SQLite reference run
+    print("\n[Test 1] SQLite workload...")
+    sqlite_db = Database(backend=SQLiteBackend(sqlite_path))
+    reference = workload(sqlite_db)
+    assert reference["credits"] == 75 and not reference["credits_refused"]
+    assert reference["agent_log_summaries"][-1]["duration_ms"] == 12.5
+    assert "data" not in reference["agent_log_summaries"][0]
+    assert "raw_response" not in reference["agent_logs_compacted"][-1]["data"]
+    print("✓ SQLite workload completed")
+
+    url = postgres_url() if PSYCOPG_AVAILABLE else None
+    if not url:
+        print("\n⚠ PostgreSQL not available (set TEST_DATABASE_URL or pip install psycopg[binary] pgserver)")
+        print("  Skipping parity and migration tests")
+    else:
+        import psycopg
+
+        schemas = [f"parity_{uuid.uuid4().hex[:8]}" for _ in range(2)]
+        with psycopg.connect(url, autocommit=True) as conn:
+            for schema in schemas:
+                conn.execute(f"CREATE SCHEMA {schema}")
+        try:
+            # Test 2: Same workload on PostgreSQL
+            print("\n[Test 2] PostgreSQL workload parity...")
+            postgres_db = Database(backend=PostgresBackend(schema_url(url, schemas[0])))
+            compare("postgresql", reference, workload(postgres_db))
+            print("✓ PostgreSQL returns the same results as SQLite")
+
+            # Test 3: Migrate the SQLite file into an empty PostgreSQL schema
+            print("\n[Test 3] SQLite -> PostgreSQL migration...")
+            target = Database(backend=PostgresBackend(schema_url(url, schemas[1])))
+            migrate(sqlite_db, target, batch_size=2, verbose=False)
+            assert verify(sqlite_db, target)
+            assert normalize(target.get_agent_logs("s1")) == normalize(sqlite_db.get_agent_logs("s1"))
+            # Sequences continue after the copied ids
+            copied_ids = [message["id"] for message in sqlite_db.get_messages("s1", limit=50)]
+            assert target.store_message("s1", "after migration", "ok", "respond") > max(copied_ids)
+            assert target.get_messages("s1", limit=1)[0]["input_text"] == "after migration"
+            print("✓ Migrated rows match and new inserts get fresh ids")
+        finally:
+            with psycopg.connect(url, autocommit=True) as conn:
+                for schema in schemas:
+                    conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(sqlite_path + suffix):
+            os.remove(sqlite_path + suffix)
+    print("\n" + "=" * 60)
+    print("All storage tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Utterance segmenter test
+Feeds gesture frames straight into the segmenter (no webcam, no LLM) and
+checks when utterances close and how often the pipeline runs
+"""
+
+import sys
+import time
+import asyncio
+
+sys.path.append('backend')
+
+print("=" * 60)
+print("UTTERANCE SEGMENTER TEST")
+print("=" * 60)
+
+from services.utterance_segmenter import UtteranceSegmenter
+from services.session_executor import SessionBusyError
+
+PAUSE_S = 0.2
+
+
+class Pipeline:
+    """Records each process call; sessions listed in `fail` raise, `delay` slows every call"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+        self.fail = set()
+
+    async def __call__(self, session_id, gestures, emojis):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if session_id in self.fail:
+            raise SessionBusyError(f"Session {session_id} busy")
+        self.calls.append((session_id, list(gestures)))
+        return {"output": " ".join(emojis)}
+
+
+def make_segmenter(pipeline: Pipeline, **kwargs) -> UtteranceSegmenter:
+    settings = dict(pause_s=PAUSE_S, terminators=["ok"], max_gestures=5)
+    settings.update(kwargs)
+    return UtteranceSegmenter(pipeline, **settings)
+
+
+async def feed(segmenter: UtteranceSegmenter, session_id: str, frames):
+    result = None
+    for gestures in frames:
+        result = await segmenter.add_frame(session_id, gestures, [g[0] for g in gestures])
+    return result
+
+
+async def main():
+    # Test 1: Held gestures count once, a gap lets them repeat, the terminator closes
+    print("\n[Test 1] Hold and terminator...")
+    pipeline = Pipeline()
+    segmenter = make_segmenter(pipeline)
+    result = await feed(segmenter, "s1", [["wave"], ["wave"], ["wave"], [], ["wave"], ["thumbs_up"]])
+    assert result["status"] == "listening" and result["gestures"] == ["wave", "wave", "thumbs_up"]
+    assert not pipeline.calls
+    result = await feed(segmenter, "s1", [["ok"]])
+    assert result["status"] == "complete" and result["closed_by"] == "terminator"
+    assert pipeline.calls == [("s1", ["wave", "wave", "thumbs_up"])]
+    assert result["communication_result"] == {"output": "w w t"}
+    # A terminator with nothing signed does not run the pipeline
+    assert (await feed(segmenter, "s1", [["ok"]]))["status"] == "listening"
+    assert len(pipeline.calls) == 1
+    print("✓ 7 frames -> 1 pipeline call; the terminator is not part of the sentence")
+
+    # Test 2: A frame after the pause closes the utterance and starts the next one
+    print("\n[Test 2] Pause...")
+    await feed(segmenter, "s2", [["peace"], ["peace"]])
+    time.sleep(PAUSE_S / 2)
+    await feed(segmenter, "s2", [["peace"]])  # still held: no pause
+    time.sleep(PAUSE_S * 1.5)
+    result = await feed(segmenter, "s2", [["fist"]])
+    assert result["closed_by"] == "pause" and result["gestures"] == ["peace"]
+    assert segmenter.get_stats()["open_utterances"] == 1  # "fist" opened the next one
+    print("✓ Holding a gesture is not a pause; the frame after a pause starts a new utterance")
+
+    # Test 3: Reaching max_gestures closes the utterance
+    print("\n[Test 3] Length limit...")
+    result = await feed(segmenter, "s3", [[f"g{i}"] for i in range(5)])
+    assert result["closed_by"] == "length" and len(result["gestures"]) == 5
+    print("✓ Closed at max_gestures")
+
+    # Test 4: The sweep closes idle utterances concurrently and keeps their results
+    print("\n[Test 4] Sweep...")
+    pipeline = Pipeline(delay=0.3)
+    segmenter = make_segmenter(pipeline)
+    for session_id in ("a", "b", "c"):
+        await feed(segmenter, session_id, [["wave"]])
+    time.sleep(PAUSE_S * 1.5)
+    start = time.perf_counter()
+    await segmenter.sweep()
+    assert segmenter.get_stats()["processing"] == 3
+    await segmenter.close()
+    assert time.perf_counter() - start < 0.6  # three 0.3 s runs in parallel
+    for session_id in ("a", "b", "c"):
+        results = segmenter.take_results(session_id)
+        assert [r["gestures"] for r in results] == [["wave"]], results
+    assert segmenter.take_results("a") == []
+    print("✓ Idle utterances processed in parallel and kept until collected")
+
+    # Test 5: A failing pipeline run reports the sentence instead of dropping it
+    print("\n[Test 5] Failures...")
+    pipeline = Pipeline()
+    pipeline.fail.add("busy")
+    segmenter = make_segmenter(pipeline)
+    result = await feed(segmenter, "busy", [["wave"], ["thumbs_up"], ["ok"]])
+    assert result["status"] == "failed" and result["gestures"] == ["wave", "thumbs_up"]
+    assert "busy" in result["error"]
+    for session_id in ("busy", "fine"):
+        await feed(segmenter, session_id, [["peace"]])
+    time.sleep(PAUSE_S * 1.5)
+    await segmenter.sweep()
+    await segmenter.close()
+    assert segmenter.take_results("busy")[0]["status"] == "failed"
+    assert segmenter.take_results("fine")[0]["status"] == "complete"
+    assert segmenter.get_stats()["failed"] == 2
+    print("✓ Failed utterances come back with status \"failed\"; other sessions are unaffected")
+
+    print("\n" + "=" * 60)
+    print("All utterance segmenter tests passed")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
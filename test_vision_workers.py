@@ -0,0 +1,148 @@
+"""
+Vision worker pool test
+Runs the shared-memory frame ring with a fake worker (no OpenCV/MediaPipe)
+and checks that hung and crashed workers are replaced and their slots
+reclaimed, without pausing the event loop or the other workers
+"""
+
+import os
+import sys
+import time
+import base64
+import asyncio
+
+sys.path.append('backend')
+
+
+def fake_worker(ring_name: str, slots: int, slot_bytes: int, worker: int, tasks, results):
+    """Echoes frames back; b"hang" never answers, b"exit" kills the worker"""
+    from services.vision_workers import FrameRing
+
+    ring = FrameRing(slots, slot_bytes, name=ring_name)
+    results.put(("ready", worker, None))
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        request_id, slot, length, session_id = task
+        data = bytes(ring.view(slot, length))
+        if data == b"hang":
+            time.sleep(3600)
+        if data == b"exit":
+            os._exit(1)
+        results.put((request_id, slot, {"echo": data.decode(), "gestures": [], "emojis": []}))
+    ring.close()
+
+
+def dies_before_ready(ring_name: str, slots: int, slot_bytes: int, worker: int, tasks, results):
+    """Crashes during start-up the first time (marker file absent), then works like fake_worker"""
+    marker = os.environ["VISION_TEST_MARKER"]
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    fake_worker(ring_name, slots, slot_bytes, worker, tasks, results)
+
+
+def frame(data: bytes) -> str:
+    return "data:image/jpeg;base64," + base64.b64encode(data).decode()
+
+
+async def main():
+    from services.vision_workers import VisionWorkerPool
+
+    pool = VisionWorkerPool(workers=1, slots=2, slot_kb=1, policy="drop", timeout_s=0.5, worker_main=fake_worker)
+    pool.start()
+    try:
+        # Test 1: Frames round-trip through the ring
+        print("\n[Test 1] Round trip through the frame ring...")
+        assert (await pool.process_frame(frame(b"hello"), "s1"))["echo"] == "hello"
+        assert pool.ready
+        print("✓ Frame echoed by the worker")
+
+        # Test 2: A worker that hangs but stays alive is replaced
+        print("\n[Test 2] Hung worker...")
+        start = time.perf_counter()
+        results = await asyncio.gather(*(pool.process_frame(frame(b"hang"), f"s{i}") for i in range(2)))
+        assert all(result.get("error") for result in results), results
+        assert time.perf_counter() - start < 1.5
+        stats = pool.get_stats()
+        assert stats["stuck"] == 1 and stats["in_flight"] == 0, stats
+        # Both slots are free again: neither frame is dropped
+        results = await asyncio.gather(*(pool.process_frame(frame(b"after hang"), f"s{i}") for i in range(2)))
+        assert [result.get("echo") for result in results] == ["after hang"] * 2, results
+        print(f"✓ Hung worker killed and respawned, slots reclaimed ({stats['restarts']} restart)")
+
+        # Test 3: A worker that crashes is replaced
+        print("\n[Test 3] Crashed worker...")
+        assert (await pool.process_frame(frame(b"exit"), "s1")).get("error")
+        assert (await pool.process_frame(frame(b"after crash"), "s1"))["echo"] == "after crash"
+        assert pool.get_stats()["restarts"] == 2
+        print("✓ Crashed worker respawned")
+    finally:
+        pool.close()
+
+    # Test 4: A worker that dies before it is ready is respawned without any frame
+    print("\n[Test 4] Worker dying during start-up...")
+    os.environ["VISION_TEST_MARKER"] = marker = "test_vision_workers.marker"
+    if os.path.exists(marker):
+        os.remove(marker)
+    pool = VisionWorkerPool(workers=1, slots=2, slot_kb=1, timeout_s=0.5, worker_main=dies_before_ready)
+    pool.start()
+    try:
+        start = time.perf_counter()
+        while not pool.ready:
+            assert time.perf_counter() - start < 10, "worker never became ready"
+            await asyncio.sleep(0.05)
+        assert pool.get_stats()["restarts"] == 1
+        assert (await pool.process_frame(frame(b"ready"), "s1"))["echo"] == "ready"
+        print(f"✓ Worker respawned and ready after {time.perf_counter() - start:.1f}s")
+    finally:
+        pool.close()
+        os.remove(marker)
+
+    # Test 5: Restarting one worker stalls neither the event loop nor the other worker
+    print("\n[Test 5] Restart beside a healthy worker...")
+    import services.vision_workers as vision_workers
+    kill = vision_workers._kill
+
+    def slow_kill(process):
+        time.sleep(0.5)
+        kill(process)
+
+    vision_workers._kill = slow_kill
+    pool = VisionWorkerPool(workers=2, slots=4, slot_kb=1, timeout_s=0.5, worker_main=fake_worker)
+    pool.start()
+    try:
+        hung, healthy = (next(f"s{i}" for i in range(100) if pool._worker_for(f"s{i}") == worker) for worker in (0, 1))
+        queues = list(pool._results)
+        gaps = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                gaps.append(time.perf_counter() - last)
+                last = time.perf_counter()
+
+        ticking = asyncio.create_task(ticker())
+        assert (await pool.process_frame(frame(b"hang"), hung)).get("error")
+        assert (await pool.process_frame(frame(b"beside"), healthy))["echo"] == "beside"
+        ticking.cancel()
+        assert max(gaps) < 0.3, max(gaps)
+        assert pool._results[0] is not queues[0] and pool._results[1] is queues[1]
+        assert (await pool.process_frame(frame(b"after"), hung))["echo"] == "after"
+        print(f"✓ Loop never paused over {max(gaps) * 1000:.0f} ms; only the restarted worker got new queues")
+    finally:
+        vision_workers._kill = kill
+        pool.close()
+
+    print("\n" + "=" * 60)
+    print("All vision worker tests passed")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("VISION WORKER POOL TEST")
+    print("=" * 60)
+    asyncio.run(main())
@@ -0,0 +1,180 @@
+"""
+Gesture classifier training
+Records hand landmarks from labelled footage and trains the NumPy MLP that
+VisionService loads in place of the hand-written gesture rules
+
+Usage:
+    # One clip (or image directory) per gesture; "none" for hands showing no gesture
+    python train_gesture_classifier.py record thumbs_up clips/thumbs_up.mp4 -o data/landmarks.ndjson
+    python train_gesture_classifier.py record none clips/idle_hands/ -o data/landmarks.ndjson
+
+    # Train, compare with the rules on a held-out split, save the model
+    python train_gesture_classifier.py train data/landmarks.ndjson
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append('backend')
+
+from config import GESTURE_MODEL_PATH
+from services.gesture_classifier import (
+    NO_GESTURE,
+    GestureClassifier,
+    LandmarkArray,
+    features_for,
+    landmarks_to_array,
+    rule_gesture,
+)
+
+
+def iter_images(path):
+    """BGR frames from a video file or a directory of images"""
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                yield frame
+    else:
+        from services.video_analysis import iter_video_frames
+        for _, frame in iter_video_frames(path, sample_fps=0):
+            yield frame
+
+
+def record(args):
+    import mediapipe as mp
+
+    hands = mp.solutions.hands.Hands(
+        static_image_mode=os.path.isdir(args.source),
+        max_num_hands=2,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    frames = samples = 0
+    with open(args.output, "a") as out:
+        for frame in iter_images(args.source):
+            frames += 1
+            results = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            for hand_landmarks, handedness in zip(results.multi_hand_landmarks or [], results.multi_handedness or []):
+                out.write(json.dumps({
+                    "gesture": args.label,
+                    "hand": handedness.classification[0].label,
+                    "landmarks": np.round(landmarks_to_array(hand_landmarks), 5).tolist(),
+                }) + "\n")
+                samples += 1
+    hands.close()
+    print(f"✓ {samples} '{args.label}' samples from {frames} frames -> {args.output}")
+
+
+def load_samples(paths):
+    samples = []
+    for path in paths:
+        with open(path) as f:
+            samples.extend(json.loads(line) for line in f if line.strip())
+    return samples
+
+
+def rule_predictions(samples):
+    """What the hand-written rules say for each sample (None -> "none")"""
+    return [
+        rule_gesture(LandmarkArray(np.array(s["landmarks"])), s.get("hand", "Right")) or NO_GESTURE
+        for s in samples
+    ]
+
+
+def model_predictions(model, features):
+    predictions = []
+    for proba in model.predict_proba(features):
+        best = int(proba.argmax())
+        label = model.classes[best]
+        predictions.append(label if proba[best] >= model.min_confidence else NO_GESTURE)
+    return predictions
+
+
+def accuracy(predictions, labels) -> float:
+    return sum(p == l for p, l in zip(predictions, labels)) / len(labels)
+
+
+def train(args):
+    samples = load_samples(args.datasets)
+    if len(samples) < 10:
+        print(f"✗ Only {len(samples)} samples - record more data first")
+        sys.exit(1)
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(samples))
+    split = int(len(samples) * (1 - args.holdout))
+    train_samples = [samples[i] for i in order[:split]]
+    test_samples = [samples[i] for i in order[split:]]
+    train_labels = [s["gesture"] for s in train_samples]
+    test_labels = [s["gesture"] for s in test_samples]
+
+    print("=" * 60)
+    print(f"GESTURE CLASSIFIER TRAINING ({len(train_samples)} train / {len(test_samples)} held out)")
+    print("=" * 60)
+    counts = {label: train_labels.count(label) for label in sorted(set(train_labels))}
+    print("Classes: " + ", ".join(f"{label} ({n})" for label, n in counts.items()))
+
+    started = time.perf_counter()
+    model = GestureClassifier.train(
+        features_for(train_samples), train_labels,
+        hidden=args.hidden, epochs=args.epochs, seed=args.seed
+    )
+    print(f"✓ Trained in {time.perf_counter() - started:.1f}s")
+
+    if test_samples:
+        model_accuracy = accuracy(model_predictions(model, features_for(test_samples)), test_labels)
+        print(f"Held-out accuracy (model): {model_accuracy:.1%}")
+        print(f"Held-out accuracy (rules): {accuracy(rule_predictions(test_samples), test_labels):.1%}")
+
+    # Per-hand cost as VisionService pays it: features + forward pass
+    points = np.array(samples[0]["landmarks"], dtype=np.float32)
+    runs = 2000
+    started = time.perf_counter()
+    for _ in range(runs):
+        model.predict(points, "Right")
+    print(f"Inference: {(time.perf_counter() - started) / runs * 1e6:.0f} µs per hand")
+
+    # Final model uses every sample
+    if test_samples and not args.no_refit:
+        model = GestureClassifier.train(
+            features_for(samples), [s["gesture"] for s in samples],
+            hidden=args.hidden, epochs=args.epochs, seed=args.seed
+        )
+    model.save(args.output)
+    print(f"✓ Saved model to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record landmark datasets and train the gesture classifier")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="append landmarks from labelled footage to a dataset")
+    rec.add_argument("label", help=f"gesture name, or '{NO_GESTURE}' for hands showing no gesture")
+    rec.add_argument("source", help="video file or directory of images")
+    rec.add_argument("-o", "--output", default="data/landmarks.ndjson")
+    rec.set_defaults(func=record)
+
+    tr = commands.add_parser("train", help="train and save the classifier")
+    tr.add_argument("datasets", nargs="+", help="NDJSON landmark files from `record`")
+    tr.add_argument("-o", "--output", default=GESTURE_MODEL_PATH)
+    tr.add_argument("--hidden", type=int, default=32)
+    tr.add_argument("--epochs", type=int, default=400)
+    tr.add_argument("--holdout", type=float, default=0.2, help="fraction kept out for evaluation")
+    tr.add_argument("--no-refit", action="store_true", help="save the model trained without the held-out split")
+    tr.add_argument("--seed", type=int, default=0)
+    tr.set_defaults(func=train)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()